@@ -6,13 +6,25 @@ import { Upload, FileText, Download, CheckCircle, XCircle, AlertCircle } from 'l
 import { toast } from 'sonner'
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
+// Uploads are processed in the background; poll the job until it finishes
+const STATUS_POLL_MS = 1000
+const TERMINAL_STATUSES = ['COMPLETED', 'FAILED']
 
 export default function DataUploadPage() {
   const { isAuthenticated } = useAuth()
   const [loading, setLoading] = useState(false)
   const [file, setFile] = useState<File | null>(null)
   const [uploadResult, setUploadResult] = useState<any>(null)
+  const [progress, setProgress] = useState<any>(null)
   const fileInputRef = useRef<HTMLInputElement>(null)
+  const unmounted = useRef(false)
+
+  useEffect(() => {
+    unmounted.current = false
+    return () => {
+      unmounted.current = true
+    }
+  }, [])
   
   // Debug: Log component state changes
   useEffect(() => {
@@ -65,6 +77,23 @@ export default function DataUploadPage() {
     }
   }
 
+  const waitForUpload = async (statusUrl: string, headers: HeadersInit) => {
+    while (!unmounted.current) {
+      const response = await fetch(`${API_URL}${statusUrl}`, { headers })
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({ detail: 'Failed to get upload status' }))
+        throw new Error(errorData.detail || 'Failed to get upload status')
+      }
+      const { upload } = await response.json()
+      setProgress(upload)
+      if (TERMINAL_STATUSES.includes(upload.status)) {
+        return upload
+      }
+      await new Promise((resolve) => setTimeout(resolve, STATUS_POLL_MS))
+    }
+    return null
+  }
+
   const uploadFile = async () => {
     // Add early validation
     if (!file) {
@@ -95,6 +124,7 @@ export default function DataUploadPage() {
     })
 
     setLoading(true)
+    setProgress(null)
     try {
       const formData = new FormData()
       formData.append('file', file)
@@ -177,17 +207,32 @@ export default function DataUploadPage() {
         throw new Error(errorMessage)
       }
 
-      const data = await response.json()
-      setUploadResult(data.result)
+      // 202: the upload is queued as a background job
+      const job = await response.json()
+      console.log('📋 Upload queued:', job)
+      setFile(null)
+      if (fileInputRef.current) {
+        fileInputRef.current.value = ''
+      }
+
+      const upload = await waitForUpload(job.status_url, headers)
+      if (!upload) {
+        return
+      }
+      setUploadResult(upload)
       
-      if (data.result && data.result.success !== false) {
-        const rowsInserted = data.result.rows_inserted || 0
+      if (upload.status === 'COMPLETED') {
+        const rowsInserted = upload.rows_inserted || 0
         
         // Set a flag in sessionStorage to indicate we need to refresh dashboard
         // This will be picked up by the dashboard to bypass cache
         sessionStorage.setItem('data_uploaded', 'true')
         sessionStorage.setItem('upload_timestamp', Date.now().toString())
         
+        if (upload.rows_failed) {
+          toast.warning(`Upload completed: ${rowsInserted} rows inserted, ${upload.rows_failed} rows rejected`)
+        }
+        
         toast.success(`Successfully uploaded! ${rowsInserted} rows inserted`, {
           duration: 5000,
           action: {
@@ -209,12 +254,9 @@ export default function DataUploadPage() {
           }, 1000)
         }, 2000)
       } else {
-        toast.warning(`Upload completed with ${data.result?.rows_failed || 0} errors`)
-      }
-      
-      setFile(null)
-      if (fileInputRef.current) {
-        fileInputRef.current.value = ''
+        toast.error(`Upload failed: ${upload.error_summary || 'Unknown error'}`, {
+          duration: 6000
+        })
       }
     } catch (error: any) {
       console.error('Upload error:', error)
@@ -236,6 +278,7 @@ export default function DataUploadPage() {
       })
     } finally {
       setLoading(false)
+      setProgress(null)
     }
   }
 
@@ -381,7 +424,12 @@ export default function DataUploadPage() {
                   <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4" fill="none" />
                   <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z" />
                 </svg>
-                Uploading...
+                {!progress
+                  ? 'Uploading...'
+                  : progress.status === 'PENDING'
+                  ? 'Queued...'
+                  : `Processing... ${progress.rows_processed || 0} rows` +
+                    (progress.eta_seconds ? ` (about ${progress.eta_seconds}s left)` : '')}
               </span>
             ) : !file ? (
               'Please Select a File First'
@@ -442,26 +490,14 @@ export default function DataUploadPage() {
               </div>
             </div>
 
-            {uploadResult.errors && uploadResult.errors.length > 0 && (
-              <div className="mt-6">
-                <h3 className="font-bold text-red-900 dark:text-red-100 mb-3">
-                  Errors (first 10):
-                </h3>
-                <div className="space-y-2">
-                  {uploadResult.errors.map((error: any, idx: number) => (
-                    <div
-                      key={idx}
-                      className="p-3 bg-red-50 dark:bg-red-900/20 border border-red-200 dark:border-red-800 rounded text-sm"
-                    >
-                      <span className="font-medium text-red-900 dark:text-red-100">
-                        Row {error.row}:
-                      </span>{' '}
-                      <span className="text-red-800 dark:text-red-200">
-                        {error.error}
-                      </span>
-                    </div>
-                  ))}
-                </div>
+            {uploadResult.error_summary && (
+              <div className="mt-6 p-3 bg-red-50 dark:bg-red-900/20 border border-red-200 dark:border-red-800 rounded text-sm">
+                <span className="font-medium text-red-900 dark:text-red-100">
+                  {uploadResult.status === 'FAILED' ? 'Upload failed:' : 'Warning:'}
+                </span>{' '}
+                <span className="text-red-800 dark:text-red-200">
+                  {uploadResult.error_summary}
+                </span>
               </div>
             )}
           </div>
@@ -97,12 +97,13 @@ class FraudGuardClient {
 
   /**
    * Ingest multiple transactions at once
-   * @param {Array<Object>} transactions - Array of transaction objects (max 100)
-   * @returns {Promise<Object>} Batch results
+   * @param {Array<Object>} transactions - Array of transaction objects (max 10,000)
+   * @returns {Promise<Object>} Batch results; `transactions` has one entry per
+   *   input, in order, with `index` and either `transaction_id` or `error`
    */
   async batchIngest(transactions) {
-    if (transactions.length > 100) {
-      throw new ValidationError('Batch size cannot exceed 100 transactions');
+    if (transactions.length > 10000) {
+      throw new ValidationError('Batch size cannot exceed 10000 transactions');
     }
 
     try {
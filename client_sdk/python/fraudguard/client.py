@@ -142,7 +142,7 @@ class FraudGuardClient:
     
     def batch_ingest(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Ingest multiple transactions at once (max 100)
+        Ingest multiple transactions at once (max 10,000)
         
         Args:
             transactions: List of transaction dicts
@@ -153,11 +153,11 @@ class FraudGuardClient:
                 'total': int,
                 'success': int,
                 'failed': int,
-                'transactions': list
+                'transactions': list  # per input, in order: 'index' + 'transaction_id' or 'error'
             }
         """
-        if len(transactions) > 100:
-            raise ValidationError("Batch size cannot exceed 100 transactions")
+        if len(transactions) > 10000:
+            raise ValidationError("Batch size cannot exceed 10000 transactions")
         
         try:
             response = self.session.post(
@@ -148,18 +148,9 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Function to refresh all materialized views
-CREATE OR REPLACE FUNCTION refresh_all_materialized_views()
-RETURNS VOID AS $$
-BEGIN
-    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_amount_buckets_hourly;
-    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_velocity_by_account;
-    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_time_of_day_stats;
-    
-    INSERT INTO system_logs(level, message, created_at)
-    VALUES ('INFO', 'Refreshed all materialized views', NOW());
-END;
-$$ LANGUAGE plpgsql;
+-- refresh_all_materialized_views() is defined by migration 017: the mv_*
+-- objects are plain views over incrementally maintained rollups there, and
+-- re-running this file must not bring back a REFRESH of them
 
 -- Helper table for system logs
 CREATE TABLE IF NOT EXISTS system_logs (
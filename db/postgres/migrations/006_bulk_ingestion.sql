@@ -0,0 +1,24 @@
+-- Migration 006: Bulk Ingestion
+-- Adds the reject table used by the COPY-based bulk loader
+
+-- ============================================================================
+-- Ingestion Rejects (rows that failed validation or constraints)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS ingestion_rejects (
+    id BIGSERIAL PRIMARY KEY,
+    tenant_id VARCHAR(255) NOT NULL REFERENCES tenants(tenant_id) ON DELETE CASCADE,
+    upload_id INTEGER REFERENCES file_uploads(id) ON DELETE CASCADE,
+
+    -- Source row
+    row_number INTEGER,  -- 1-based line number in the file (header = 1)
+    error TEXT NOT NULL,
+    raw_row JSONB,
+
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_rejects_upload ON ingestion_rejects(upload_id, row_number);
+CREATE INDEX IF NOT EXISTS idx_ingestion_rejects_tenant ON ingestion_rejects(tenant_id, created_at DESC);
+
+COMMENT ON TABLE ingestion_rejects IS 'Rows rejected by bulk ingestion, keyed by upload';
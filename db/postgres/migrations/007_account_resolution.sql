@@ -0,0 +1,43 @@
+-- Migration 007: Account Resolution
+-- Makes customer_id unique per tenant so ingestion can create accounts
+-- with INSERT ... ON CONFLICT (tenant_id, customer_id)
+
+-- ============================================================================
+-- Merge duplicate accounts (created by concurrent per-row lookups)
+-- ============================================================================
+
+CREATE TEMP TABLE account_duplicates AS
+SELECT id, keep_id
+FROM (
+    SELECT
+        id,
+        MIN(id) OVER (PARTITION BY tenant_id, customer_id) AS keep_id
+    FROM accounts
+) a
+WHERE id <> keep_id;
+
+UPDATE transactions t
+SET account_id = d.keep_id
+FROM account_duplicates d
+WHERE t.account_id = d.id;
+
+UPDATE fraud_alerts f
+SET account_id = d.keep_id
+FROM account_duplicates d
+WHERE f.account_id = d.id;
+
+DELETE FROM accounts a
+USING account_duplicates d
+WHERE a.id = d.id;
+
+DROP TABLE account_duplicates;
+
+-- ============================================================================
+-- Unique customer_id per tenant
+-- ============================================================================
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_accounts_tenant_customer
+    ON accounts(tenant_id, customer_id);
+
+-- Superseded by the unique index above
+DROP INDEX IF EXISTS idx_accounts_tenant_customer;
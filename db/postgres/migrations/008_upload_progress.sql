@@ -0,0 +1,15 @@
+-- Migration 008: Upload Progress
+-- Uploads are processed by a background job; these columns expose its progress
+
+-- ============================================================================
+-- File upload progress
+-- ============================================================================
+
+ALTER TABLE file_uploads
+    ADD COLUMN IF NOT EXISTS rows_processed BIGINT DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS rows_per_second DECIMAL(12, 2),
+    ADD COLUMN IF NOT EXISTS eta_seconds INTEGER,
+    ADD COLUMN IF NOT EXISTS progress_updated_at TIMESTAMP WITH TIME ZONE;
+
+COMMENT ON COLUMN file_uploads.rows_processed IS 'Rows read so far by the upload job (inserted + failed)';
+COMMENT ON COLUMN file_uploads.eta_seconds IS 'Estimated seconds remaining; NULL when the file size gives no estimate';
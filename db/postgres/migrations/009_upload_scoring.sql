@@ -0,0 +1,30 @@
+-- Migration 009: Upload Scoring
+-- Bulk-loaded transactions remember their upload so a post-load stage can
+-- score them (risk_score, status, fraud_alerts) in set-based batches
+
+-- ============================================================================
+-- Transactions loaded from file uploads
+-- ============================================================================
+
+ALTER TABLE transactions
+    ADD COLUMN IF NOT EXISTS upload_id INTEGER REFERENCES file_uploads(id) ON DELETE SET NULL;
+
+-- Keyset scan of an upload's unscored rows
+CREATE INDEX IF NOT EXISTS idx_transactions_upload_pending
+    ON transactions(upload_id, id)
+    WHERE upload_id IS NOT NULL AND status = 'PENDING';
+
+-- Per-account history for window-function features
+CREATE INDEX IF NOT EXISTS idx_transactions_tenant_account_time
+    ON transactions(tenant_id, account_id, txn_time);
+
+-- ============================================================================
+-- Scoring progress
+-- ============================================================================
+
+ALTER TABLE file_uploads
+    ADD COLUMN IF NOT EXISTS rows_scored BIGINT DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS alerts_created INTEGER DEFAULT 0;
+
+COMMENT ON COLUMN transactions.upload_id IS 'file_uploads row that loaded this transaction (NULL for API/sync ingestion)';
+COMMENT ON COLUMN file_uploads.rows_scored IS 'Loaded rows scored so far by the post-load scoring stage';
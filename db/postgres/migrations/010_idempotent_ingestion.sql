@@ -0,0 +1,46 @@
+-- Migration 010: Idempotent Ingestion
+-- reference_id is unique per tenant so retried webhooks and API calls
+-- cannot store the same transaction twice (ingestion uses
+-- INSERT ... ON CONFLICT (tenant_id, reference_id) DO NOTHING)
+
+ALTER TABLE transactions
+    ADD COLUMN IF NOT EXISTS reference_id VARCHAR(128);
+
+-- ============================================================================
+-- Detach existing duplicates (created by retried deliveries)
+-- ============================================================================
+
+-- Later copies keep their rows but lose the reference_id; the metadata
+-- records which transaction they duplicate
+CREATE TEMP TABLE reference_duplicates AS
+SELECT id, keep_id, reference_id
+FROM (
+    SELECT
+        id,
+        reference_id,
+        MIN(id) OVER (PARTITION BY tenant_id, reference_id) AS keep_id
+    FROM transactions
+    WHERE reference_id IS NOT NULL
+) t
+WHERE id <> keep_id;
+
+UPDATE transactions t
+SET reference_id = NULL,
+    metadata = COALESCE(t.metadata, '{}'::jsonb) || jsonb_build_object(
+        'duplicate_of', d.keep_id,
+        'duplicate_reference_id', d.reference_id
+    )
+FROM reference_duplicates d
+WHERE t.id = d.id;
+
+DROP TABLE reference_duplicates;
+
+-- ============================================================================
+-- Unique reference_id per tenant
+-- ============================================================================
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_tenant_reference
+    ON transactions(tenant_id, reference_id)
+    WHERE reference_id IS NOT NULL;
+
+COMMENT ON COLUMN transactions.reference_id IS 'Caller-supplied id (e.g. Stripe charge id); unique per tenant, duplicates replay the original result';
@@ -0,0 +1,45 @@
+-- Migration 011: Webhook Event Queue
+-- Payment gateway webhooks are stored here and acknowledged immediately;
+-- consumers claim ready events with FOR UPDATE SKIP LOCKED and ingest
+-- them in batches
+
+-- ============================================================================
+-- Webhook Events
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id BIGSERIAL PRIMARY KEY,
+    tenant_id VARCHAR(255) NOT NULL REFERENCES tenants(tenant_id) ON DELETE CASCADE,
+
+    -- Gateway event
+    provider VARCHAR(16) NOT NULL,  -- stripe, paypal
+    event_id VARCHAR(128) NOT NULL,  -- gateway event id (redeliveries reuse it)
+    event_type VARCHAR(64) NOT NULL,
+    payload JSONB NOT NULL,
+
+    -- Processing
+    status VARCHAR(16) NOT NULL DEFAULT 'QUEUED'
+        CHECK (status IN ('QUEUED', 'PROCESSING', 'PROCESSED', 'FAILED')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    result JSONB,
+    error TEXT,
+
+    received_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Redelivered events are stored once
+CREATE UNIQUE INDEX IF NOT EXISTS uq_webhook_events_event
+    ON webhook_events(tenant_id, provider, event_id);
+
+-- Consumers scan only unfinished events
+CREATE INDEX IF NOT EXISTS idx_webhook_events_ready
+    ON webhook_events(id)
+    WHERE status IN ('QUEUED', 'PROCESSING');
+
+CREATE INDEX IF NOT EXISTS idx_webhook_events_tenant
+    ON webhook_events(tenant_id, received_at DESC);
+
+COMMENT ON TABLE webhook_events IS 'Durable queue of payment gateway webhook events and their ingestion results';
+COMMENT ON COLUMN webhook_events.available_at IS 'QUEUED: earliest retry time; PROCESSING: end of the consumer lease';
@@ -0,0 +1,17 @@
+-- Migration 012: Keyset Sync Watermark
+-- Database connector syncs stream the source table in ascending
+-- (transaction_date, id) order and commit each batch together with the
+-- position of its last row, so a sync resumes right after it
+
+-- ============================================================================
+-- Data Sync Jobs
+-- ============================================================================
+
+-- {"time": <transaction_date of the last synced row>, "id": <its source key>}
+ALTER TABLE data_sync_jobs ADD COLUMN IF NOT EXISTS watermark JSONB;
+
+-- Jobs synced before the watermark existed continue after their last run
+-- (time only: rows strictly newer than the last sync)
+UPDATE data_sync_jobs
+SET watermark = jsonb_build_object('time', last_sync_at, 'id', NULL)
+WHERE watermark IS NULL AND last_sync_at IS NOT NULL;
@@ -0,0 +1,29 @@
+-- Migration 013: Sync Job Scheduling
+-- The sync scheduler (python -m ingestion.sync_scheduler) leases due jobs
+-- with FOR UPDATE SKIP LOCKED and records how long each run took and how
+-- late it started
+
+-- ============================================================================
+-- Data Sync Jobs
+-- ============================================================================
+
+ALTER TABLE data_sync_jobs ADD COLUMN IF NOT EXISTS next_run_at TIMESTAMP WITH TIME ZONE;  -- NULL = due now
+ALTER TABLE data_sync_jobs ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP WITH TIME ZONE;  -- set while a scheduler runs the job
+ALTER TABLE data_sync_jobs ADD COLUMN IF NOT EXISTS last_sync_duration_ms INTEGER;
+ALTER TABLE data_sync_jobs ADD COLUMN IF NOT EXISTS last_sync_lag_ms INTEGER;  -- start time minus scheduled time
+
+-- Due jobs, in the order the scheduler leases them
+CREATE INDEX IF NOT EXISTS idx_data_sync_jobs_due
+    ON data_sync_jobs(next_run_at NULLS FIRST)
+    WHERE status = 'ACTIVE';
+
+-- Leases held per tenant (for the per-tenant concurrency cap)
+CREATE INDEX IF NOT EXISTS idx_data_sync_jobs_leased
+    ON data_sync_jobs(tenant_id)
+    WHERE lease_until IS NOT NULL;
+
+-- ============================================================================
+-- Data Sync History
+-- ============================================================================
+
+ALTER TABLE data_sync_history ADD COLUMN IF NOT EXISTS lag_ms INTEGER;
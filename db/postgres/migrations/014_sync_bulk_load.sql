@@ -0,0 +1,15 @@
+-- Migration 014: Bulk-Loaded Connector Syncs
+-- Synced batches go through the COPY staging path of the bulk loader;
+-- rows are deduplicated on reference_id (sync:<job>:<source id>) and
+-- invalid rows land in ingestion_rejects, keyed by sync job
+
+-- ============================================================================
+-- Ingestion Rejects
+-- ============================================================================
+
+ALTER TABLE ingestion_rejects
+    ADD COLUMN IF NOT EXISTS sync_job_id INTEGER REFERENCES data_sync_jobs(id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_rejects_sync_job
+    ON ingestion_rejects(sync_job_id, created_at DESC)
+    WHERE sync_job_id IS NOT NULL;
@@ -0,0 +1,29 @@
+-- Migration 015: Parallel Backfill Ranges
+-- A backfill of a large source table is split into key ranges that are
+-- extracted concurrently; each range keeps its own checkpoint so an
+-- interrupted backfill resumes only the ranges that are not done
+
+-- ============================================================================
+-- Data Sync Ranges
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS data_sync_ranges (
+    job_id INTEGER NOT NULL REFERENCES data_sync_jobs(id) ON DELETE CASCADE,
+    range_no INTEGER NOT NULL,
+
+    -- Slice of the source: lower_bound < key <= upper_bound (NULL = open)
+    key_column VARCHAR(32) NOT NULL,  -- 'id' or 'transaction_date' (mapped columns)
+    lower_bound JSONB,
+    upper_bound JSONB,
+
+    -- Checkpoint, committed with every loaded batch
+    watermark JSONB,  -- position of the last row loaded from this range
+    high_water JSONB,  -- latest (transaction_date, id) loaded from this range
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    status VARCHAR(16) NOT NULL DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'DONE')),
+
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job_id, range_no)
+);
+
+COMMENT ON TABLE data_sync_ranges IS 'Key ranges of in-progress parallel sync backfills';
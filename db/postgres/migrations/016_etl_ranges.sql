@@ -0,0 +1,25 @@
+-- Migration 016: Parallel ETL Ranges
+-- The worker ETL splits new Oracle ids into ranges, each with its own
+-- checkpoint row that worker threads and replicas lease with
+-- FOR UPDATE SKIP LOCKED. The row with partition_key '' keeps the highest
+-- id handed out to a range.
+
+-- ============================================================================
+-- ETL Checkpoints
+-- ============================================================================
+
+ALTER TABLE etl_checkpoints ADD COLUMN IF NOT EXISTS partition_key VARCHAR(64) NOT NULL DEFAULT '';  -- e.g. 'id:0-250000'
+ALTER TABLE etl_checkpoints ADD COLUMN IF NOT EXISTS range_start INTEGER;  -- exclusive
+ALTER TABLE etl_checkpoints ADD COLUMN IF NOT EXISTS range_end INTEGER;  -- inclusive
+ALTER TABLE etl_checkpoints ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(128);
+ALTER TABLE etl_checkpoints ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
+
+-- One checkpoint per source table and range
+ALTER TABLE etl_checkpoints DROP CONSTRAINT IF EXISTS etl_checkpoints_source_table_key;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_etl_checkpoints_partition
+    ON etl_checkpoints(source_table, partition_key);
+
+-- Ranges waiting for a worker, in the order they are leased
+CREATE INDEX IF NOT EXISTS idx_etl_checkpoints_ranges
+    ON etl_checkpoints(source_table, range_start)
+    WHERE partition_key <> '';
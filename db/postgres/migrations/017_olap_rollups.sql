@@ -0,0 +1,192 @@
+-- Migration 017: Incremental OLAP Rollups
+-- The worker ETL applies every loaded chunk of fact_transactions as a delta
+-- to these summary tables, in the chunk's transaction, instead of
+-- refreshing materialized views that rescan the whole fact table.
+-- mv_amount_buckets_hourly, mv_velocity_by_account and mv_time_of_day_stats
+-- become views over the rollups with the same columns.
+-- rebuild_olap_rollups() recomputes everything from fact_transactions
+-- (repair only).
+
+-- ============================================================================
+-- Helpers
+-- ============================================================================
+
+-- Amount bucket of mv_amount_buckets_hourly
+CREATE OR REPLACE FUNCTION olap_amount_bucket(amount NUMERIC)
+RETURNS VARCHAR AS $$
+    SELECT CASE
+        WHEN amount < 10 THEN '0-10'
+        WHEN amount < 50 THEN '10-50'
+        WHEN amount < 100 THEN '50-100'
+        WHEN amount < 500 THEN '100-500'
+        WHEN amount < 5000 THEN '500-5K'
+        ELSE '5K+'
+    END
+$$ LANGUAGE SQL IMMUTABLE;
+
+-- Log-scale histogram bin: bin k > 0 holds amounts in [0.01 * 1.02^(k-1), 0.01 * 1.02^k),
+-- so a percentile read from the bins is within ~1% of the exact value
+CREATE OR REPLACE FUNCTION olap_amount_bin(amount NUMERIC)
+RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN amount = 0 THEN 0
+        ELSE (SIGN(amount) * (1 + FLOOR(LN(ABS(amount)::FLOAT8 * 100) / LN(1.02))))::INTEGER
+    END
+$$ LANGUAGE SQL IMMUTABLE;
+
+-- Representative (geometric middle) amount of a bin
+CREATE OR REPLACE FUNCTION olap_amount_bin_value(amount_bin INTEGER)
+RETURNS NUMERIC AS $$
+    SELECT CASE
+        WHEN amount_bin = 0 THEN 0
+        ELSE ROUND((SIGN(amount_bin) * 0.01 * POWER(1.02, ABS(amount_bin) - 0.5))::NUMERIC, 2)
+    END
+$$ LANGUAGE SQL IMMUTABLE;
+
+-- ============================================================================
+-- Rollup Tables
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS agg_amount_buckets_hourly (
+    hour TIMESTAMPTZ NOT NULL,
+    bucket VARCHAR(8) NOT NULL,
+    txn_count BIGINT NOT NULL DEFAULT 0,
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, bucket)
+);
+
+-- p95_amount is recomputed by the worker for windows marked stale
+-- (only when txn_count still matches, so a concurrent load keeps it stale)
+CREATE TABLE IF NOT EXISTS agg_velocity_by_account (
+    account_id INTEGER NOT NULL,
+    hour_window TIMESTAMPTZ NOT NULL,
+    txn_count BIGINT NOT NULL DEFAULT 0,
+    p95_amount DOUBLE PRECISION,
+    p95_stale BOOLEAN NOT NULL DEFAULT TRUE,
+    PRIMARY KEY (account_id, hour_window)
+);
+
+CREATE INDEX IF NOT EXISTS idx_agg_velocity_stale
+    ON agg_velocity_by_account(account_id, hour_window)
+    WHERE p95_stale;
+
+CREATE TABLE IF NOT EXISTS agg_time_of_day_stats (
+    hour SMALLINT PRIMARY KEY,
+    total_txns BIGINT NOT NULL DEFAULT 0,
+    amount_count BIGINT NOT NULL DEFAULT 0,  -- rows with an amount
+    sum_amount NUMERIC NOT NULL DEFAULT 0,
+    sum_sq_amount NUMERIC NOT NULL DEFAULT 0,
+    min_amount NUMERIC,
+    max_amount NUMERIC
+);
+
+-- Amount histogram per hour of day, for the median
+CREATE TABLE IF NOT EXISTS agg_time_of_day_amounts (
+    hour SMALLINT NOT NULL,
+    amount_bin INTEGER NOT NULL,
+    txn_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, amount_bin)
+);
+
+-- ============================================================================
+-- Views (replace the materialized views)
+-- ============================================================================
+
+DO $$
+DECLARE
+    view_name TEXT;
+BEGIN
+    FOR view_name IN
+        SELECT matviewname FROM pg_matviews
+        WHERE schemaname = current_schema()
+          AND matviewname IN ('mv_amount_buckets_hourly', 'mv_velocity_by_account', 'mv_time_of_day_stats')
+    LOOP
+        EXECUTE format('DROP MATERIALIZED VIEW %I', view_name);
+    END LOOP;
+END $$;
+
+CREATE OR REPLACE VIEW mv_amount_buckets_hourly AS
+SELECT hour, bucket, txn_count, total_amount
+FROM agg_amount_buckets_hourly
+ORDER BY hour DESC, bucket;
+
+CREATE OR REPLACE VIEW mv_velocity_by_account AS
+SELECT account_id, hour_window, txn_count, p95_amount
+FROM agg_velocity_by_account;
+
+CREATE OR REPLACE VIEW mv_time_of_day_stats AS
+SELECT
+    s.hour,
+    s.total_txns,
+    s.sum_amount / NULLIF(s.amount_count, 0) AS avg_amount,
+    CASE WHEN s.amount_count > 1 THEN
+        SQRT(GREATEST(
+            (s.sum_sq_amount - s.sum_amount * s.sum_amount / s.amount_count) / (s.amount_count - 1), 0
+        ))
+    END AS std_amount,
+    s.min_amount,
+    s.max_amount,
+    (
+        -- Bins holding the middle rank(s), averaged like PERCENTILE_CONT(0.5)
+        SELECT AVG(olap_amount_bin_value(h.amount_bin))
+        FROM (
+            SELECT amount_bin, txn_count, SUM(txn_count) OVER (ORDER BY amount_bin) AS running
+            FROM agg_time_of_day_amounts
+            WHERE hour = s.hour
+        ) h
+        WHERE (s.amount_count + 1) / 2 BETWEEN h.running - h.txn_count + 1 AND h.running
+           OR (s.amount_count + 2) / 2 BETWEEN h.running - h.txn_count + 1 AND h.running
+    ) AS median_amount
+FROM agg_time_of_day_stats s
+ORDER BY s.hour;
+
+-- ============================================================================
+-- Full Rebuild (repair)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION rebuild_olap_rollups()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE agg_amount_buckets_hourly, agg_velocity_by_account,
+               agg_time_of_day_stats, agg_time_of_day_amounts IN EXCLUSIVE MODE;
+    TRUNCATE agg_amount_buckets_hourly, agg_velocity_by_account,
+             agg_time_of_day_stats, agg_time_of_day_amounts;
+
+    INSERT INTO agg_amount_buckets_hourly (hour, bucket, txn_count, total_amount)
+    SELECT DATE_TRUNC('hour', txn_time), olap_amount_bucket(amount), COUNT(*), COALESCE(SUM(amount), 0)
+    FROM fact_transactions
+    GROUP BY 1, 2;
+
+    INSERT INTO agg_velocity_by_account (account_id, hour_window, txn_count, p95_amount, p95_stale)
+    SELECT account_id, DATE_TRUNC('hour', txn_time), COUNT(*),
+           PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY amount), FALSE
+    FROM fact_transactions
+    WHERE account_id IS NOT NULL
+    GROUP BY 1, 2;
+
+    INSERT INTO agg_time_of_day_stats (hour, total_txns, amount_count, sum_amount, sum_sq_amount, min_amount, max_amount)
+    SELECT hour, COUNT(*), COUNT(amount), COALESCE(SUM(amount), 0), COALESCE(SUM(amount * amount), 0),
+           MIN(amount), MAX(amount)
+    FROM fact_transactions
+    GROUP BY hour;
+
+    INSERT INTO agg_time_of_day_amounts (hour, amount_bin, txn_count)
+    SELECT hour, olap_amount_bin(amount), COUNT(*)
+    FROM fact_transactions
+    WHERE amount IS NOT NULL
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Kept for callers of the old refresh
+CREATE OR REPLACE FUNCTION refresh_all_materialized_views()
+RETURNS VOID AS $$
+BEGIN
+    PERFORM rebuild_olap_rollups();
+
+    INSERT INTO system_logs(level, message, created_at)
+    VALUES ('INFO', 'Rebuilt OLAP rollups', NOW());
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_olap_rollups();
@@ -0,0 +1,40 @@
+-- Migration 018: Incremental Geo-Jump Detection
+-- The worker compares each newly loaded fact row that has a location with
+-- the account's last known point instead of running LAG over all of
+-- fact_transactions. The 'geo_jumps' checkpoint is the highest txn_id
+-- already checked.
+
+-- ============================================================================
+-- Last Known Point per Account
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS geo_account_state (
+    account_id INTEGER PRIMARY KEY,
+    txn_id INTEGER,
+    txn_time TIMESTAMPTZ NOT NULL,
+    lat DOUBLE PRECISION NOT NULL,
+    lon DOUBLE PRECISION NOT NULL,
+    city VARCHAR(64),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Seed from history, so detection continues from what is already loaded
+INSERT INTO geo_account_state (account_id, txn_id, txn_time, lat, lon, city)
+SELECT DISTINCT ON (account_id)
+    account_id, txn_id, txn_time, ST_Y(geom::geometry), ST_X(geom::geometry), city
+FROM fact_transactions
+WHERE geom IS NOT NULL AND account_id IS NOT NULL
+ORDER BY account_id, txn_time DESC, txn_id DESC
+ON CONFLICT (account_id) DO NOTHING;
+
+-- ============================================================================
+-- Checkpoint
+-- ============================================================================
+
+-- Starts at the ETL's loaded watermark: ids up to it are all in fact_transactions
+INSERT INTO etl_checkpoints (source_table, last_id, last_timestamp)
+SELECT 'geo_jumps', COALESCE(LEAST(
+    (SELECT last_id FROM etl_checkpoints WHERE source_table = 'transactions' AND partition_key = ''),
+    (SELECT MIN(last_id) FROM etl_checkpoints WHERE source_table = 'transactions' AND partition_key <> '')
+), 0), NOW()
+ON CONFLICT (source_table, partition_key) DO NOTHING;
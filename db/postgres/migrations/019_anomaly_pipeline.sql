@@ -0,0 +1,105 @@
+-- Migration 019: Incremental Anomaly Rules
+-- The worker evaluates the midnight high-amount, time-of-day z-score and
+-- velocity rules on rows loaded since the 'anomaly_rules' checkpoint and
+-- upserts the hits into anomaly_events, which the analytics endpoints read
+-- by rule and event time.
+
+-- ============================================================================
+-- Anomaly Events
+-- ============================================================================
+
+-- Transaction time, or start of the hour window for VELOCITY
+ALTER TABLE anomaly_events ADD COLUMN IF NOT EXISTS event_time TIMESTAMPTZ;
+
+-- Earlier runs re-inserted the same geo-jumps on every refresh
+DELETE FROM anomaly_events a
+USING anomaly_events b
+WHERE a.rule = b.rule
+  AND a.txn_id = b.txn_id
+  AND (a.detected_at, a.id) > (b.detected_at, b.id);
+
+-- One event per rule and transaction, or per rule, account and window
+CREATE UNIQUE INDEX IF NOT EXISTS idx_anomalies_rule_txn
+    ON anomaly_events(rule, txn_id)
+    WHERE txn_id IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_anomalies_rule_window
+    ON anomaly_events(rule, account_id, event_time)
+    WHERE txn_id IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_anomalies_rule_event_time
+    ON anomaly_events(rule, event_time DESC);
+
+-- ============================================================================
+-- Per-day Hour Stats (time-of-day z-score over the last days)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS agg_daily_hour_stats (
+    day DATE NOT NULL,
+    hour SMALLINT NOT NULL,
+    amount_count BIGINT NOT NULL DEFAULT 0,
+    sum_amount NUMERIC NOT NULL DEFAULT 0,
+    sum_sq_amount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, hour)
+);
+
+-- Peer percentile of a velocity window
+CREATE INDEX IF NOT EXISTS idx_agg_velocity_window
+    ON agg_velocity_by_account(hour_window);
+
+CREATE OR REPLACE FUNCTION rebuild_olap_rollups()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE agg_amount_buckets_hourly, agg_velocity_by_account, agg_time_of_day_stats,
+               agg_time_of_day_amounts, agg_daily_hour_stats IN EXCLUSIVE MODE;
+    TRUNCATE agg_amount_buckets_hourly, agg_velocity_by_account, agg_time_of_day_stats,
+             agg_time_of_day_amounts, agg_daily_hour_stats;
+
+    INSERT INTO agg_amount_buckets_hourly (hour, bucket, txn_count, total_amount)
+    SELECT DATE_TRUNC('hour', txn_time), olap_amount_bucket(amount), COUNT(*), COALESCE(SUM(amount), 0)
+    FROM fact_transactions
+    GROUP BY 1, 2;
+
+    INSERT INTO agg_velocity_by_account (account_id, hour_window, txn_count, p95_amount, p95_stale)
+    SELECT account_id, DATE_TRUNC('hour', txn_time), COUNT(*),
+           PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY amount), FALSE
+    FROM fact_transactions
+    WHERE account_id IS NOT NULL
+    GROUP BY 1, 2;
+
+    INSERT INTO agg_time_of_day_stats (hour, total_txns, amount_count, sum_amount, sum_sq_amount, min_amount, max_amount)
+    SELECT hour, COUNT(*), COUNT(amount), COALESCE(SUM(amount), 0), COALESCE(SUM(amount * amount), 0),
+           MIN(amount), MAX(amount)
+    FROM fact_transactions
+    GROUP BY hour;
+
+    INSERT INTO agg_time_of_day_amounts (hour, amount_bin, txn_count)
+    SELECT hour, olap_amount_bin(amount), COUNT(*)
+    FROM fact_transactions
+    WHERE amount IS NOT NULL
+    GROUP BY 1, 2;
+
+    INSERT INTO agg_daily_hour_stats (day, hour, amount_count, sum_amount, sum_sq_amount)
+    SELECT day, hour, COUNT(amount), COALESCE(SUM(amount), 0), COALESCE(SUM(amount * amount), 0)
+    FROM fact_transactions
+    GROUP BY day, hour;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO agg_daily_hour_stats (day, hour, amount_count, sum_amount, sum_sq_amount)
+SELECT day, hour, COUNT(amount), COALESCE(SUM(amount), 0), COALESCE(SUM(amount * amount), 0)
+FROM fact_transactions
+GROUP BY day, hour
+ON CONFLICT (day, hour) DO NOTHING;
+
+-- ============================================================================
+-- Checkpoint
+-- ============================================================================
+
+-- Starts at the ETL's loaded watermark: ids up to it are all in fact_transactions
+INSERT INTO etl_checkpoints (source_table, last_id, last_timestamp)
+SELECT 'anomaly_rules', COALESCE(LEAST(
+    (SELECT last_id FROM etl_checkpoints WHERE source_table = 'transactions' AND partition_key = ''),
+    (SELECT MIN(last_id) FROM etl_checkpoints WHERE source_table = 'transactions' AND partition_key <> '')
+), 0), NOW()
+ON CONFLICT (source_table, partition_key) DO NOTHING;
@@ -0,0 +1,139 @@
+-- Migration 020: fact_transactions Partition Lifecycle
+-- fact_transactions is range-partitioned by day. The worker's partition
+-- manager keeps partitions created ahead of time on a rolling horizon and
+-- detaches partitions past retention, archiving them to Parquet. The ETL
+-- creates a missing partition on demand when it loads an older or later day.
+--
+-- A generated column can't be a partition key, so `day` is now a plain
+-- column the loaders set to the UTC date of txn_time; `hour` stays generated,
+-- from the UTC time so the expression is immutable.
+
+-- ============================================================================
+-- Partitioned fact_transactions (converts an unpartitioned table once)
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE oid = to_regclass('fact_transactions') AND relkind = 'r'
+    ) THEN
+        ALTER TABLE fact_transactions RENAME TO fact_transactions_unpartitioned;
+        ALTER INDEX IF EXISTS fact_transactions_pkey RENAME TO fact_transactions_unpartitioned_pkey;
+        ALTER INDEX IF EXISTS idx_fact_account_date RENAME TO idx_fact_unpartitioned_account_date;
+        ALTER INDEX IF EXISTS idx_fact_amount RENAME TO idx_fact_unpartitioned_amount;
+        ALTER INDEX IF EXISTS idx_fact_geo RENAME TO idx_fact_unpartitioned_geo;
+        ALTER INDEX IF EXISTS idx_fact_city RENAME TO idx_fact_unpartitioned_city;
+        ALTER INDEX IF EXISTS idx_fact_transactions_tenant RENAME TO idx_fact_unpartitioned_tenant;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS fact_transactions (
+    account_id INTEGER,
+    txn_id INTEGER,
+    amount NUMERIC(12,2),
+    currency VARCHAR(8),
+    mcc VARCHAR(8),
+    channel VARCHAR(32),
+    geom GEOGRAPHY(Point, 4326),
+    city VARCHAR(64),
+    country VARCHAR(64),
+    txn_time TIMESTAMPTZ NOT NULL,
+    day DATE NOT NULL,
+    hour SMALLINT GENERATED ALWAYS AS (EXTRACT(HOUR FROM txn_time AT TIME ZONE 'UTC')) STORED,
+    status VARCHAR(16),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    tenant_id VARCHAR(64),
+    PRIMARY KEY (txn_id, day)
+) PARTITION BY RANGE (day);
+
+CREATE INDEX IF NOT EXISTS idx_fact_account_date ON fact_transactions(account_id, txn_time DESC);
+CREATE INDEX IF NOT EXISTS idx_fact_amount ON fact_transactions(amount);
+CREATE INDEX IF NOT EXISTS idx_fact_geo ON fact_transactions USING GIST(geom);
+CREATE INDEX IF NOT EXISTS idx_fact_city ON fact_transactions(city, country);
+CREATE INDEX IF NOT EXISTS idx_fact_transactions_tenant ON fact_transactions(tenant_id);
+
+-- ============================================================================
+-- Partition Creation
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION fact_partition_name(p_day DATE)
+RETURNS TEXT AS $$
+    SELECT 'fact_transactions_' || TO_CHAR(p_day, 'YYYY_MM_DD');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Create and attach the partition of one day; FALSE if it already exists.
+-- The partition is built standalone with copies of the parent's indexes and
+-- a CHECK matching its bounds, so ATTACH adopts the indexes, skips the
+-- validation scan and only takes a SHARE UPDATE EXCLUSIVE lock on
+-- fact_transactions: loads into other partitions keep running.
+CREATE OR REPLACE FUNCTION ensure_fact_partition(p_day DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    partition_name TEXT := fact_partition_name(p_day);
+    bounds_check TEXT := partition_name || '_bounds';
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    -- Serialize creators (manager and ETL workers), then check again
+    PERFORM pg_advisory_xact_lock(hashtext('fact_transactions_partitions'));
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE fact_transactions INCLUDING ALL)', partition_name);
+    EXECUTE format(
+        'ALTER TABLE %I ADD CONSTRAINT %I CHECK (day >= %L AND day < %L)',
+        partition_name, bounds_check, p_day, p_day + 1
+    );
+    EXECUTE format(
+        'ALTER TABLE fact_transactions ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, p_day, p_day + 1
+    );
+    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', partition_name, bounds_check);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rows of a converted table go into their day partitions
+DO $$
+BEGIN
+    IF to_regclass('fact_transactions_unpartitioned') IS NOT NULL THEN
+        PERFORM ensure_fact_partition(day)
+        FROM (
+            SELECT DISTINCT (txn_time AT TIME ZONE 'UTC')::date AS day
+            FROM fact_transactions_unpartitioned
+        ) days;
+
+        INSERT INTO fact_transactions (
+            account_id, txn_id, amount, currency, mcc, channel, geom, city, country,
+            txn_time, day, status, created_at, tenant_id
+        )
+        SELECT account_id, txn_id, amount, currency, mcc, channel, geom, city, country,
+               txn_time, (txn_time AT TIME ZONE 'UTC')::date, status, created_at, tenant_id
+        FROM fact_transactions_unpartitioned;
+
+        DROP TABLE fact_transactions_unpartitioned;
+    END IF;
+END $$;
+
+SELECT ensure_fact_partition((NOW() AT TIME ZONE 'UTC')::date + i) FROM generate_series(0, 14) AS i;
+
+-- ============================================================================
+-- Archived Partitions
+-- ============================================================================
+
+-- One row per Parquet file written from a detached partition. A day can be
+-- archived more than once if late rows recreated its partition.
+CREATE TABLE IF NOT EXISTS fact_partition_archives (
+    partition_name TEXT NOT NULL,
+    day DATE NOT NULL,
+    path TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fact_partition_archives_day ON fact_partition_archives(day);
@@ -0,0 +1,74 @@
+-- Migration 021: Parquet Archive Tier
+-- Cold rows of fact_transactions (whole day partitions) and transactions
+-- (old rows nothing refers to and without a reference_id) are moved by the
+-- worker to Parquet files under
+-- ARCHIVE_DIR/<table>/tenant_id=<tenant>/day=<YYYY-MM-DD>/. archive_files is
+-- the catalog of committed files: a file is listed in the same commit that
+-- drops or deletes its rows, and the API's archive queries read only listed,
+-- current files, so hot and archived rows never overlap. The worker merges
+-- the small files of a tenant and day into one.
+
+-- ============================================================================
+-- Archive Catalog
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS archive_files (
+    table_name TEXT NOT NULL,
+    tenant_id VARCHAR(64),  -- NULL for rows without a tenant
+    day DATE NOT NULL,
+    path TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    archived_at TIMESTAMPTZ DEFAULT NOW(),
+    superseded_at TIMESTAMPTZ  -- merged into a compacted file; deleted after a grace period
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_files_table_day
+    ON archive_files(table_name, day);
+
+CREATE INDEX IF NOT EXISTS idx_archive_files_tenant_day
+    ON archive_files(table_name, tenant_id, day);
+
+-- Day-only fact archives of migration 020 stay readable under their paths
+DO $$
+BEGIN
+    IF to_regclass('fact_partition_archives') IS NOT NULL THEN
+        INSERT INTO archive_files (table_name, tenant_id, day, path, row_count, size_bytes, archived_at)
+        SELECT 'fact_transactions', NULL, day, path, row_count, size_bytes, archived_at
+        FROM fact_partition_archives
+        ON CONFLICT (path) DO NOTHING;
+
+        DROP TABLE fact_partition_archives;
+    END IF;
+END $$;
+
+-- ============================================================================
+-- transactions Archive Scan
+-- ============================================================================
+
+-- Archive batches take the oldest rows first. Rows with a reference_id are
+-- never archived: the ON CONFLICT (tenant_id, reference_id) dedupe of
+-- webhook/SDK replays and sync:<job>:<id> rows only checks hot rows, so an
+-- archived reference would be inserted again and exported twice.
+CREATE INDEX IF NOT EXISTS idx_transactions_txn_time_id
+    ON transactions(txn_time, id)
+    WHERE reference_id IS NULL;
+
+-- Alerts keep their transaction hot. fraud_schema.sql names the reference
+-- txn_id, the ingestion pipeline transaction_id; index whichever exist.
+DO $$
+DECLARE
+    reference_column TEXT;
+BEGIN
+    FOR reference_column IN
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = 'fraud_alerts'::regclass
+          AND attname IN ('txn_id', 'transaction_id')
+          AND NOT attisdropped
+    LOOP
+        EXECUTE format(
+            'CREATE INDEX IF NOT EXISTS %I ON fraud_alerts(%I)',
+            'idx_fraud_alerts_' || reference_column, reference_column
+        );
+    END LOOP;
+END $$;
@@ -0,0 +1,79 @@
+-- Migration 022: Rollup Rebuild Keeps Archived History
+-- Partitions past retention are archived to Parquet and dropped (migrations
+-- 020 and 021), but the OLAP rollups keep their history. A full rebuild from
+-- fact_transactions would therefore erase every archived day from them.
+--
+-- rebuild_olap_rollups() now recomputes only what fact_transactions still
+-- holds in full:
+--   * with no archived fact partitions, everything is rebuilt as before;
+--   * otherwise the day-keyed rollups (agg_amount_buckets_hourly,
+--     agg_velocity_by_account, agg_daily_hour_stats) are deleted and rebuilt
+--     for the days in fact_transactions that have no archive file (a day with
+--     late rows loaded after its archive is left as it is), and the all-time
+--     rollups (agg_time_of_day_stats, agg_time_of_day_amounts), which can't
+--     be split by day, are kept unchanged.
+
+CREATE OR REPLACE FUNCTION rebuild_olap_rollups()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE agg_amount_buckets_hourly, agg_velocity_by_account, agg_time_of_day_stats,
+               agg_time_of_day_amounts, agg_daily_hour_stats IN EXCLUSIVE MODE;
+
+    IF NOT EXISTS (SELECT 1 FROM archive_files WHERE table_name = 'fact_transactions') THEN
+        TRUNCATE agg_amount_buckets_hourly, agg_velocity_by_account, agg_time_of_day_stats,
+                 agg_time_of_day_amounts, agg_daily_hour_stats;
+
+        INSERT INTO agg_time_of_day_stats (hour, total_txns, amount_count, sum_amount, sum_sq_amount, min_amount, max_amount)
+        SELECT hour, COUNT(*), COUNT(amount), COALESCE(SUM(amount), 0), COALESCE(SUM(amount * amount), 0),
+               MIN(amount), MAX(amount)
+        FROM fact_transactions
+        GROUP BY hour;
+
+        INSERT INTO agg_time_of_day_amounts (hour, amount_bin, txn_count)
+        SELECT hour, olap_amount_bin(amount), COUNT(*)
+        FROM fact_transactions
+        WHERE amount IS NOT NULL
+        GROUP BY 1, 2;
+    ELSE
+        RAISE NOTICE 'fact_transactions has archived days: rebuilding day-keyed rollups of hot days only, '
+                     'agg_time_of_day_stats and agg_time_of_day_amounts are kept';
+    END IF;
+
+    DROP TABLE IF EXISTS rebuild_days;
+    CREATE TEMP TABLE rebuild_days ON COMMIT DROP AS
+    SELECT DISTINCT day FROM fact_transactions
+    EXCEPT
+    SELECT day FROM archive_files WHERE table_name = 'fact_transactions';
+
+    DELETE FROM agg_amount_buckets_hourly
+    WHERE (hour AT TIME ZONE 'UTC')::date IN (SELECT day FROM rebuild_days);
+
+    INSERT INTO agg_amount_buckets_hourly (hour, bucket, txn_count, total_amount)
+    SELECT DATE_TRUNC('hour', txn_time), olap_amount_bucket(amount), COUNT(*), COALESCE(SUM(amount), 0)
+    FROM fact_transactions
+    WHERE day IN (SELECT day FROM rebuild_days)
+    GROUP BY 1, 2;
+
+    DELETE FROM agg_velocity_by_account
+    WHERE (hour_window AT TIME ZONE 'UTC')::date IN (SELECT day FROM rebuild_days);
+
+    INSERT INTO agg_velocity_by_account (account_id, hour_window, txn_count, p95_amount, p95_stale)
+    SELECT account_id, DATE_TRUNC('hour', txn_time), COUNT(*),
+           PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY amount), FALSE
+    FROM fact_transactions
+    WHERE account_id IS NOT NULL
+      AND day IN (SELECT day FROM rebuild_days)
+    GROUP BY 1, 2;
+
+    DELETE FROM agg_daily_hour_stats
+    WHERE day IN (SELECT day FROM rebuild_days);
+
+    INSERT INTO agg_daily_hour_stats (day, hour, amount_count, sum_amount, sum_sq_amount)
+    SELECT day, hour, COUNT(amount), COALESCE(SUM(amount), 0), COALESCE(SUM(amount * amount), 0)
+    FROM fact_transactions
+    WHERE day IN (SELECT day FROM rebuild_days)
+    GROUP BY day, hour;
+
+    DROP TABLE rebuild_days;
+END;
+$$ LANGUAGE plpgsql;
@@ -54,21 +54,22 @@ CREATE TABLE fact_transactions (
     city VARCHAR(64),
     country VARCHAR(64),
     txn_time TIMESTAMPTZ NOT NULL,
-    day DATE GENERATED ALWAYS AS (DATE(txn_time)) STORED,
-    hour SMALLINT GENERATED ALWAYS AS (EXTRACT(HOUR FROM txn_time)) STORED,
+    day DATE NOT NULL,  -- UTC date of txn_time, set by the loader (partition key)
+    hour SMALLINT GENERATED ALWAYS AS (EXTRACT(HOUR FROM txn_time AT TIME ZONE 'UTC')) STORED,
     status VARCHAR(16),
     created_at TIMESTAMPTZ DEFAULT NOW(),
     PRIMARY KEY (txn_id, day)
 ) PARTITION BY RANGE (day);
 
--- Create partitions for last 30 days
+-- Initial partitions; the worker's partition manager keeps the window
+-- rolling and archives old days (migration 020)
 DO $$
 DECLARE
     partition_date DATE;
     partition_name TEXT;
 BEGIN
-    FOR i IN 0..60 LOOP
-        partition_date := CURRENT_DATE + i;
+    FOR i IN -1..14 LOOP
+        partition_date := (NOW() AT TIME ZONE 'UTC')::date + i;
         partition_name := 'fact_transactions_' || TO_CHAR(partition_date, 'YYYY_MM_DD');
         
         EXECUTE format('
@@ -21,9 +21,11 @@ ON CONFLICT (date_key) DO NOTHING;
 
 -- Sample fact data (ETL will populate this from Oracle)
 -- Just inserting a few reference rows for now
-INSERT INTO fact_transactions (account_id, txn_id, amount, currency, city, country, txn_time, status)
-VALUES 
+INSERT INTO fact_transactions (account_id, txn_id, amount, currency, city, country, txn_time, day, status)
+SELECT account_id, txn_id, amount, currency, city, country, txn_time, (txn_time AT TIME ZONE 'UTC')::date, status
+FROM (VALUES 
     (1, 1001, 25.50, 'USD', 'NYC', 'US', NOW() - INTERVAL '2 hours', 'APPROVED'),
     (2, 1002, 120.00, 'USD', 'NYC', 'US', NOW() - INTERVAL '3 hours', 'APPROVED'),
-    (2, 1003, 350.00, 'USD', 'LA', 'US', NOW() - INTERVAL '2 hours', 'REVIEW');
+    (2, 1003, 350.00, 'USD', 'LA', 'US', NOW() - INTERVAL '2 hours', 'REVIEW')
+) AS seed(account_id, txn_id, amount, currency, city, country, txn_time, status);
 
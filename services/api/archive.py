@@ -0,0 +1,73 @@
+"""
+Query layer over the Parquet archive tier
+
+The worker moves cold fact_transactions partitions and old transactions rows
+to Parquet files and lists each file in archive_files in the same commit
+that removes its rows. Listing files and reading hot rows in one snapshot
+therefore sees every row exactly once. Archived rows are scanned with an
+in-memory DuckDB over a view named `archive`.
+"""
+import duckdb
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FETCH_ROWS = 10000
+
+
+def archived_files_by_day(cursor, table: str, date_from, date_to, tenant_id=None) -> dict:
+    """Current archive files of a table for days date_from..date_to, by day in order"""
+    query = """
+        SELECT day, path FROM archive_files
+        WHERE table_name = %s
+          AND day BETWEEN %s AND %s
+          AND superseded_at IS NULL
+    """
+    params = [table, date_from, date_to]
+    if tenant_id is not None:
+        query += " AND tenant_id = %s"
+        params.append(tenant_id)
+
+    cursor.execute(query + " ORDER BY day, path", params)
+    files = {}
+    for day, path in cursor.fetchall():
+        files.setdefault(day, []).append(path)
+    return files
+
+
+def archived_files(cursor, table: str, date_from, date_to, tenant_id=None) -> list:
+    """Current archive files of a table covering days date_from..date_to"""
+    files = archived_files_by_day(cursor, table, date_from, date_to, tenant_id)
+    return [path for paths in files.values() for path in paths]
+
+
+def _connect(files):
+    conn = duckdb.connect()
+    conn.read_parquet(files).create_view('archive')
+    return conn
+
+
+def query_archive(files: list, query: str, params=None) -> list:
+    """Run a query over the `archive` view of the given files"""
+    if not files:
+        return []
+
+    conn = _connect(files)
+    try:
+        return conn.execute(query, params or []).fetchall()
+    finally:
+        conn.close()
+
+
+def iter_archive(files: list, query: str, params=None):
+    """Like query_archive, yielding rows in chunks for large results"""
+    if not files:
+        return
+
+    conn = _connect(files)
+    try:
+        result = conn.execute(query, params or [])
+        while rows := result.fetchmany(ARCHIVE_FETCH_ROWS):
+            yield from rows
+    finally:
+        conn.close()
@@ -19,6 +19,12 @@ class UsageMetering:
     
     async def record_transaction(self, tenant_id: str, transaction_id: int):
         """Record a transaction for billing"""
+        await self.record_transactions(tenant_id, 1)
+    
+    async def record_transactions(self, tenant_id: str, count: int):
+        """Record several transactions for billing with one counter update"""
+        if count <= 0:
+            return
         cursor = self.db.cursor()
         try:
             # Update usage counter
@@ -32,19 +38,19 @@ class UsageMetering:
                     %s,
                     DATE_TRUNC('month', CURRENT_DATE),
                     DATE_TRUNC('month', CURRENT_DATE) + INTERVAL '1 month' - INTERVAL '1 day',
-                    1
+                    %s
                 )
                 ON CONFLICT (tenant_id, period_start)
                 DO UPDATE SET
-                    transaction_count = tenant_usage.transaction_count + 1,
+                    transaction_count = tenant_usage.transaction_count + EXCLUDED.transaction_count,
                     updated_at = CURRENT_TIMESTAMP
-            """, (tenant_id,))
+            """, (tenant_id, count))
             
             self.db.commit()
-            logger.debug(f"Recorded transaction for tenant {tenant_id}")
+            logger.debug(f"Recorded {count} transactions for tenant {tenant_id}")
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Failed to record transaction: {e}")
+            logger.error(f"Failed to record transactions: {e}")
             raise
         finally:
             cursor.close()
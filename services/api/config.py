@@ -59,6 +59,27 @@ class Settings(BaseSettings):
     vault_addr: Optional[str] = None
     vault_token: Optional[str] = None
     
+    # Data ingestion
+    upload_spool_dir: Optional[str] = None  # Temp dir for spooled uploads (system default if unset)
+    upload_max_concurrent_jobs: int = 4  # Loader connections across all upload jobs
+    upload_max_jobs_per_tenant: int = 2
+    upload_parallel_workers: int = 4  # Processes (and slots) per large CSV upload; 1 disables parallel mode
+    upload_parallel_min_bytes: int = 256 * 1024 * 1024
+    ingest_batch_max_size: int = 500  # Single ingests grouped into one commit
+    ingest_batch_max_wait_ms: float = 5.0  # How long a micro-batch stays open
+    ingest_batch_workers: int = 2  # Flush loops (one connection each)
+    webhook_queue_consumers: int = 2  # Consumer loops in the API; 0 = run `python -m ingestion.webhook_queue` instead
+    webhook_queue_batch_size: int = 200
+    webhook_queue_poll_seconds: float = 1.0
+    webhook_queue_max_attempts: int = 5
+    sync_fetch_arraysize: int = 5000  # Rows per fetchmany when streaming from customer databases
+    sync_scheduler_max_concurrency: int = 16  # Syncs running at once per scheduler process
+    sync_scheduler_tenant_concurrency: int = 2  # Syncs running at once per tenant
+    sync_scheduler_poll_seconds: float = 5.0
+    sync_scheduler_lease_seconds: int = 300
+    sync_backfill_connections: int = 4  # Parallel source connections for a first (full) sync; 1 = sequential
+    sync_backfill_ranges: int = 16  # Key ranges a backfill is split into
+    
     # Feature Flags
     enable_sso: bool = False
     enable_mfa: bool = True
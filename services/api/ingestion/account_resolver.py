@@ -0,0 +1,153 @@
+"""
+Account Resolver
+Maps source account identifiers (customer_id, or our numeric account id)
+to accounts.id for a whole batch at once, creating missing accounts
+"""
+from collections import OrderedDict
+from typing import Optional, Dict, Iterable, List, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AccountResolver:
+    """
+    Set-based customer_id -> accounts.id resolution with a per-tenant LRU
+
+    resolve() runs on the caller's cursor so account creation is part of
+    the caller's transaction. Newly created ids go into the caller's own
+    `pending` dict and are only cached once the caller reports that
+    transaction committed (commit_pending), so neither a rollback nor
+    another caller's commit leaves ids in the cache that do not exist.
+    """
+
+    def __init__(self, max_accounts_per_tenant: int = 100_000):
+        self.max_accounts_per_tenant = max_accounts_per_tenant
+        self._cache: Dict[str, "OrderedDict[str, int]"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(
+        self,
+        cursor,
+        tenant_id: str,
+        account_keys: Iterable,
+        pending: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> Dict[str, int]:
+        """
+        Resolve account keys for one tenant
+
+        Keys are matched against customer_id first, then (for numeric keys)
+        against accounts.id. Keys matching neither become new accounts,
+        recorded in `pending` ({tenant_id: {account_key: id}}) for
+        commit_pending; without it they are not cached.
+
+        Returns: {account_key: accounts.id}
+        """
+        keys = {str(key).strip() for key in account_keys if key is not None}
+        keys.discard('')
+        if not keys:
+            return {}
+
+        resolved: Dict[str, int] = {}
+        with self._lock:
+            cache = self._cache.setdefault(tenant_id, OrderedDict())
+            for key in keys:
+                account_id = cache.get(key)
+                if account_id is not None:
+                    cache.move_to_end(key)
+                    resolved[key] = account_id
+            self.hits += len(resolved)
+
+        missing = sorted(keys - resolved.keys())
+        if not missing:
+            return resolved
+        with self._lock:
+            self.misses += len(missing)
+
+        found = self._lookup(cursor, tenant_id, missing)
+        created = self._create(cursor, tenant_id, [key for key in missing if key not in found])
+        if created:
+            logger.debug(f"Created {len(created)} accounts for tenant {tenant_id}")
+
+        with self._lock:
+            self._store(tenant_id, found.items())
+        if pending is not None:
+            pending.setdefault(tenant_id, {}).update(created)
+
+        resolved.update(found)
+        resolved.update(created)
+        return resolved
+
+    def commit_pending(self, pending: Dict[str, Dict[str, int]]):
+        """Cache the accounts a caller created once its transaction committed"""
+        with self._lock:
+            for tenant_id, accounts in pending.items():
+                self._store(tenant_id, accounts.items())
+        pending.clear()
+
+    def invalidate(self, tenant_id: Optional[str] = None):
+        """Drop cached mappings for one tenant, or all tenants"""
+        with self._lock:
+            if tenant_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(tenant_id, None)
+
+    def _lookup(self, cursor, tenant_id: str, keys: List[str]) -> Dict[str, int]:
+        numeric_ids = [int(key) for key in keys if key.isdigit() and len(key) < 10]
+        cursor.execute("""
+            SELECT customer_id, id
+            FROM accounts
+            WHERE tenant_id = %s
+            AND (customer_id = ANY(%s) OR id = ANY(%s))
+        """, (tenant_id, keys, numeric_ids))
+
+        wanted = set(keys)
+        by_customer: Dict[str, int] = {}
+        by_id: Dict[str, int] = {}
+        for customer_id, account_id in cursor.fetchall():
+            if customer_id in wanted:
+                by_customer.setdefault(customer_id, account_id)
+            by_id[str(account_id)] = account_id
+
+        # customer_id matches win over id matches, as in the per-row lookup
+        found = {key: by_id[key] for key in keys if key in by_id}
+        found.update(by_customer)
+        return found
+
+    def _create(self, cursor, tenant_id: str, keys: List[str]) -> Dict[str, int]:
+        if not keys:
+            return {}
+        # DO UPDATE (not DO NOTHING) so rows created concurrently by another
+        # loader are still returned
+        cursor.execute("""
+            INSERT INTO accounts (customer_id, tenant_id, status)
+            SELECT customer_id, %s, 'ACTIVE'
+            FROM unnest(%s::text[]) AS k(customer_id)
+            ON CONFLICT (tenant_id, customer_id)
+            DO UPDATE SET customer_id = EXCLUDED.customer_id
+            RETURNING customer_id, id
+        """, (tenant_id, keys))
+        return {customer_id: account_id for customer_id, account_id in cursor.fetchall()}
+
+    def _store(self, tenant_id: str, items: Iterable[Tuple[str, int]]):
+        cache = self._cache.setdefault(tenant_id, OrderedDict())
+        for key, account_id in items:
+            cache[key] = account_id
+            cache.move_to_end(key)
+        while len(cache) > self.max_accounts_per_tenant:
+            cache.popitem(last=False)
+
+
+# Global resolver instance
+_account_resolver: Optional[AccountResolver] = None
+
+def get_account_resolver() -> AccountResolver:
+    """Get or create the process-wide account resolver"""
+    global _account_resolver
+    if _account_resolver is None:
+        _account_resolver = AccountResolver()
+    return _account_resolver
@@ -0,0 +1,236 @@
+"""
+Bulk Transaction Loader
+Loads normalized transaction rows with COPY into a staging table and
+moves them into `transactions` with set-based SQL
+"""
+from typing import Optional, Dict, List, Iterable, Sequence, Callable
+import io
+import logging
+
+import pandas as pd
+
+from .account_resolver import AccountResolver, get_account_resolver
+
+logger = logging.getLogger(__name__)
+
+# Column order of rows passed to BulkTransactionLoader.load_rows
+STAGING_COLUMNS = (
+    'row_num', 'account_key', 'amount', 'currency', 'merchant',
+    'mcc', 'channel', 'city', 'country', 'txn_time'
+)
+
+# Optional extra staging column: a source key stored as reference_id, so a
+# row loaded again (e.g. a retried connector sync) is skipped, not duplicated
+SOURCE_KEY_COLUMN = 'reference_id'
+
+# Rows matching any of these are moved to ingestion_rejects instead of
+# failing the whole set-based INSERT
+REJECT_REASON_SQL = """
+    CASE
+        WHEN account_key IS NULL OR account_key = '' THEN 'Missing account_id'
+        WHEN length(account_key) > 64 THEN 'account_id must be <= 64 characters'
+        WHEN amount IS NULL OR amount = 'NaN' THEN 'Invalid amount'
+        WHEN abs(amount) >= 1e13 THEN 'amount out of range'
+        WHEN txn_time IS NULL THEN 'Invalid transaction_date'
+        WHEN merchant IS NULL OR merchant = '' THEN 'Missing merchant'
+        WHEN length(merchant) > 128 THEN 'merchant must be <= 128 characters'
+        WHEN length(mcc) > 4 THEN 'mcc must be <= 4 characters'
+        WHEN length(city) > 64 THEN 'city must be <= 64 characters'
+        WHEN length(country) > 2 THEN 'country must be an ISO code'
+        WHEN length(reference_id) > 128 THEN 'reference_id must be <= 128 characters'
+        WHEN currency !~ '^[A-Z]{3}$' THEN 'Invalid currency: ' || currency
+        WHEN channel IS NOT NULL AND channel NOT IN ('ATM', 'POS', 'ONLINE', 'MOBILE', 'PHONE')
+            THEN 'Invalid channel: ' || channel
+    END
+"""
+
+
+class BulkTransactionLoader:
+    """COPY-based loader for large batches of transactions"""
+
+    def __init__(self, db_connection, account_resolver: Optional[AccountResolver] = None):
+        self.db = db_connection
+        self.account_resolver = account_resolver or get_account_resolver()
+
+    def load_rows(
+        self,
+        tenant_id: str,
+        rows: Iterable[Sequence],
+        upload_id: Optional[int] = None,
+        columns: Sequence[str] = STAGING_COLUMNS,
+        sync_job_id: Optional[int] = None,
+        status: str = 'PENDING',
+        before_commit: Optional[Callable] = None
+    ) -> Dict:
+        """
+        Load one batch of normalized rows in a single transaction
+
+        Rows are tuples in `columns` order: STAGING_COLUMNS, optionally
+        followed by SOURCE_KEY_COLUMN. Invalid rows are written to
+        ingestion_rejects; valid rows are inserted into transactions, except
+        those whose source key the tenant already has. before_commit(cursor)
+        runs inside the same transaction, e.g. to advance a sync watermark.
+
+        Returns: {"rows_inserted", "rows_failed", "errors"}
+        """
+        def copy_rows(cursor):
+            with cursor.copy(
+                f"COPY ingest_staging ({', '.join(columns)}) FROM STDIN"
+            ) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+        return self._load(
+            tenant_id, upload_id, copy_rows,
+            sync_job_id=sync_job_id, status=status, before_commit=before_commit
+        )
+
+    def load_frame(
+        self,
+        tenant_id: str,
+        frame: pd.DataFrame,
+        upload_id: Optional[int] = None
+    ) -> Dict:
+        """
+        Load one batch given as a DataFrame with STAGING_COLUMNS
+
+        The frame is serialized to CSV by pandas in one call and streamed
+        to COPY, so no Python code runs per row.
+
+        Returns: {"rows_inserted", "rows_failed", "errors"}
+        """
+        def copy_frame(cursor):
+            buffer = io.StringIO()
+            frame.to_csv(
+                buffer,
+                columns=list(STAGING_COLUMNS),
+                header=False,
+                index=False,
+                date_format='%Y-%m-%d %H:%M:%S.%f'
+            )
+            with cursor.copy(
+                f"COPY ingest_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+            ) as copy:
+                copy.write(buffer.getvalue())
+
+        return self._load(tenant_id, upload_id, copy_frame)
+
+    def _load(
+        self,
+        tenant_id: str,
+        upload_id: Optional[int],
+        copy_into_staging: Callable,
+        sync_job_id: Optional[int] = None,
+        status: str = 'PENDING',
+        before_commit: Optional[Callable] = None
+    ) -> Dict:
+        cursor = self.db.cursor()
+        pending_accounts: Dict[str, Dict[str, int]] = {}
+        try:
+            self._create_staging(cursor)
+            copy_into_staging(cursor)
+
+            errors = self._reject_invalid(cursor, tenant_id, upload_id, sync_job_id)
+            accounts = self._resolve_accounts(cursor, tenant_id, pending_accounts)
+
+            cursor.execute("SAVEPOINT before_insert")
+            try:
+                rows_inserted = self._insert_transactions(cursor, tenant_id, accounts, upload_id, status)
+            except Exception as e:
+                # A constraint we do not pre-check failed; reject the batch
+                cursor.execute("ROLLBACK TO SAVEPOINT before_insert")
+                logger.warning(f"Set-based insert failed, rejecting batch: {e}")
+                errors.extend(self._reject_all(cursor, tenant_id, upload_id, sync_job_id, str(e)))
+                rows_inserted = 0
+
+            if before_commit:
+                before_commit(cursor)
+            self.db.commit()
+            self.account_resolver.commit_pending(pending_accounts)
+
+            return {
+                "rows_inserted": rows_inserted,
+                "rows_failed": len(errors),
+                "errors": errors
+            }
+
+        except Exception:
+            # Accounts created in this transaction are never cached
+            self.db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _create_staging(self, cursor):
+        cursor.execute("""
+            CREATE TEMP TABLE ingest_staging (
+                row_num INTEGER,
+                account_key TEXT,
+                amount NUMERIC,
+                currency TEXT,
+                merchant TEXT,
+                mcc TEXT,
+                channel TEXT,
+                city TEXT,
+                country TEXT,
+                txn_time TIMESTAMP,
+                reference_id TEXT
+            ) ON COMMIT DROP
+        """)
+
+    def _reject_invalid(
+        self, cursor, tenant_id: str, upload_id: Optional[int], sync_job_id: Optional[int] = None
+    ) -> List[Dict]:
+        """Move rows that would violate constraints into ingestion_rejects"""
+        cursor.execute(f"""
+            WITH rejected AS (
+                DELETE FROM ingest_staging s
+                WHERE ({REJECT_REASON_SQL}) IS NOT NULL
+                RETURNING s.row_num, ({REJECT_REASON_SQL}) AS reason, to_jsonb(s) AS raw_row
+            )
+            INSERT INTO ingestion_rejects (tenant_id, upload_id, sync_job_id, row_number, error, raw_row)
+            SELECT %s, %s, %s, row_num, reason, raw_row FROM rejected
+            RETURNING row_number, error
+        """, (tenant_id, upload_id, sync_job_id))
+        return [{"row": row[0], "error": row[1]} for row in cursor.fetchall()]
+
+    def _reject_all(
+        self, cursor, tenant_id: str, upload_id: Optional[int], sync_job_id: Optional[int], error: str
+    ) -> List[Dict]:
+        cursor.execute("""
+            INSERT INTO ingestion_rejects (tenant_id, upload_id, sync_job_id, row_number, error, raw_row)
+            SELECT %s, %s, %s, row_num, %s, to_jsonb(s) FROM ingest_staging s
+            RETURNING row_number, error
+        """, (tenant_id, upload_id, sync_job_id, error))
+        return [{"row": row[0], "error": row[1]} for row in cursor.fetchall()]
+
+    def _resolve_accounts(self, cursor, tenant_id: str, pending: Dict) -> Dict[str, int]:
+        """Resolve (and create) the batch's distinct accounts in one pass"""
+        cursor.execute("SELECT DISTINCT account_key FROM ingest_staging")
+        return self.account_resolver.resolve(
+            cursor, tenant_id, (row[0] for row in cursor.fetchall()), pending
+        )
+
+    def _insert_transactions(
+        self, cursor, tenant_id: str, accounts: Dict[str, int], upload_id: Optional[int],
+        status: str = 'PENDING'
+    ) -> int:
+        # Uploads stay PENDING until the post-load scoring stage (bulk_scorer);
+        # rows whose reference_id the tenant already has are skipped
+        cursor.execute("""
+            INSERT INTO transactions (
+                tenant_id, account_id, amount, currency,
+                merchant, mcc, channel, city, country,
+                txn_time, upload_id, reference_id, status
+            )
+            SELECT
+                %s, acc.account_id, s.amount, s.currency,
+                s.merchant, s.mcc, s.channel, s.city, s.country,
+                s.txn_time, %s, s.reference_id, %s
+            FROM ingest_staging s
+            JOIN unnest(%s::text[], %s::int[]) AS acc(account_key, account_id)
+                ON acc.account_key = s.account_key
+            ORDER BY s.row_num
+            ON CONFLICT (tenant_id, reference_id) WHERE reference_id IS NOT NULL DO NOTHING
+        """, (tenant_id, upload_id, status, list(accounts.keys()), list(accounts.values())))
+        return cursor.rowcount
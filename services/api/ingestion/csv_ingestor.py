@@ -3,13 +3,140 @@ CSV File Ingestion
 Handles bulk upload of transaction data via CSV/Excel files
 """
 import pandas as pd
+import numpy as np
+import openpyxl
 import io
-from typing import Optional, Dict, List
+import itertools
+from typing import Optional, Dict, List, Iterable, Iterator, Callable
 from datetime import datetime
 import logging
 
+from .bulk_loader import BulkTransactionLoader
+
 logger = logging.getLogger(__name__)
 
+# Rows read by validate_file (header + first chunk)
+VALIDATION_ROWS = 1000
+
+# transaction_date formats tried in order; ISO8601 also covers offsets and fractions
+DATE_FORMATS = [
+    'ISO8601',
+    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y',
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+    '%Y/%m/%d %H:%M:%S', '%Y/%m/%d',
+]
+
+# Rows per chunk of the transaction_date scan that settles an ambiguous format
+DATE_SCAN_ROWS = 100000
+
+# Common country name mappings to ISO codes
+COUNTRY_MAPPING = {
+    'USA': 'US', 'UNITED STATES': 'US', 'U.S.A': 'US',
+    'UK': 'GB', 'UNITED KINGDOM': 'GB', 'U.K.': 'GB',
+    'INDIA': 'IN',
+    'CANADA': 'CA',
+    'AUSTRALIA': 'AU',
+    'GERMANY': 'DE',
+    'FRANCE': 'FR',
+    'JAPAN': 'JP',
+    'CHINA': 'CN',
+    'BRAZIL': 'BR',
+    'MEXICO': 'MX',
+    'SPAIN': 'ES',
+    'ITALY': 'IT'
+}
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    """Strip a column as strings, mapping blanks and NaN to NA"""
+    if pd.api.types.is_float_dtype(series):
+        # Numeric codes/IDs in a column with blanks come back as floats (5411.0)
+        values = series.dropna()
+        if np.isfinite(values).all() and (values % 1 == 0).all():
+            series = series.astype('Int64')
+    series = series.astype('string').str.strip()
+    return series.mask(series == '')
+
+
+def _normalize_country(series: pd.Series) -> pd.Series:
+    """Database column is VARCHAR(2): map common names, else truncate"""
+    values = _clean_text(series).str.upper()
+    # Map each distinct value once instead of once per row
+    codes, uniques = pd.factorize(values)
+    lookup = np.array(
+        [COUNTRY_MAPPING.get(value, value[:2]) for value in uniques] + [None],
+        dtype=object
+    )
+    return pd.Series(lookup[codes], index=series.index)
+
+
+def _normalize_currency(series: pd.Series) -> pd.Series:
+    """Database column is VARCHAR(3); the bulk loader rejects non-ISO codes"""
+    return _clean_text(series).str.upper().str[:3].fillna('USD')
+
+
+def _normalize_mcc(series: pd.Series) -> pd.Series:
+    values = _clean_text(series)
+    digits = values.str.fullmatch(r'\d+').fillna(False).astype(bool)
+    return values.where(~digits, values.str.zfill(4)).fillna('0000')
+
+
+def _date_format_candidates(series: pd.Series) -> List[str]:
+    """
+    DATE_FORMATS entries that parse every value of series
+
+    A format reading the values as the same dates as an earlier one is
+    left out, so more than one candidate means the values are ambiguous
+    (e.g. 01/02/2025 as month-first and day-first).
+    """
+    values = series.dropna()
+    if not len(values) or not all(isinstance(value, str) for value in values):
+        return []
+    candidates, readings = [], []
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = pd.to_datetime(values, format=date_format)
+        except (ValueError, TypeError):
+            continue
+        if not any(parsed.equals(reading) for reading in readings):
+            candidates.append(date_format)
+            readings.append(parsed)
+    return candidates
+
+
+def _pick_date_format(series: pd.Series) -> Optional[str]:
+    """The one format that fits series, or None when none or several do"""
+    candidates = _date_format_candidates(series)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _strip(series: pd.Series) -> pd.Series:
+    return series.str.strip() if series.dtype == object else series
+
+
+def _best_date_format(series: pd.Series) -> Optional[str]:
+    """The format reading the most values of series, or None if none or a tie reads them differently"""
+    if not all(isinstance(value, str) for value in series.dropna()):
+        return None
+    best, best_reading, tied = None, None, False
+    for date_format in DATE_FORMATS:
+        reading = pd.to_datetime(series, format=date_format, errors='coerce')
+        count = int(reading.notna().sum())
+        if not count:
+            continue
+        if best is None or count > best_reading.notna().sum():
+            best, best_reading, tied = date_format, reading, False
+        elif count == best_reading.notna().sum() and not reading.equals(best_reading):
+            tied = True
+    return None if tied else best
+
+
+def _to_utc_naive(parsed: pd.Series) -> pd.Series:
+    if getattr(parsed.dt, 'tz', None) is not None:
+        # Staging column is TIMESTAMP; store UTC like the row path did
+        return parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+    return parsed
+
 
 class CSVIngestor:
     """Handles CSV/Excel file ingestion"""
@@ -22,58 +149,41 @@ class CSVIngestor:
         self.optional_columns = [
             'currency', 'mcc', 'channel', 'city', 'country', 'device_id'
         ]
+        # Format of transaction_date, from detect_date_format or the first chunk
+        self._date_format: Optional[str] = None
     
-    async def validate_file(self, file_content: bytes, file_type: str = 'csv') -> Dict:
+    async def validate_file(
+        self,
+        file_content: Optional[bytes] = None,
+        file_type: str = 'csv',
+        file_path: Optional[str] = None
+    ) -> Dict:
         """
         Validate CSV/Excel file format
         
+        Returns validation result
+        """
+        return self.validate(file_content, file_type, file_path)
+    
+    def validate(
+        self,
+        file_content: Optional[bytes] = None,
+        file_type: str = 'csv',
+        file_path: Optional[str] = None
+    ) -> Dict:
+        """
+        Validate CSV/Excel file format (blocking)
+        
+        Only the header and first chunk are read, so this is cheap for any file size.
         Returns validation result
         """
         try:
-            # Read file based on type
-            if file_type == 'csv':
-                df = pd.read_csv(io.BytesIO(file_content))
-            elif file_type in ['xlsx', 'xls']:
-                df = pd.read_excel(io.BytesIO(file_content))
-            else:
-                return {"valid": False, "error": f"Unsupported file type: {file_type}"}
-            
-            # Check required columns
-            missing_columns = [col for col in self.required_columns if col not in df.columns]
-            
-            if missing_columns:
-                return {
-                    "valid": False,
-                    "error": f"Missing required columns: {', '.join(missing_columns)}",
-                    "required_columns": self.required_columns,
-                    "found_columns": list(df.columns)
-                }
-            
-            # Validate data types
-            validation_errors = []
-            
-            # Check amount is numeric
-            if not pd.api.types.is_numeric_dtype(df['amount']):
-                validation_errors.append("'amount' column must be numeric")
-            
-            # Check date format
-            try:
-                pd.to_datetime(df['transaction_date'])
-            except:
-                validation_errors.append("'transaction_date' must be valid date format")
-            
-            if validation_errors:
-                return {
-                    "valid": False,
-                    "errors": validation_errors
-                }
-            
-            return {
-                "valid": True,
-                "row_count": len(df),
-                "columns": list(df.columns),
-                "sample_rows": df.head(5).to_dict('records')
-            }
+            with self._open_source(file_content, file_path) as source:
+                first_chunk = next(self._read_chunks(source, file_type, VALIDATION_ROWS))
+            validation = self._validate_chunk(first_chunk)
+            if validation['valid']:
+                validation['sample_rows'] = first_chunk.head(5).to_dict('records')
+            return validation
             
         except Exception as e:
             logger.error(f"File validation failed: {e}")
@@ -82,204 +192,96 @@ class CSVIngestor:
     async def ingest_file(
         self,
         tenant_id: str,
-        file_content: bytes,
+        file_content: Optional[bytes] = None,
         file_type: str = 'csv',
-        batch_size: int = 1000
+        batch_size: int = 10000,
+        upload_id: Optional[int] = None,
+        file_path: Optional[str] = None
     ) -> Dict:
         """
         Ingest CSV/Excel file into database
         
         Returns: Ingestion statistics
         """
+        return self.ingest(
+            tenant_id,
+            file_content=file_content,
+            file_type=file_type,
+            batch_size=batch_size,
+            upload_id=upload_id,
+            file_path=file_path
+        )
+    
+    def ingest(
+        self,
+        tenant_id: str,
+        file_content: Optional[bytes] = None,
+        file_type: str = 'csv',
+        batch_size: int = 10000,
+        upload_id: Optional[int] = None,
+        file_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Ingest CSV/Excel file into database (blocking)
+        
+        Reads the file (bytes or a path to a spooled upload) in chunks of
+        batch_size rows; each chunk is validated, normalized and loaded
+        before the next is read, so memory stays flat for any file size.
+        
+        progress_callback, if given, is called after every chunk with
+        rows_processed/rows_inserted/rows_failed and, for CSV, the
+        fraction of the file read so far.
+        
+        Returns: Ingestion statistics
+        """
+        self._date_format = None
         try:
-            # Validate first
-            validation = await self.validate_file(file_content, file_type)
-            if not validation['valid']:
-                return validation
-            
-            # Read file
-            if file_type == 'csv':
-                df = pd.read_csv(io.BytesIO(file_content))
-            else:
-                df = pd.read_excel(io.BytesIO(file_content))
-            
-            # Add tenant_id to all rows
-            df['tenant_id'] = tenant_id
-            logger.info(f"CSV ingestion: Using tenant_id={tenant_id}, rows to process={len(df)}")
-            
-            # Parse dates
-            df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-            
-            # Set defaults for optional columns
-            for col in self.optional_columns:
-                if col not in df.columns:
-                    df[col] = None
-            
-            # Insert in batches
-            cursor = self.db.cursor()
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            try:
-                cursor.execute("BEGIN")
-                
-                for start_idx in range(0, len(df), batch_size):
-                    end_idx = min(start_idx + batch_size, len(df))
-                    batch = df.iloc[start_idx:end_idx]
-                    
-                    for idx, row in batch.iterrows():
-                        # Create savepoint for each row to allow rollback on error
-                        cursor.execute("SAVEPOINT before_row")
-                        try:
-                            # Handle account_id: CSV may have customer_id strings like "ACC123"
-                            # We need to find or create the account and use its integer ID
-                            account_id_value = str(row['account_id']).strip()
-                            
-                            # Try to find existing account by customer_id or by ID if it's numeric
-                            cursor.execute("""
-                                SELECT id FROM accounts 
-                                WHERE (customer_id = %s OR (id::text = %s AND %s ~ '^[0-9]+$'))
-                                AND tenant_id = %s
-                                LIMIT 1
-                            """, (account_id_value, account_id_value, account_id_value, row['tenant_id']))
-                            
-                            account_result = cursor.fetchone()
-                            
-                            if account_result:
-                                # Account exists, use its ID
-                                account_id_int = account_result[0]
-                            else:
-                                # Account doesn't exist, create it
-                                cursor.execute("""
-                                    INSERT INTO accounts (customer_id, tenant_id, status)
-                                    VALUES (%s, %s, 'ACTIVE')
-                                    RETURNING id
-                                """, (account_id_value, row['tenant_id']))
-                                account_id_int = cursor.fetchone()[0]
-                                logger.debug(f"Created new account {account_id_int} for customer_id {account_id_value}")
-                            
-                            # Map CSV columns to database columns
-                            # Note: transactions table does NOT have 'status' or 'device_id' columns
-                            
-                            # Handle country: database column is VARCHAR(2) for ISO country codes
-                            # Truncate to 2 characters if longer, or extract ISO code
-                            country_value = row.get('country')
-                            if country_value:
-                                country_value = str(country_value).strip().upper()
-                                # Common country name mappings to ISO codes
-                                country_mapping = {
-                                    'USA': 'US', 'UNITED STATES': 'US', 'U.S.A': 'US',
-                                    'UK': 'GB', 'UNITED KINGDOM': 'GB', 'U.K.': 'GB',
-                                    'INDIA': 'IN',
-                                    'CANADA': 'CA',
-                                    'AUSTRALIA': 'AU',
-                                    'GERMANY': 'DE',
-                                    'FRANCE': 'FR',
-                                    'JAPAN': 'JP',
-                                    'CHINA': 'CN',
-                                    'BRAZIL': 'BR',
-                                    'MEXICO': 'MX',
-                                    'SPAIN': 'ES',
-                                    'ITALY': 'IT'
-                                }
-                                
-                                # Check mapping first
-                                if country_value in country_mapping:
-                                    country_value = country_mapping[country_value]
-                                # If still longer than 2, truncate to first 2 chars
-                                elif len(country_value) > 2:
-                                    country_value = country_value[:2]
-                                # If empty after strip, set to None
-                                if not country_value:
-                                    country_value = None
-                            else:
-                                country_value = None
-                            
-                            # Handle currency: database column is VARCHAR(3)
-                            currency_value = row.get('currency', 'USD')
-                            if currency_value:
-                                currency_value = str(currency_value).strip().upper()[:3]  # Max 3 chars
-                            else:
-                                currency_value = 'USD'
-                            
-                            # Verify tenant_id is set
-                            txn_tenant_id = row.get('tenant_id') or tenant_id
-                            if not txn_tenant_id:
-                                raise ValueError(f"Missing tenant_id for transaction row {success_count + error_count + 1}")
-                            
-                            cursor.execute("""
-                                INSERT INTO transactions (
-                                    tenant_id, account_id, amount, currency,
-                                    merchant, mcc, channel, city, country,
-                                    txn_time
-                                ) VALUES (
-                                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                                )
-                            """, (
-                                txn_tenant_id,
-                                account_id_int,  # Use integer account ID
-                                float(row['amount']),
-                                currency_value,
-                                row['merchant'],
-                                row.get('mcc', '0000'),
-                                row.get('channel', 'ONLINE'),
-                                row.get('city'),
-                                country_value,
-                                row['transaction_date']
-                            ))
-                            success_count += 1
-                            
-                            # Log first few insertions for debugging
-                            if success_count <= 3:
-                                logger.debug(f"Inserted transaction: account={account_id_int}, amount={row['amount']}, tenant={txn_tenant_id}")
-                        except Exception as e:
-                            error_count += 1
-                            # Calculate row number (1-based, including header)
-                            try:
-                                row_num = int(idx) + 2  # +2: idx is 0-based, +1 for header
-                            except:
-                                row_num = start_idx + len(errors) + 2
-                            
-                            error_msg = str(e)
-                            errors.append({
-                                "row": row_num,
-                                "error": error_msg
-                            })
-                            if len(errors) <= 10:  # Only keep first 10 errors
-                                logger.warning(f"Row {row_num} failed: {e}")
-                            # Rollback to savepoint to allow continuing with next row
-                            try:
-                                cursor.execute("ROLLBACK TO SAVEPOINT before_row")
-                            except Exception as savepoint_error:
-                                logger.debug(f"Savepoint rollback failed: {savepoint_error}")
-                                # If savepoint fails, we're in a bad state - break out
-                                break
-                
-                cursor.execute("COMMIT")
+            with self._open_source(file_content, file_path) as source:
+                file_size = source.seek(0, io.SEEK_END)
+                source.seek(0)
+                self._date_format = self.detect_date_format(source, file_type, batch_size)
+                source.seek(0)
+                chunks = self._read_chunks(source, file_type, batch_size)
                 
-                # Verify inserted data
-                cursor.execute("SELECT COUNT(*) FROM transactions WHERE tenant_id = %s", (tenant_id,))
-                inserted_count = cursor.fetchone()[0]
+                # Header and first chunk must be valid, otherwise nothing is loaded
+                first_chunk = next(chunks)
+                validation = self._validate_chunk(first_chunk)
+                if not validation['valid']:
+                    chunks.close()  # Release the reader before the source closes
+                    return {
+                        "success": False,
+                        "error": validation.get('error') or '; '.join(validation['errors']),
+                        **validation
+                    }
                 
-                logger.info(f"Ingested {success_count} transactions for tenant {tenant_id}")
-                logger.info(f"Verified: {inserted_count} total transactions now exist for tenant_id={tenant_id}")
+                logger.info(f"CSV ingestion: Using tenant_id={tenant_id}, batch_size={batch_size}")
                 
-                return {
-                    "success": True,
-                    "rows_processed": len(df),
-                    "rows_inserted": success_count,
-                    "rows_failed": error_count,
-                    "errors": errors[:10],  # First 10 errors
-                    "tenant_id": tenant_id  # Include tenant_id in response for debugging
-                }
+                def on_chunk(stats: Dict):
+                    if progress_callback:
+                        progress_callback({
+                            **stats,
+                            # Zipped Excel offsets say nothing about rows read
+                            "fraction_read": (
+                                min(source.tell() / file_size, 1.0)
+                                if file_type == 'csv' and file_size else None
+                            )
+                        })
                 
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                logger.error(f"Batch ingestion failed: {e}")
-                raise
-            finally:
-                cursor.close()
+                stats = self.load_chunks(
+                    tenant_id,
+                    itertools.chain([first_chunk], chunks),
+                    upload_id=upload_id,
+                    on_chunk=on_chunk
+                )
+            
+            logger.info(f"Ingested {stats['rows_inserted']} transactions for tenant {tenant_id}")
+            
+            return {
+                "success": True,
+                **stats,
+                "tenant_id": tenant_id  # Include tenant_id in response for debugging
+            }
                 
         except Exception as e:
             logger.error(f"File ingestion failed: {e}")
@@ -288,6 +290,248 @@ class CSVIngestor:
                 "error": str(e)
             }
     
+    def load_chunks(
+        self,
+        tenant_id: str,
+        chunks: Iterable[pd.DataFrame],
+        upload_id: Optional[int] = None,
+        row_offset: int = 0,
+        on_chunk: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Normalize and load already-validated chunks, one transaction each
+        
+        row_offset shifts chunk indexes so reject row numbers refer to the
+        whole file when the chunks come from a slice of it.
+        
+        Returns: {"rows_processed", "rows_inserted", "rows_failed", "errors"}
+        """
+        loader = BulkTransactionLoader(self.db)
+        stats = {"rows_processed": 0, "rows_inserted": 0, "rows_failed": 0, "errors": []}
+        
+        for chunk in chunks:
+            chunk = self._prepare_chunk(chunk)
+            if row_offset:
+                chunk.index = chunk.index + row_offset
+            result = loader.load_frame(
+                tenant_id,
+                self._normalize_chunk(chunk),
+                upload_id=upload_id
+            )
+            stats["rows_processed"] += len(chunk)
+            stats["rows_inserted"] += result['rows_inserted']
+            stats["rows_failed"] += result['rows_failed']
+            for error in result['errors'][:10 - len(stats["errors"])]:
+                logger.warning(f"Row {error['row']} failed: {error['error']}")
+                stats["errors"].append(error)  # First 10 errors
+            
+            if on_chunk:
+                on_chunk({key: value for key, value in stats.items() if key != 'errors'})
+        
+        return stats
+    
+    def detect_date_format(self, source, file_type: str = 'csv', chunksize: int = VALIDATION_ROWS) -> Optional[str]:
+        """
+        Format of the file's transaction_date column, decided before loading
+        
+        Taken from the first chunk when only one format fits it. When
+        several do (a date-sorted day-first file can start with days <= 12
+        only), the rest of the column is scanned until the values rule out
+        all but one; a file that never does is rejected rather than loaded
+        with a guess. Returns None when no listed format fits (pandas
+        inference is used per chunk then). Leaves source at an unknown
+        position.
+        """
+        chunks = self._read_chunks(source, file_type, chunksize)
+        try:
+            first_chunk = next(chunks, None)
+        finally:
+            chunks.close()
+        if first_chunk is None or 'transaction_date' not in first_chunk.columns:
+            return None
+        
+        candidates = _date_format_candidates(_strip(first_chunk['transaction_date']))
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        
+        source.seek(0)
+        for values in self._read_date_column(source, file_type):
+            values = _strip(values).dropna()
+            parsed = {
+                date_format: pd.to_datetime(values, format=date_format, errors='coerce').notna()
+                for date_format in candidates
+            }
+            most = max(int(mask.sum()) for mask in parsed.values())
+            # Drop formats that fail on values another one reads
+            candidates = [f for f in candidates if int(parsed[f].sum()) == most]
+            if len(candidates) == 1:
+                return candidates[0]
+        
+        raise ValueError(
+            f"Ambiguous transaction_date format ({' or '.join(candidates)}); "
+            f"use YYYY-MM-DD dates"
+        )
+    
+    def _read_date_column(self, source, file_type: str) -> Iterator[pd.Series]:
+        """Yield the transaction_date column in chunks"""
+        if file_type == 'csv':
+            with pd.read_csv(
+                source, usecols=['transaction_date'], dtype=str, chunksize=DATE_SCAN_ROWS
+            ) as reader:
+                for chunk in reader:
+                    yield chunk['transaction_date']
+        else:
+            for chunk in self._read_chunks(source, file_type, DATE_SCAN_ROWS):
+                yield chunk['transaction_date']
+    
+    def _open_source(self, file_content: Optional[bytes], file_path: Optional[str]):
+        if file_path is not None:
+            return open(file_path, 'rb')
+        if file_content is None:
+            raise ValueError("Either file_content or file_path is required")
+        return io.BytesIO(file_content)
+    
+    def _read_chunks(self, source, file_type: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Yield the file as DataFrames of at most chunksize rows"""
+        if file_type == 'csv':
+            with pd.read_csv(source, chunksize=chunksize) as reader:
+                yield from reader
+        elif file_type == 'xlsx':
+            yield from self._read_xlsx_chunks(source, chunksize)
+        elif file_type == 'xls':
+            # Legacy .xls has no streaming reader; load it whole and slice
+            df = pd.read_excel(source)
+            for start_idx in range(0, max(len(df), 1), chunksize):
+                yield df.iloc[start_idx:start_idx + chunksize].copy()
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+    
+    def _read_xlsx_chunks(self, source, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Stream the first worksheet with openpyxl's read-only mode"""
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [str(col) if col is not None else '' for col in next(rows, ())]
+            
+            start_idx = 0
+            while True:
+                batch = list(itertools.islice(rows, chunksize))
+                if not batch and start_idx > 0:
+                    break
+                # Keep a running index so row numbers match the sheet
+                yield pd.DataFrame(
+                    batch,
+                    columns=header,
+                    index=pd.RangeIndex(start_idx, start_idx + len(batch))
+                ).infer_objects()
+                if len(batch) < chunksize:
+                    break
+                start_idx += len(batch)
+        finally:
+            workbook.close()
+    
+    def _validate_chunk(self, chunk: pd.DataFrame) -> Dict:
+        """Check required columns and data types of one chunk"""
+        missing_columns = [col for col in self.required_columns if col not in chunk.columns]
+        
+        if missing_columns:
+            return {
+                "valid": False,
+                "error": f"Missing required columns: {', '.join(missing_columns)}",
+                "required_columns": self.required_columns,
+                "found_columns": list(chunk.columns)
+            }
+        
+        # Validate data types
+        validation_errors = []
+        
+        # Check amount is numeric (a header-only file has no dtype to check)
+        if len(chunk) and not pd.api.types.is_numeric_dtype(chunk['amount']):
+            validation_errors.append("'amount' column must be numeric")
+        
+        # Check date format (parsed once; _prepare_chunk reuses the result)
+        try:
+            chunk['transaction_date'] = self._parse_dates(chunk['transaction_date'], strict=True)
+        except Exception:
+            validation_errors.append("'transaction_date' must be valid date format")
+        
+        if validation_errors:
+            return {
+                "valid": False,
+                "errors": validation_errors
+            }
+        
+        return {
+            "valid": True,
+            "rows_checked": len(chunk),
+            "columns": list(chunk.columns)
+        }
+    
+    def _prepare_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Coerce types for loading
+        
+        Values that do not parse become NULL and are rejected per row by
+        the bulk loader instead of failing the whole file.
+        """
+        if not pd.api.types.is_numeric_dtype(chunk['amount']):
+            chunk['amount'] = pd.to_numeric(chunk['amount'], errors='coerce')
+        if not pd.api.types.is_datetime64_any_dtype(chunk['transaction_date']):
+            chunk['transaction_date'] = self._parse_dates(chunk['transaction_date'])
+        
+        # Set defaults for optional columns
+        for col in self.optional_columns:
+            if col not in chunk.columns:
+                chunk[col] = None
+        
+        return chunk
+    
+    def _parse_dates(self, series: pd.Series, strict: bool = False) -> pd.Series:
+        """
+        Parse transaction dates with the file's format
+        
+        The format comes from detect_date_format, or else from the first
+        chunk when exactly one DATE_FORMATS entry fits it; without one,
+        pandas infers it per chunk. Values in another format than the
+        file's are parsed with the one format that fits them. The rest
+        raise when strict, otherwise become NaT.
+        """
+        series = _strip(series)
+        if self._date_format is None:
+            self._date_format = _pick_date_format(series)
+        
+        errors = 'raise' if strict else 'coerce'
+        if not self._date_format or pd.api.types.is_datetime64_any_dtype(series):
+            return _to_utc_naive(pd.to_datetime(series, errors=errors))
+        
+        parsed = _to_utc_naive(pd.to_datetime(series, format=self._date_format, errors='coerce'))
+        failed = parsed.isna() & series.notna()
+        if failed.any():
+            other_format = _best_date_format(series[failed])
+            if other_format:
+                parsed[failed] = _to_utc_naive(
+                    pd.to_datetime(series[failed], format=other_format, errors='coerce')
+                )
+                failed = parsed.isna() & series.notna()
+        if strict and failed.any():
+            raise ValueError(f"Unparseable transaction_date: {series[failed].iloc[0]}")
+        return parsed
+    
+    def _normalize_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Build the staging frame (bulk_loader.STAGING_COLUMNS) with column operations"""
+        return pd.DataFrame({
+            'row_num': chunk.index + 2,  # +2: index is 0-based, +1 for header
+            'account_key': _clean_text(chunk['account_id']),
+            'amount': chunk['amount'],
+            'currency': _normalize_currency(chunk['currency']),
+            'merchant': _clean_text(chunk['merchant']),
+            'mcc': _normalize_mcc(chunk['mcc']),
+            'channel': _clean_text(chunk['channel']).fillna('ONLINE'),
+            'city': _clean_text(chunk['city']),
+            'country': _normalize_country(chunk['country']),
+            'txn_time': chunk['transaction_date']
+        }, index=chunk.index)
+    
     def get_template(self) -> str:
         """Generate CSV template for download"""
         template_df = pd.DataFrame(columns=self.required_columns + self.optional_columns)
@@ -4,19 +4,36 @@ Direct connection to customer databases for automatic data sync
 """
 import psycopg2
 import mysql.connector
-from typing import Optional, Dict, List
-from datetime import datetime, timedelta
+from psycopg.types.json import Json
+from typing import Optional, Dict, List, Tuple, Any, AsyncIterator, Callable
+from datetime import datetime, date
+from decimal import Decimal
+import asyncio
 import logging
+import uuid
+
+from .account_resolver import AccountResolver, get_account_resolver
+from .bulk_loader import BulkTransactionLoader, STAGING_COLUMNS, SOURCE_KEY_COLUMN
 
 logger = logging.getLogger(__name__)
 
+# Rows per fetchmany round trip when streaming from a source database
+DEFAULT_ARRAYSIZE = 5000
+
 
 class DatabaseConnector:
     """Base database connector"""
     
-    def __init__(self, connection_params: Dict):
+    # Identifier quoting for the source's SQL dialect
+    identifier = '{}'
+    # Round trip that checks a kept connection before it is reused
+    ping_query = "SELECT 1"
+    
+    def __init__(self, connection_params: Dict, keep_connection: bool = False):
         self.connection_params = connection_params
         self.connection = None
+        # Leave the connection open after a stream, for the next sync of this source
+        self.keep_connection = keep_connection
     
     def connect(self):
         """Establish connection"""
@@ -38,15 +55,215 @@ class DatabaseConnector:
             logger.error(f"Connection test failed: {e}")
             return {"success": False, "error": str(e)}
     
+    def ensure_connected(self):
+        """Connect, or reuse the kept connection if it still answers"""
+        if self.connection is not None:
+            try:
+                cursor = self.connection.cursor()
+                cursor.execute(self.ping_query)
+                cursor.fetchall()
+                cursor.close()
+                return
+            except Exception as e:
+                logger.info(f"Reconnecting {type(self).__name__}: {e}")
+                self.close_quietly()
+        self.connect()
+    
+    def close_quietly(self):
+        """Drop the connection, ignoring errors from one that is already dead"""
+        try:
+            self.disconnect()
+        except Exception:
+            self.connection = None
+    
+    def placeholder(self, position: int) -> str:
+        """Bind parameter marker for the given (1-based) position"""
+        return '%s'
+    
+    def open_cursor(self, arraysize: int):
+        """Cursor that streams the result set instead of buffering it client side"""
+        return self.connection.cursor()
+    
+    def build_query(
+        self,
+        table_name: str,
+        column_mapping: Dict,
+        watermark: Optional[Dict] = None,
+        key_range: Optional[Tuple[str, Any, Any]] = None
+    ) -> Tuple[str, list]:
+        """
+        Keyset query for rows after the watermark, in ascending (timestamp, id) order
+        
+        The source key is column_mapping['id'] (default 'id'); the timestamp is
+        column_mapping['transaction_date'] when mapped. With the time and id of
+        the last synced row as watermark, the query resumes right after it, so
+        rows sharing a timestamp are neither skipped nor synced twice.
+        
+        key_range = (column, lower, upper) limits the query to one slice of a
+        parallel backfill: lower < column <= upper, with column 'id' or
+        'transaction_date' and None for an open end. An 'id' slice is read
+        in id order only, with the watermark's id as its position.
+        """
+        q = self.identifier.format
+        time_col = column_mapping.get('transaction_date')
+        id_col = column_mapping.get('id', 'id')
+        keyset_time = None if key_range and key_range[0] == 'id' else time_col
+        
+        select_columns = [
+            f"{q(their_col)} AS {q(our_col)}"
+            for our_col, their_col in {**column_mapping, 'id': id_col}.items()
+        ]
+        query = f"SELECT {', '.join(select_columns)} FROM {q(table_name)}"
+        
+        watermark = watermark or {}
+        params = []
+        conditions = []
+        
+        def bind(value):
+            params.append(value)
+            return self.placeholder(len(params))
+        
+        if keyset_time and watermark.get('time') is not None:
+            since = watermark['time']
+            if watermark.get('id') is not None:
+                conditions.append(
+                    f"{q(keyset_time)} > {bind(since)}"
+                    f" OR ({q(keyset_time)} = {bind(since)} AND {q(id_col)} > {bind(watermark['id'])})"
+                )
+            else:
+                conditions.append(f"{q(keyset_time)} > {bind(since)}")
+        elif watermark.get('id') is not None:
+            conditions.append(f"{q(id_col)} > {bind(watermark['id'])}")
+        
+        if key_range:
+            column, lower, upper = key_range
+            range_col = q(time_col if column == 'transaction_date' else id_col)
+            if lower is not None:
+                conditions.append(f"{range_col} > {bind(lower)}")
+            if upper is not None:
+                conditions.append(f"{range_col} <= {bind(upper)}")
+        
+        if len(conditions) == 1:
+            query += f" WHERE {conditions[0]}"
+        elif conditions:
+            query += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+        
+        order = [q(keyset_time), q(id_col)] if keyset_time else [q(id_col)]
+        query += f" ORDER BY {', '.join(order)}"
+        
+        return query, params
+    
+    def key_bounds(self, table_name: str, column_mapping: Dict) -> Dict[str, Tuple[Any, Any]]:
+        """
+        MIN and MAX of the source key and timestamp, for splitting a backfill
+        
+        Returns: {'id': (min, max), 'transaction_date': (min, max)} (the
+        latter only when mapped); both None for an empty table
+        """
+        q = self.identifier.format
+        columns = {'id': column_mapping.get('id', 'id')}
+        if column_mapping.get('transaction_date'):
+            columns['transaction_date'] = column_mapping['transaction_date']
+        select = ', '.join(f"MIN({q(col)}), MAX({q(col)})" for col in columns.values())
+        
+        self.ensure_connected()
+        cursor = self.connection.cursor()
+        finished = False
+        try:
+            cursor.execute(f"SELECT {select} FROM {q(table_name)}")
+            row = cursor.fetchone()
+            finished = True
+        finally:
+            self._release(cursor, finished)
+        
+        return {key: (row[2 * i], row[2 * i + 1]) for i, key in enumerate(columns)}
+    
+    async def stream_transactions(
+        self,
+        table_name: str,
+        column_mapping: Dict,
+        watermark: Optional[Dict] = None,
+        arraysize: int = DEFAULT_ARRAYSIZE,
+        key_range: Optional[Tuple[str, Any, Any]] = None
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Stream transactions from the customer database in batches
+        
+        Args:
+            table_name: Name of transactions table
+            column_mapping: Map of our columns to customer columns
+                Example: {'account_id': 'user_id', 'amount': 'total_amount'}
+            watermark: {'time': ..., 'id': ...} of the last row already synced
+            arraysize: Rows per fetchmany round trip (and per yielded batch)
+            key_range: (column, lower, upper) slice of a parallel backfill
+        
+        Yields lists of row dicts in (transaction_date, id) order. Rows come
+        from a server-side cursor, so memory stays at one batch however large
+        the table; blocking driver calls run in a worker thread.
+        """
+        query, params = self.build_query(table_name, column_mapping, watermark, key_range)
+        source = type(self).__name__
+        total = 0
+        
+        cursor = None
+        finished = False
+        
+        try:
+            await asyncio.to_thread(self.ensure_connected)
+            cursor = self.open_cursor(arraysize)
+            await asyncio.to_thread(cursor.execute, query, tuple(params))
+            
+            columns = None
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, arraysize)
+                if not rows:
+                    break
+                if columns is None:
+                    # Named (server-side) cursors only describe after a fetch
+                    columns = [desc[0].lower() for desc in cursor.description]
+                total += len(rows)
+                yield [dict(zip(columns, row)) for row in rows]
+            
+            logger.info(f"Streamed {total} transactions from {source}")
+            finished = True
+            
+        except Exception as e:
+            logger.error(f"Failed to stream from {source} after {total} rows: {e}")
+            raise
+        finally:
+            self._release(cursor, finished)
+    
+    def _release(self, cursor, finished: bool):
+        """Keep the connection for reuse after a complete stream, else close it"""
+        if self.keep_connection and finished:
+            try:
+                cursor.close()
+                self.connection.rollback()  # end the read transaction
+                return
+            except Exception as e:
+                logger.info(f"Not keeping {type(self).__name__} connection: {e}")
+        self.close_quietly()
+    
     async def fetch_transactions(
         self,
         table_name: str,
         column_mapping: Dict,
-        since: Optional[datetime] = None,
+        watermark: Optional[Dict] = None,
         limit: int = 1000
     ) -> List[Dict]:
-        """Fetch transactions from customer database"""
-        raise NotImplementedError
+        """Fetch up to limit transactions after the watermark"""
+        transactions = []
+        stream = self.stream_transactions(
+            table_name, column_mapping, watermark, arraysize=min(limit, DEFAULT_ARRAYSIZE)
+        )
+        try:
+            async for batch in stream:
+                transactions.extend(batch[:limit - len(transactions)])
+                if len(transactions) >= limit:
+                    break
+        finally:
+            await stream.aclose()
+        return transactions
 
 
 class PostgreSQLConnector(DatabaseConnector):
@@ -62,67 +279,18 @@ class PostgreSQLConnector(DatabaseConnector):
             password=self.connection_params.get('password')
         )
     
-    async def fetch_transactions(
-        self,
-        table_name: str,
-        column_mapping: Dict,
-        since: Optional[datetime] = None,
-        limit: int = 1000
-    ) -> List[Dict]:
-        """
-        Fetch transactions from PostgreSQL
-        
-        Args:
-            table_name: Name of transactions table
-            column_mapping: Map of our columns to customer columns
-                Example: {'account_id': 'user_id', 'amount': 'total_amount'}
-            since: Only fetch transactions after this time
-            limit: Maximum number of rows to fetch
-        """
-        try:
-            self.connect()
-            cursor = self.connection.cursor()
-            
-            # Build SELECT query
-            select_columns = []
-            for our_col, their_col in column_mapping.items():
-                select_columns.append(f"{their_col} as {our_col}")
-            
-            query = f"SELECT {', '.join(select_columns)} FROM {table_name}"
-            
-            # Add WHERE clause for incremental sync
-            params = []
-            if since and 'transaction_date' in column_mapping:
-                date_col = column_mapping['transaction_date']
-                query += f" WHERE {date_col} > %s"
-                params.append(since)
-            
-            query += f" ORDER BY {column_mapping.get('transaction_date', 'id')} DESC LIMIT %s"
-            params.append(limit)
-            
-            cursor.execute(query, params)
-            
-            # Fetch results
-            columns = [desc[0] for desc in cursor.description]
-            transactions = []
-            
-            for row in cursor.fetchall():
-                transactions.append(dict(zip(columns, row)))
-            
-            logger.info(f"Fetched {len(transactions)} transactions from PostgreSQL")
-            
-            return transactions
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch from PostgreSQL: {e}")
-            raise
-        finally:
-            self.disconnect()
+    def open_cursor(self, arraysize: int):
+        """Named cursor: rows stay on the server until fetched"""
+        cursor = self.connection.cursor(name=f"sync_{uuid.uuid4().hex}")
+        cursor.itersize = arraysize
+        return cursor
 
 
 class MySQLConnector(DatabaseConnector):
     """MySQL/MariaDB database connector"""
     
+    identifier = '`{}`'
+    
     def connect(self):
         """Connect to MySQL"""
         self.connection = mysql.connector.connect(
@@ -133,53 +301,16 @@ class MySQLConnector(DatabaseConnector):
             password=self.connection_params.get('password')
         )
     
-    async def fetch_transactions(
-        self,
-        table_name: str,
-        column_mapping: Dict,
-        since: Optional[datetime] = None,
-        limit: int = 1000
-    ) -> List[Dict]:
-        """Fetch transactions from MySQL"""
-        try:
-            self.connect()
-            cursor = self.connection.cursor(dictionary=True)
-            
-            # Build SELECT query
-            select_columns = []
-            for our_col, their_col in column_mapping.items():
-                select_columns.append(f"`{their_col}` as `{our_col}`")
-            
-            query = f"SELECT {', '.join(select_columns)} FROM `{table_name}`"
-            
-            # Add WHERE clause for incremental sync
-            params = []
-            if since and 'transaction_date' in column_mapping:
-                date_col = column_mapping['transaction_date']
-                query += f" WHERE `{date_col}` > %s"
-                params.append(since)
-            
-            query += f" ORDER BY `{column_mapping.get('transaction_date', 'id')}` DESC LIMIT %s"
-            params.append(limit)
-            
-            cursor.execute(query, tuple(params))
-            
-            transactions = cursor.fetchall()
-            
-            logger.info(f"Fetched {len(transactions)} transactions from MySQL")
-            
-            return transactions
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch from MySQL: {e}")
-            raise
-        finally:
-            self.disconnect()
+    def open_cursor(self, arraysize: int):
+        """Unbuffered cursor: rows are read off the socket as they are fetched"""
+        return self.connection.cursor(buffered=False)
 
 
 class OracleConnector(DatabaseConnector):
     """Oracle database connector"""
     
+    ping_query = "SELECT 1 FROM dual"
+    
     def connect(self):
         """Connect to Oracle"""
         import oracledb
@@ -190,61 +321,145 @@ class OracleConnector(DatabaseConnector):
             dsn=f"{self.connection_params.get('host')}:{self.connection_params.get('port', 1521)}/{self.connection_params.get('service_name')}"
         )
     
-    async def fetch_transactions(
-        self,
-        table_name: str,
-        column_mapping: Dict,
-        since: Optional[datetime] = None,
-        limit: int = 1000
-    ) -> List[Dict]:
-        """Fetch transactions from Oracle"""
-        try:
-            self.connect()
-            cursor = self.connection.cursor()
-            
-            # Build SELECT query
-            select_columns = []
-            for our_col, their_col in column_mapping.items():
-                select_columns.append(f"{their_col} as {our_col}")
-            
-            query = f"SELECT {', '.join(select_columns)} FROM {table_name}"
-            
-            # Add WHERE clause
-            params = {}
-            if since and 'transaction_date' in column_mapping:
-                date_col = column_mapping['transaction_date']
-                query += f" WHERE {date_col} > :since"
-                params['since'] = since
-            
-            # Oracle uses ROWNUM for limiting
-            query += f" AND ROWNUM <= :limit"
-            params['limit'] = limit
-            
-            cursor.execute(query, params)
-            
-            # Fetch results
-            columns = [desc[0] for desc in cursor.description]
-            transactions = []
-            
-            for row in cursor.fetchall():
-                transactions.append(dict(zip(columns, row)))
-            
-            logger.info(f"Fetched {len(transactions)} transactions from Oracle")
-            
-            return transactions
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch from Oracle: {e}")
-            raise
-        finally:
-            self.disconnect()
+    def placeholder(self, position: int) -> str:
+        return f":{position}"
+    
+    def open_cursor(self, arraysize: int):
+        """Cursor fetching arraysize rows per round trip, the first batch with execute"""
+        cursor = self.connection.cursor()
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = arraysize + 1
+        return cursor
+
+
+CONNECTORS = {
+    'postgresql': PostgreSQLConnector,
+    'mysql': MySQLConnector,
+    'oracle': OracleConnector,
+}
+
+
+def create_connector(connector_type: str, connection_params: Dict, keep_connection: bool = False) -> DatabaseConnector:
+    """Connector for a data_sync_jobs connector_type"""
+    if connector_type not in CONNECTORS:
+        raise ValueError(f"Unknown connector type: {connector_type}")
+    return CONNECTORS[connector_type](connection_params, keep_connection=keep_connection)
+
+
+def watermark_of(row: Dict) -> Dict:
+    """JSON-safe watermark for the last row of a synced batch"""
+    time_value = row.get('transaction_date')
+    key = row.get('id')
+    if isinstance(key, Decimal):
+        key = int(key) if key == key.to_integral_value() else str(key)
+    return {
+        "time": time_value.isoformat() if isinstance(time_value, (datetime, date)) else time_value,
+        "id": key
+    }
+
+
+def load_sync_batch(
+    db,
+    account_resolver: AccountResolver,
+    tenant_id: str,
+    job_id: int,
+    transactions: List[Dict],
+    row_offset: int,
+    checkpoint: Callable
+) -> Dict:
+    """
+    Bulk-load one synced batch in a single commit with its checkpoint
+    
+    The batch is COPYed into staging and merged into transactions together
+    with checkpoint(cursor) (the sync position after this batch). Each row
+    carries the source key as reference_id, so rows of a batch that is
+    loaded again (a retried or overlapping sync) are skipped; invalid rows
+    go to ingestion_rejects.
+    
+    Returns: {"rows_inserted", "rows_failed", "errors"}
+    """
+    loader = BulkTransactionLoader(db, account_resolver)
+    return loader.load_rows(
+        tenant_id,
+        (staging_row(job_id, row_offset + i, txn) for i, txn in enumerate(transactions, 1)),
+        columns=STAGING_COLUMNS + (SOURCE_KEY_COLUMN,),
+        sync_job_id=job_id,
+        status='COMPLETED',
+        before_commit=checkpoint
+    )
+
+
+def staging_row(job_id: int, row_num: int, txn: Dict) -> tuple:
+    """Synced row in bulk_loader staging order, keyed by its source id"""
+    def text(value) -> Optional[str]:
+        value = str(value).strip() if value is not None else ''
+        return value or None
+    
+    currency = text(txn.get('currency'))
+    country = text(txn.get('country'))
+    channel = text(txn.get('channel'))
+    key = txn.get('id')
+    if isinstance(key, Decimal) and key == key.to_integral_value():
+        key = int(key)
+    return (
+        row_num,
+        text(txn.get('account_id')),
+        txn.get('amount'),
+        currency.upper()[:3] if currency else 'USD',
+        text(txn.get('merchant')),
+        text(txn.get('mcc')),
+        channel.upper() if channel else None,
+        text(txn.get('city')),
+        country.upper() if country else None,
+        txn.get('transaction_date') or datetime.utcnow(),
+        f"sync:{job_id}:{key}" if key is not None else None
+    )
+
+
+def parse_watermark(watermark: Optional[Dict]) -> Optional[Dict]:
+    """Watermark as stored in data_sync_jobs, with its time as a datetime again"""
+    if not watermark:
+        return None
+    time_value = watermark.get('time')
+    if isinstance(time_value, str):
+        time_value = datetime.fromisoformat(time_value)
+    return {"time": time_value, "id": watermark.get('id')}
+
+
+class SyncProgress:
+    """Rows fetched, inserted and rejected so far in one sync run"""
+    
+    __slots__ = ('fetched', 'inserted', 'rejected')
+    
+    def __init__(self):
+        self.fetched = 0
+        self.inserted = 0
+        self.rejected = 0
+    
+    def add(self, batch_size: int, result: Dict):
+        self.fetched += batch_size
+        self.inserted += result['rows_inserted']
+        self.rejected += result['rows_failed']
 
 
 class DataSyncScheduler:
     """Manages scheduled data syncs from customer databases"""
     
-    def __init__(self, db_connection):
+    def __init__(
+        self,
+        db_connection,
+        account_resolver: Optional[AccountResolver] = None,
+        connect: Optional[Callable] = None,
+        backfill_connections: int = 1,
+        backfill_ranges: int = 16
+    ):
         self.db = db_connection
+        self.account_resolver = account_resolver or get_account_resolver()
+        # Opens further connections to our database for parallel backfills
+        self.connect = connect
+        # Source connections for a backfill (no watermark yet); 1 = sequential
+        self.backfill_connections = backfill_connections
+        self.backfill_ranges = backfill_ranges
     
     async def create_sync_job(
         self,
@@ -253,7 +468,8 @@ class DataSyncScheduler:
         connection_params: Dict,
         table_name: str,
         column_mapping: Dict,
-        schedule: str = "0 * * * *"  # Every hour
+        schedule: str = "0 * * * *",  # Every hour
+        name: Optional[str] = None
     ) -> int:
         """
         Create a new data sync job
@@ -265,16 +481,17 @@ class DataSyncScheduler:
         try:
             cursor.execute("""
                 INSERT INTO data_sync_jobs (
-                    tenant_id, connector_type, connection_params,
-                    table_name, column_mapping, schedule, status
-                ) VALUES (%s, %s, %s, %s, %s, %s, 'ACTIVE')
+                    tenant_id, name, connector_type, connection_params,
+                    source_table, column_mapping, schedule, status
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, 'ACTIVE')
                 RETURNING id
             """, (
                 tenant_id,
+                name or f"{connector_type}:{table_name}",
                 connector_type,
-                connection_params,
+                Json(connection_params),
                 table_name,
-                column_mapping,
+                Json(column_mapping),
                 schedule
             ))
             
@@ -292,15 +509,32 @@ class DataSyncScheduler:
         finally:
             cursor.close()
     
-    async def run_sync_job(self, job_id: int) -> Dict:
-        """Execute a data sync job"""
+    async def run_sync_job(
+        self,
+        job_id: int,
+        arraysize: Optional[int] = None,
+        connector: Optional[DatabaseConnector] = None
+    ) -> Dict:
+        """
+        Execute a data sync job
+        
+        Streams the source table from the job's watermark and commits each
+        batch together with the watermark of its last row, so a failed or
+        interrupted sync resumes where it stopped instead of starting over.
+        A connector passed in (e.g. one kept connected by the sync scheduler)
+        is used instead of a new one.
+        
+        With backfill_connections > 1, a job without a watermark (first sync
+        or reset) is backfilled in parallel key ranges instead (sync_ranges).
+        """
         cursor = self.db.cursor()
+        progress = SyncProgress()
         
         try:
             # Get job details
             cursor.execute("""
                 SELECT tenant_id, connector_type, connection_params,
-                       table_name, column_mapping, last_sync_at
+                       source_table, column_mapping, watermark
                 FROM data_sync_jobs
                 WHERE id = %s AND status = 'ACTIVE'
             """, (job_id,))
@@ -309,66 +543,119 @@ class DataSyncScheduler:
             if not result:
                 return {"success": False, "error": "Job not found or inactive"}
             
-            tenant_id, connector_type, conn_params, table_name, col_mapping, last_sync = result
+            tenant_id, connector_type, conn_params, table_name, col_mapping, watermark = result
             
             # Create appropriate connector
-            if connector_type == 'postgresql':
-                connector = PostgreSQLConnector(conn_params)
-            elif connector_type == 'mysql':
-                connector = MySQLConnector(conn_params)
-            elif connector_type == 'oracle':
-                connector = OracleConnector(conn_params)
+            if connector is None:
+                try:
+                    connector = create_connector(connector_type, conn_params)
+                except ValueError as e:
+                    return {"success": False, "error": str(e)}
+            
+            if arraysize is None:
+                from config import settings
+                arraysize = settings.sync_fetch_arraysize
+            
+            if self.backfill_connections > 1 and (
+                watermark is None or self._has_pending_ranges(cursor, job_id)
+            ):
+                from .sync_ranges import RangeBackfill
+                backfill = RangeBackfill(
+                    self, job_id, tenant_id, connector_type, conn_params,
+                    table_name, col_mapping, arraysize
+                )
+                await backfill.run(connector, progress)
             else:
-                return {"success": False, "error": f"Unknown connector type: {connector_type}"}
-            
-            # Fetch transactions
-            transactions = await connector.fetch_transactions(
-                table_name,
-                col_mapping,
-                since=last_sync
-            )
-            
-            # Insert into our database
-            inserted = 0
-            for txn in transactions:
+                batches = connector.stream_transactions(
+                    table_name,
+                    col_mapping,
+                    watermark=parse_watermark(watermark),
+                    arraysize=arraysize
+                )
                 try:
-                    cursor.execute("""
-                        INSERT INTO transactions (
-                            tenant_id, account_id, amount, merchant, txn_time, status
-                        ) VALUES (%s, %s, %s, %s, %s, 'COMPLETED')
-                    """, (
-                        tenant_id,
-                        txn.get('account_id'),
-                        txn.get('amount'),
-                        txn.get('merchant'),
-                        txn.get('transaction_date', datetime.utcnow())
-                    ))
-                    inserted += 1
-                except Exception as e:
-                    logger.warning(f"Failed to insert transaction: {e}")
+                    async for transactions in batches:
+                        result = await asyncio.to_thread(
+                            self._load_batch, tenant_id, job_id, transactions, progress.fetched
+                        )
+                        progress.add(len(transactions), result)
+                finally:
+                    # Release the source connection even if a batch failed
+                    await batches.aclose()
+            
+            fetched, inserted, rejected = progress.fetched, progress.inserted, progress.rejected
             
             # Update last sync time
             cursor.execute("""
                 UPDATE data_sync_jobs
                 SET last_sync_at = CURRENT_TIMESTAMP,
-                    last_sync_count = %s
+                    last_sync_status = 'SUCCESS',
+                    last_sync_count = %s,
+                    last_sync_error = NULL,
+                    total_synced = COALESCE(total_synced, 0) + %s
                 WHERE id = %s
-            """, (inserted, job_id))
-            
+            """, (inserted, inserted, job_id))
             self.db.commit()
             
-            logger.info(f"Sync job {job_id} completed: {inserted} transactions")
+            logger.info(
+                f"Sync job {job_id} completed: {inserted} of {fetched} transactions "
+                f"({rejected} rejected, {fetched - inserted - rejected} already synced)"
+            )
             
             return {
                 "success": True,
-                "transactions_fetched": len(transactions),
-                "transactions_inserted": inserted
+                "transactions_fetched": fetched,
+                "transactions_inserted": inserted,
+                "transactions_rejected": rejected
             }
             
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Sync job {job_id} failed: {e}")
-            return {"success": False, "error": str(e)}
+            logger.error(f"Sync job {job_id} failed after {progress.inserted} transactions: {e}")
+            self._record_failure(cursor, job_id, progress.inserted, e)
+            return {
+                "success": False,
+                "error": str(e),
+                "transactions_fetched": progress.fetched,
+                "transactions_inserted": progress.inserted,
+                "transactions_rejected": progress.rejected
+            }
         finally:
             cursor.close()
-
+    
+    def _has_pending_ranges(self, cursor, job_id: int) -> bool:
+        """Whether an interrupted parallel backfill of the job is waiting to resume"""
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM data_sync_ranges WHERE job_id = %s)", (job_id,))
+        return cursor.fetchone()[0]
+    
+    def _load_batch(self, tenant_id: str, job_id: int, transactions: List[Dict], row_offset: int) -> Dict:
+        """Bulk-load one streamed batch and advance the job's watermark (worker thread)"""
+        watermark = watermark_of(transactions[-1])
+        
+        def advance_watermark(cursor):
+            cursor.execute("""
+                UPDATE data_sync_jobs
+                SET watermark = %s
+                WHERE id = %s
+            """, (Json(watermark), job_id))
+        
+        return load_sync_batch(
+            self.db, self.account_resolver, tenant_id, job_id,
+            transactions, row_offset, advance_watermark
+        )
+    
+    def _record_failure(self, cursor, job_id: int, inserted: int, error: Exception):
+        """Mark the job's last run failed; committed batches and their watermark stay"""
+        try:
+            cursor.execute("""
+                UPDATE data_sync_jobs
+                SET last_sync_at = CURRENT_TIMESTAMP,
+                    last_sync_status = 'FAILED',
+                    last_sync_count = %s,
+                    last_sync_error = %s,
+                    total_synced = COALESCE(total_synced, 0) + %s
+                WHERE id = %s
+            """, (inserted, str(error), inserted, job_id))
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Failed to record sync failure for job {job_id}: {e}")
@@ -0,0 +1,634 @@
+"""
+Online Feature Store
+Keeps rolling per-(tenant, account) state for real-time fraud features
+so ingestion does not have to query transaction history on every request
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+import math
+import threading
+import time
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when an account has no usable history
+DEFAULT_FEATURES = {
+    'velocity': 1,
+    'avg_amount': 150.0,
+    'std_amount': 50.0,
+    'minutes_since_last': 60.0,
+    'location_changed': False,
+    'device_changed': False,
+    'merchant_risk': 0.2,  # TODO: Implement merchant risk scoring from historical data
+    'ip_reputation': 0.8   # TODO: Implement IP reputation check
+}
+
+VELOCITY_WINDOW_SECONDS = 3600
+MAX_RECENT_TIMESTAMPS = 1000
+
+# Redis keeps each account's state in a hash (see AccountFeatureState.to_redis).
+# Updates run server-side so concurrent API workers never overwrite each other.
+
+# Fold one transaction into an existing hash, as AccountFeatureState.update
+# does. ARGV: amount, txn_time, velocity cutoff, max timestamps, ttl, city,
+# country, device. Returns the new state, or an empty list if the key is gone.
+FOLD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {}
+end
+local amount = tonumber(ARGV[1])
+local txn_time = tonumber(ARGV[2])
+local cutoff = tonumber(ARGV[3])
+
+local count = tonumber(redis.call('HGET', KEYS[1], 'count') or '0') + 1
+local mean = tonumber(redis.call('HGET', KEYS[1], 'mean') or '0')
+local m2 = tonumber(redis.call('HGET', KEYS[1], 'm2') or '0')
+local delta = amount - mean
+mean = mean + delta / count
+m2 = m2 + delta * (amount - mean)
+
+local recent = {}
+for t in string.gmatch(redis.call('HGET', KEYS[1], 'recent') or '', '%S+') do
+    if tonumber(t) >= cutoff then
+        recent[#recent + 1] = t
+    end
+end
+if txn_time >= cutoff then
+    recent[#recent + 1] = ARGV[2]
+end
+local first = math.max(1, #recent - tonumber(ARGV[4]) + 1)
+
+redis.call('HSET', KEYS[1],
+    'count', count,
+    'mean', string.format('%.17g', mean),
+    'm2', string.format('%.17g', m2),
+    'recent', table.concat(recent, ' ', first, #recent))
+
+local last_time = redis.call('HGET', KEYS[1], 'last_time')
+if not last_time or last_time == '' or txn_time >= tonumber(last_time) then
+    redis.call('HSET', KEYS[1], 'last_time', ARGV[2])
+    local fields = {'last_city', 'last_country', 'last_device'}
+    for i = 1, 3 do
+        if ARGV[5 + i] ~= '' then
+            redis.call('HSET', KEYS[1], fields[i], ARGV[5 + i])
+        end
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# Store hydrated state unless another worker stored or updated it first.
+# ARGV: ttl, then field/value pairs. Returns the existing state, or an empty
+# list if this one was stored.
+INIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HGETALL', KEYS[1])
+end
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return {}
+"""
+
+
+def to_epoch(value: Optional[datetime]) -> float:
+    """Convert a transaction timestamp to epoch seconds (naive values are UTC)"""
+    if value is None:
+        return time.time()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class AccountFeatureState:
+    """
+    Rolling feature state for one account
+
+    - recent_times: timestamps inside the velocity window (hourly count)
+    - count/mean/m2: Welford running mean and variance of amounts
+    - last_*: attributes of the most recent transaction
+    """
+
+    __slots__ = (
+        'recent_times', 'count', 'mean', 'm2',
+        'last_time', 'last_city', 'last_country', 'last_device', 'loaded_at'
+    )
+
+    def __init__(self):
+        self.recent_times: List[float] = []
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last_time: Optional[float] = None
+        self.last_city: Optional[str] = None
+        self.last_country: Optional[str] = None
+        self.last_device: Optional[str] = None
+        self.loaded_at = time.time()
+
+    def update(
+        self,
+        amount: float,
+        txn_time: float,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        device_id: Optional[str] = None
+    ):
+        """Fold one transaction into the state"""
+        # Welford's online algorithm
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+
+        self.recent_times.append(txn_time)
+        self._prune(time.time())
+
+        if self.last_time is None or txn_time >= self.last_time:
+            self.last_time = txn_time
+            self.last_city = city or self.last_city
+            self.last_country = country or self.last_country
+            self.last_device = device_id or self.last_device
+
+    def features(
+        self,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        device_id: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Compute ML features for a new transaction against this state"""
+        now = now or time.time()
+        self._prune(now)
+
+        velocity = len(self.recent_times) or DEFAULT_FEATURES['velocity']
+
+        avg_amount = self.mean if self.count else DEFAULT_FEATURES['avg_amount']
+        std_amount = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        std_amount = std_amount or DEFAULT_FEATURES['std_amount']
+
+        minutes_since_last = (
+            (now - self.last_time) / 60 if self.last_time is not None
+            else DEFAULT_FEATURES['minutes_since_last']
+        )
+
+        location_changed = bool(
+            (self.last_city and city and self.last_city != city) or
+            (self.last_country and country and self.last_country != country)
+        )
+        device_changed = bool(self.last_device and device_id and self.last_device != device_id)
+
+        return {
+            **DEFAULT_FEATURES,
+            'velocity': velocity,
+            'avg_amount': avg_amount,
+            'std_amount': std_amount,
+            'minutes_since_last': minutes_since_last,
+            'location_changed': location_changed,
+            'device_changed': device_changed
+        }
+
+    def _prune(self, now: float):
+        cutoff = now - VELOCITY_WINDOW_SECONDS
+        if self.recent_times and self.recent_times[0] < cutoff:
+            self.recent_times = [t for t in self.recent_times if t >= cutoff]
+        if len(self.recent_times) > MAX_RECENT_TIMESTAMPS:
+            self.recent_times = self.recent_times[-MAX_RECENT_TIMESTAMPS:]
+
+    def copy(self) -> 'AccountFeatureState':
+        state = AccountFeatureState()
+        for name in self.__slots__:
+            setattr(state, name, getattr(self, name))
+        state.recent_times = list(self.recent_times)
+        return state
+
+    def to_redis(self) -> Dict[str, str]:
+        """Hash fields of the state; empty strings stand for None"""
+        return {
+            'recent': ' '.join(repr(t) for t in self.recent_times),
+            'count': str(self.count),
+            'mean': repr(self.mean),
+            'm2': repr(self.m2),
+            'last_time': repr(self.last_time) if self.last_time is not None else '',
+            'last_city': self.last_city or '',
+            'last_country': self.last_country or '',
+            'last_device': self.last_device or ''
+        }
+
+    @classmethod
+    def from_redis(cls, fields) -> 'AccountFeatureState':
+        """Build state from HGETALL output (a dict or a flat field/value list)"""
+        if not isinstance(fields, dict):
+            fields = dict(zip(fields[::2], fields[1::2]))
+        data = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in fields.items()
+        }
+        state = cls()
+        state.recent_times = [float(t) for t in data.get('recent', '').split()]
+        state.count = int(data.get('count') or 0)
+        state.mean = float(data.get('mean') or 0.0)
+        state.m2 = float(data.get('m2') or 0.0)
+        state.last_time = float(data['last_time']) if data.get('last_time') else None
+        state.last_city = data.get('last_city') or None
+        state.last_country = data.get('last_country') or None
+        state.last_device = data.get('last_device') or None
+        return state
+
+
+class OnlineFeatureStore:
+    """
+    In-process feature store with optional Redis backing
+
+    Lookup order: local LRU -> Redis -> one hydration query against Postgres.
+    With Redis, record() folds the transaction into the shared hash in one
+    Lua script and hydrated state never replaces an existing hash, so
+    concurrent API workers don't lose each other's updates. Local entries
+    are re-read from Redis after local_ttl_seconds, so a worker sees other
+    workers' transactions at most that late. Without a Redis server the
+    state is per process.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_accounts: int = 100_000,
+        local_ttl_seconds: float = 5.0,
+        redis_ttl_seconds: int = 30 * 86400
+    ):
+        self.redis = redis_client
+        # deps.get_redis falls back to a stub when Redis is down
+        self.redis_enabled = isinstance(redis_client, redis.Redis)
+        self.max_accounts = max_accounts
+        self.local_ttl_seconds = local_ttl_seconds
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self._states: "OrderedDict[Tuple[str, str], AccountFeatureState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.redis_enabled:
+            self._fold_script = redis_client.register_script(FOLD_SCRIPT)
+            self._init_script = redis_client.register_script(INIT_SCRIPT)
+
+    def get_features(
+        self,
+        db,
+        tenant_id: str,
+        account_id: str,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        device_id: Optional[str] = None,
+        exclude_transaction_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Return ML features for a new transaction on this account"""
+        state = self._get_state(db, tenant_id, account_id, exclude_transaction_id)
+        with self._lock:
+            return state.features(city=city, country=country, device_id=device_id)
+
+    def get_features_batch(
+        self, db, tenant_id: str, transactions: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Features for a batch of new transactions, in order
+
+        transactions are dicts with account_id, amount, txn_time, city,
+        country and device_id. Accounts missing from the local cache and
+        Redis are hydrated together in one query. Each transaction sees the
+        ones before it in the batch; the shared state is left unchanged
+        until record() is called for the transactions actually stored.
+        """
+        states = self._get_states(db, tenant_id, {str(t['account_id']) for t in transactions})
+        working: Dict[str, AccountFeatureState] = {}
+        features = []
+        with self._lock:
+            for t in transactions:
+                account_id = str(t['account_id'])
+                state = working.get(account_id)
+                if state is None:
+                    state = working[account_id] = states[account_id].copy()
+                features.append(state.features(
+                    city=t.get('city'), country=t.get('country'), device_id=t.get('device_id')
+                ))
+                state.update(
+                    float(t['amount']), to_epoch(t.get('txn_time')),
+                    t.get('city'), t.get('country'), t.get('device_id')
+                )
+        return features
+
+    def record(
+        self,
+        tenant_id: str,
+        account_id: str,
+        amount: float,
+        txn_time: Optional[datetime] = None,
+        city: Optional[str] = None,
+        country: Optional[str] = None,
+        device_id: Optional[str] = None
+    ):
+        """Fold an ingested transaction into the account state"""
+        key = (tenant_id, str(account_id))
+        if self.redis_enabled:
+            state = self._fold_redis(key, float(amount), to_epoch(txn_time), city, country, device_id)
+            with self._lock:
+                if state is None:
+                    # Not in Redis; the next lookup hydrates including this row
+                    self._states.pop(key, None)
+                else:
+                    self._states[key] = state
+                    self._states.move_to_end(key)
+            return
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                # Not loaded here; the next lookup hydrates including this row
+                return
+            state.update(float(amount), to_epoch(txn_time), city, country, device_id)
+            self._states.move_to_end(key)
+
+    def invalidate(self, tenant_id: str, account_id: str):
+        """Drop cached state so the next lookup re-hydrates from Postgres"""
+        key = (tenant_id, str(account_id))
+        with self._lock:
+            self._states.pop(key, None)
+        if self.redis_enabled:
+            try:
+                self.redis.delete(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Feature store invalidate failed: {e}")
+
+    def _get_state(
+        self, db, tenant_id: str, account_id: str, exclude_transaction_id: Optional[int]
+    ) -> AccountFeatureState:
+        key = (tenant_id, str(account_id))
+        now = time.time()
+
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None and (
+                not self.redis_enabled or now - state.loaded_at < self.local_ttl_seconds
+            ):
+                self._states.move_to_end(key)
+                self.hits += 1
+                return state
+
+        state = self._read_redis(key)
+        if state is None:
+            self.misses += 1
+            state = self._hydrate_from_postgres(db, tenant_id, account_id, exclude_transaction_id)
+            state = self._store_hydrated(key, state)
+        else:
+            self.hits += 1
+
+        state.loaded_at = now
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_accounts:
+                self._states.popitem(last=False)
+        return state
+
+    def _get_states(
+        self, db, tenant_id: str, account_ids
+    ) -> Dict[str, AccountFeatureState]:
+        """Batch counterpart of _get_state: one Postgres query for all misses"""
+        now = time.time()
+        states: Dict[str, AccountFeatureState] = {}
+        missing = []
+
+        with self._lock:
+            for account_id in account_ids:
+                state = self._states.get((tenant_id, account_id))
+                if state is not None and (
+                    not self.redis_enabled or now - state.loaded_at < self.local_ttl_seconds
+                ):
+                    self._states.move_to_end((tenant_id, account_id))
+                    self.hits += 1
+                    states[account_id] = state
+                else:
+                    missing.append(account_id)
+
+        loaded = self._read_redis_many([(tenant_id, account_id) for account_id in missing])
+        self.hits += len(loaded)
+        to_hydrate = [account_id for account_id in missing if account_id not in loaded]
+        if to_hydrate:
+            self.misses += len(to_hydrate)
+            hydrated = self._hydrate_many_from_postgres(db, tenant_id, to_hydrate)
+            for account_id, state in hydrated.items():
+                loaded[account_id] = self._store_hydrated((tenant_id, account_id), state)
+
+        with self._lock:
+            for account_id, state in loaded.items():
+                state.loaded_at = now
+                self._states[(tenant_id, account_id)] = state
+                self._states.move_to_end((tenant_id, account_id))
+            while len(self._states) > self.max_accounts:
+                self._states.popitem(last=False)
+        states.update(loaded)
+        return states
+
+    def _hydrate_many_from_postgres(
+        self, db, tenant_id: str, account_ids: List[str]
+    ) -> Dict[str, AccountFeatureState]:
+        """Build state for many accounts of one tenant in a single query"""
+        states = {account_id: AccountFeatureState() for account_id in account_ids}
+        if db is None:
+            return states
+
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                WITH history AS (
+                    SELECT account_id, amount, txn_time
+                    FROM transactions
+                    WHERE tenant_id = %(tenant_id)s
+                    AND account_id = ANY(%(account_ids)s::int[])
+                    AND txn_time > NOW() - INTERVAL '30 days'
+                ),
+                totals AS (
+                    SELECT
+                        account_id,
+                        COUNT(*) AS count,
+                        AVG(amount) AS avg_amount,
+                        VAR_SAMP(amount) AS var_amount,
+                        ARRAY_AGG(EXTRACT(EPOCH FROM txn_time)::float8)
+                            FILTER (WHERE txn_time > NOW() - INTERVAL '1 hour') AS recent
+                    FROM history
+                    GROUP BY account_id
+                ),
+                last_txn AS (
+                    SELECT DISTINCT ON (account_id)
+                        account_id, txn_time, city, country, device_id
+                    FROM transactions
+                    WHERE tenant_id = %(tenant_id)s
+                    AND account_id = ANY(%(account_ids)s::int[])
+                    ORDER BY account_id, txn_time DESC
+                )
+                SELECT
+                    l.account_id::text,
+                    t.count, t.avg_amount, t.var_amount, t.recent,
+                    EXTRACT(EPOCH FROM l.txn_time)::float8,
+                    l.city, l.country, l.device_id
+                FROM last_txn l
+                LEFT JOIN totals t ON t.account_id = l.account_id
+            """, {"tenant_id": tenant_id, "account_ids": account_ids})
+            for account_id, count, avg_amount, var_amount, recent, last_time, city, country, device in cursor.fetchall():
+                state = states[account_id]
+                state.count = int(count or 0)
+                state.mean = float(avg_amount) if avg_amount is not None else 0.0
+                state.m2 = float(var_amount) * (state.count - 1) if var_amount is not None else 0.0
+                state.recent_times = sorted(float(t) for t in (recent or []))
+                state.last_time = float(last_time) if last_time is not None else None
+                state.last_city = city
+                state.last_country = country
+                state.last_device = device
+        except Exception as e:
+            logger.error(f"Failed to hydrate features for {len(account_ids)} accounts: {e}")
+            db.rollback()
+        finally:
+            cursor.close()
+
+        return states
+
+    def _hydrate_from_postgres(
+        self, db, tenant_id: str, account_id: str, exclude_transaction_id: Optional[int]
+    ) -> AccountFeatureState:
+        """Build account state from transaction history in a single query"""
+        state = AccountFeatureState()
+        if db is None:
+            return state
+
+        exclude_id = exclude_transaction_id if exclude_transaction_id is not None else -1
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                WITH history AS (
+                    SELECT amount, txn_time
+                    FROM transactions
+                    WHERE account_id = %s
+                    AND tenant_id = %s
+                    AND txn_time > NOW() - INTERVAL '30 days'
+                    AND id != %s
+                ),
+                last_txn AS (
+                    SELECT txn_time, city, country, device_id
+                    FROM transactions
+                    WHERE account_id = %s
+                    AND tenant_id = %s
+                    AND id != %s
+                    ORDER BY txn_time DESC
+                    LIMIT 1
+                )
+                SELECT
+                    (SELECT COUNT(*) FROM history),
+                    (SELECT AVG(amount) FROM history),
+                    (SELECT VAR_SAMP(amount) FROM history),
+                    (SELECT ARRAY_AGG(EXTRACT(EPOCH FROM txn_time)::float8)
+                     FROM history WHERE txn_time > NOW() - INTERVAL '1 hour'),
+                    EXTRACT(EPOCH FROM l.txn_time)::float8,
+                    l.city, l.country, l.device_id
+                FROM (SELECT 1) AS one
+                LEFT JOIN last_txn l ON TRUE
+            """, (account_id, tenant_id, exclude_id, account_id, tenant_id, exclude_id))
+            row = cursor.fetchone()
+            if row:
+                count, avg_amount, var_amount, recent, last_time, city, country, device = row
+                state.count = int(count or 0)
+                state.mean = float(avg_amount) if avg_amount is not None else 0.0
+                state.m2 = float(var_amount) * (state.count - 1) if var_amount is not None else 0.0
+                state.recent_times = sorted(float(t) for t in (recent or []))
+                state.last_time = float(last_time) if last_time is not None else None
+                state.last_city = city
+                state.last_country = country
+                state.last_device = device
+        except Exception as e:
+            logger.error(f"Failed to hydrate features for account {account_id}: {e}")
+            db.rollback()
+        finally:
+            cursor.close()
+
+        return state
+
+    def _redis_key(self, key: Tuple[str, str]) -> str:
+        return f"account_features:{key[0]}:{key[1]}"
+
+    def _read_redis(self, key: Tuple[str, str]) -> Optional[AccountFeatureState]:
+        if not self.redis_enabled:
+            return None
+        try:
+            fields = self.redis.hgetall(self._redis_key(key))
+            return AccountFeatureState.from_redis(fields) if fields else None
+        except Exception as e:
+            logger.warning(f"Feature store read error: {e}")
+            return None
+
+    def _read_redis_many(self, keys: List[Tuple[str, str]]) -> Dict[str, AccountFeatureState]:
+        """States found in Redis, keyed by account_id (one pipelined round trip)"""
+        if not self.redis_enabled or not keys:
+            return {}
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(self._redis_key(key))
+            return {
+                key[1]: AccountFeatureState.from_redis(fields)
+                for key, fields in zip(keys, pipe.execute()) if fields
+            }
+        except Exception as e:
+            logger.warning(f"Feature store read error: {e}")
+            return {}
+
+    def _store_hydrated(self, key: Tuple[str, str], state: AccountFeatureState) -> AccountFeatureState:
+        """Share hydrated state, or adopt the state another worker shared first"""
+        if not self.redis_enabled:
+            return state
+        args = [self.redis_ttl_seconds]
+        for field, value in state.to_redis().items():
+            args += [field, value]
+        try:
+            existing = self._init_script(keys=[self._redis_key(key)], args=args)
+            return AccountFeatureState.from_redis(existing) if existing else state
+        except Exception as e:
+            logger.warning(f"Feature store write error: {e}")
+            return state
+
+    def _fold_redis(
+        self,
+        key: Tuple[str, str],
+        amount: float,
+        txn_time: float,
+        city: Optional[str],
+        country: Optional[str],
+        device_id: Optional[str]
+    ) -> Optional[AccountFeatureState]:
+        """Fold a transaction into the shared state; None if Redis has none"""
+        try:
+            fields = self._fold_script(keys=[self._redis_key(key)], args=[
+                repr(amount), repr(txn_time), repr(time.time() - VELOCITY_WINDOW_SECONDS),
+                MAX_RECENT_TIMESTAMPS, self.redis_ttl_seconds,
+                city or '', country or '', device_id or ''
+            ])
+        except Exception as e:
+            logger.warning(f"Feature store write error: {e}")
+            return None
+        if not fields:
+            return None
+        state = AccountFeatureState.from_redis(fields)
+        state.loaded_at = time.time()
+        return state
+
+
+# Global feature store instance
+_feature_store: Optional[OnlineFeatureStore] = None
+
+def get_feature_store(redis_client=None) -> OnlineFeatureStore:
+    """Get or create the process-wide feature store"""
+    global _feature_store
+    if _feature_store is None:
+        _feature_store = OnlineFeatureStore(redis_client)
+    return _feature_store
@@ -0,0 +1,226 @@
+"""
+Idempotent Ingestion
+Recognizes reference_ids a tenant has already ingested so that webhook
+and SDK retries get the original result back instead of a duplicate
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+import hashlib
+import json
+import logging
+import math
+import threading
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Fields of an ingest result that are replayed for a duplicate
+RESULT_FIELDS = ('transaction_id', 'status', 'fraud_score', 'reference_id', 'timestamp')
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter
+
+    Bit positions use double hashing over one blake2b digest. A key that
+    was never added is reported absent with probability 1 - error_rate;
+    a key that was added is always reported present.
+    """
+
+    def __init__(self, capacity: int = 2_000_000, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self.positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(key)
+        )
+
+
+class IdempotencyGuard:
+    """
+    Per-tenant duplicate detection for reference_id
+
+    Lookup order: local LRU -> Redis result cache -> Bloom filter ->
+    Postgres. The LRU and result cache return the original result without
+    a query; a Bloom filter miss proves the reference_id is new, so only
+    Bloom hits (older duplicates or false positives) reach Postgres. With
+    Redis the Bloom filter is a shared bitmap, otherwise it is per process.
+    The unique (tenant_id, reference_id) index stays the final arbiter for
+    anything the filters miss, such as concurrent first deliveries.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_entries: int = 100_000,
+        result_ttl_seconds: int = 86400,
+        bloom_capacity: int = 2_000_000,
+        bloom_error_rate: float = 0.001
+    ):
+        self.redis = redis_client
+        # deps.get_redis falls back to a stub without pipelines when Redis is down
+        self.redis_enabled = isinstance(redis_client, redis.Redis)
+        self.max_entries = max_entries
+        self.result_ttl_seconds = result_ttl_seconds
+        self.bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._results: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+
+    def find(self, db, tenant_id: str, reference_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Original results for reference_ids this tenant already ingested
+
+        Returns: {reference_id: result} for duplicates only
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        with self._lock:
+            for reference_id in dict.fromkeys(reference_ids):
+                result = self._results.get((tenant_id, reference_id))
+                if result is not None:
+                    self._results.move_to_end((tenant_id, reference_id))
+                    found[reference_id] = result
+                else:
+                    missing.append(reference_id)
+
+        if missing:
+            cached, maybe_seen = self._read_redis(tenant_id, missing)
+            self._cache_local(tenant_id, cached)
+            found.update(cached)
+            candidates = [r for r in missing if r not in cached and r in maybe_seen]
+            if candidates:
+                self.lookups += 1
+                found.update(self.load(db, tenant_id, candidates))
+
+        self.hits += len(found)
+        return found
+
+    def load(self, db, tenant_id: str, reference_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read original results from Postgres (skips the filters)"""
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                SELECT id, status, risk_score, reference_id, txn_time
+                FROM transactions
+                WHERE tenant_id = %s AND reference_id = ANY(%s)
+            """, (tenant_id, list(reference_ids)))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        results = {}
+        for transaction_id, status, risk_score, reference_id, txn_time in rows:
+            results[reference_id] = {
+                "transaction_id": transaction_id,
+                "status": status,
+                "fraud_score": round(float(risk_score), 3) if risk_score is not None else None,
+                "reference_id": reference_id,
+                "timestamp": txn_time.isoformat() if isinstance(txn_time, datetime) else txn_time
+            }
+        self.remember(tenant_id, results.values())
+        return results
+
+    def remember(self, tenant_id: str, results: Iterable[Dict[str, Any]]):
+        """Record ingested results so retries of their reference_ids replay them"""
+        results = {
+            result['reference_id']: {field: result.get(field) for field in RESULT_FIELDS}
+            for result in results if result.get('reference_id')
+        }
+        if not results:
+            return
+        self._cache_local(tenant_id, results)
+        with self._lock:
+            for reference_id in results:
+                self.bloom.add(self._bloom_key(tenant_id, reference_id))
+        self._write_redis(tenant_id, results)
+
+    def _cache_local(self, tenant_id: str, results: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for reference_id, result in results.items():
+                self._results[(tenant_id, reference_id)] = result
+                self._results.move_to_end((tenant_id, reference_id))
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def _bloom_key(self, tenant_id: str, reference_id: str) -> str:
+        return f"{tenant_id}\x00{reference_id}"
+
+    def _result_key(self, tenant_id: str, reference_id: str) -> str:
+        return f"idempotency:{tenant_id}:{reference_id}"
+
+    def _read_redis(self, tenant_id: str, reference_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], set]:
+        """Cached results and Bloom filter hits, in one round trip"""
+        bloom_keys = [self._bloom_key(tenant_id, r) for r in reference_ids]
+        with self._lock:
+            maybe_seen = {r for r, key in zip(reference_ids, bloom_keys) if key in self.bloom}
+        if not self.redis_enabled:
+            return {}, maybe_seen
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.mget([self._result_key(tenant_id, r) for r in reference_ids])
+            for key in bloom_keys:
+                args = []
+                for position in self.bloom.positions(key):
+                    args += ['GET', 'u1', position]
+                pipe.execute_command('BITFIELD', 'idempotency:bloom', *args)
+            raws, *bits = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Idempotency cache read error: {e}")
+            return {}, maybe_seen
+
+        cached = {r: json.loads(raw) for r, raw in zip(reference_ids, raws) if raw}
+        maybe_seen |= {r for r, values in zip(reference_ids, bits) if all(values)}
+        return cached, maybe_seen
+
+    def _write_redis(self, tenant_id: str, results: Dict[str, Dict[str, Any]]):
+        if not self.redis_enabled:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for reference_id, result in results.items():
+                pipe.setex(
+                    self._result_key(tenant_id, reference_id),
+                    self.result_ttl_seconds,
+                    json.dumps(result)
+                )
+                args = []
+                for position in self.bloom.positions(self._bloom_key(tenant_id, reference_id)):
+                    args += ['SET', 'u1', position, 1]
+                pipe.execute_command('BITFIELD', 'idempotency:bloom', *args)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Idempotency cache write error: {e}")
+
+
+def replay(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Response for a duplicate: the original result, flagged as a replay"""
+    return {**{field: result.get(field) for field in RESULT_FIELDS}, "replayed": True}
+
+
+# Global guard instance
+_idempotency_guard: Optional[IdempotencyGuard] = None
+
+def get_idempotency_guard(redis_client=None) -> IdempotencyGuard:
+    """Get or create the process-wide idempotency guard"""
+    global _idempotency_guard
+    if _idempotency_guard is None:
+        _idempotency_guard = IdempotencyGuard(redis_client)
+    return _idempotency_guard
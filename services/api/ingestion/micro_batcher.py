@@ -0,0 +1,233 @@
+"""
+Ingest Micro-Batcher
+Group commit for single-transaction ingestion: concurrent requests are
+collected for a few milliseconds and written through the batch pipeline
+with one commit, then each caller gets its own result
+"""
+from collections import defaultdict
+from typing import Optional, Dict, List, Callable
+import asyncio
+import logging
+import time
+
+import psycopg
+
+from .realtime_api import RealtimeTransactionAPI, RateLimiter, TransactionCreate
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingIngest:
+    __slots__ = ('tenant_id', 'transaction', 'future', 'submitted_at')
+
+    def __init__(self, tenant_id: str, transaction: TransactionCreate, future: asyncio.Future):
+        self.tenant_id = tenant_id
+        self.transaction = transaction
+        self.future = future
+        self.submitted_at = time.time()
+
+
+class IngestMicroBatcher:
+    """
+    Collects single ingests into batches for RealtimeTransactionAPI.ingest_batch
+
+    A batch closes after max_wait_ms or max_batch_size items, whichever
+    comes first. Each of the `workers` flush loops owns one connection and
+    runs its batch in a thread, so the next batch fills while one is being
+    written. Rate limiting stays per request and happens in submit().
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        redis_client=None,
+        max_batch_size: int = 500,
+        max_wait_ms: float = 5.0,
+        workers: int = 2,
+        connect: Optional[Callable] = None
+    ):
+        self.dsn = dsn
+        self.redis_client = redis_client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.connect = connect or (lambda: psycopg.connect(self.dsn))
+        self.rate_limiter = RateLimiter(redis_client) if redis_client else None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._connections: Dict[int, object] = {}
+        self._closing = False
+
+    async def submit(self, tenant_id: str, transaction: TransactionCreate) -> dict:
+        """
+        Ingest one transaction; same result and errors as ingest_transaction
+
+        Raises: ValueError for rate limiting, validation or ingestion failures
+        """
+        if not tenant_id or not tenant_id.strip():
+            raise ValueError("tenant_id cannot be empty")
+        tenant_id = tenant_id.strip()
+
+        if self.rate_limiter:
+            allowed, retry_after = self.rate_limiter.check_rate_limit(
+                tenant_id,
+                max_requests=100,
+                window_seconds=60
+            )
+            if not allowed:
+                logger.warning(f"Rate limit exceeded for tenant {tenant_id}")
+                raise ValueError(f"Rate limit exceeded. Retry after {retry_after} seconds")
+
+        if self._closing:
+            raise ValueError("Ingestion service is shutting down")
+        self._ensure_started()
+        pending = _PendingIngest(tenant_id, transaction, asyncio.get_running_loop().create_future())
+        await self._queue.put(pending)
+        return await pending.future
+
+    async def shutdown(self):
+        """Write everything already queued, then stop the flush loops"""
+        self._closing = True
+        for _ in self._tasks:
+            await self._queue.put(None)  # one stop marker per flush loop
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for conn in self._connections.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._connections.clear()
+
+    def _ensure_started(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(worker)) for worker in range(self.workers)
+        ]
+
+    async def _flush_loop(self, worker: int):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            try:
+                await asyncio.to_thread(self._write_batch, worker, batch)
+            except Exception as e:
+                logger.error(f"Ingest micro-batch of {len(batch)} failed: {e}", exc_info=True)
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(
+                            ValueError(f"Transaction ingestion failed: {str(e)}")
+                        )
+
+    def _write_batch(self, worker: int, batch: List[_PendingIngest]):
+        """Ingest one micro-batch per tenant and resolve callers (worker thread)"""
+        db = self._connection(worker)
+        api = RealtimeTransactionAPI(db, self.redis_client)
+        api.rate_limiter = None  # already applied per request in submit()
+
+        by_tenant: Dict[str, List[_PendingIngest]] = defaultdict(list)
+        for pending in batch:
+            by_tenant[pending.tenant_id].append(pending)
+
+        for tenant_id, items in by_tenant.items():
+            try:
+                # The pipeline only awaits retry back-off; run it on this thread
+                outcomes = asyncio.run(self._ingest(api, tenant_id, items))
+            except Exception as e:
+                logger.error(f"Ingest micro-batch failed for tenant {tenant_id}: {e}", exc_info=True)
+                outcomes = [{"error": f"Transaction ingestion failed: {str(e)}"}] * len(items)
+            finally:
+                # End whatever the batch left open (a failed read, or only
+                # SELECTs when every item was invalid or replayed) so the
+                # next batch on this connection starts clean; a no-op after a commit
+                try:
+                    db.rollback()
+                except Exception as e:
+                    logger.warning(f"Rollback after micro-batch for tenant {tenant_id} failed: {e}")
+
+            finished_at = time.time()
+            for pending, outcome in zip(items, outcomes):
+                self._resolve(pending, outcome, finished_at)
+
+    async def _ingest(self, api: RealtimeTransactionAPI, tenant_id: str, items: List[_PendingIngest]) -> List[dict]:
+        result = await api.ingest_batch(
+            tenant_id,
+            [pending.transaction for pending in items],
+            max_batch_size=len(items)
+        )
+
+        # Record usage for the whole micro-batch with one counter update;
+        # replayed duplicates were billed when first ingested
+        try:
+            from billing.usage_metering import UsageMetering
+            usage = UsageMetering(api.db, self.redis_client)
+            await usage.record_transactions(tenant_id, result['success'] - result.get('replayed', 0))
+        except Exception as e:
+            logger.warning(f"Failed to record transactions for usage metering: {e}")
+
+        return result['transactions']
+
+    def _resolve(self, pending: _PendingIngest, outcome: dict, finished_at: float):
+        future = pending.future
+        loop = future.get_loop()
+        if "error" in outcome:
+            loop.call_soon_threadsafe(_set_exception, future, ValueError(outcome["error"]))
+            return
+        result = {key: value for key, value in outcome.items() if key != "index"}
+        result["processing_time_ms"] = round((finished_at - pending.submitted_at) * 1000, 2)
+        loop.call_soon_threadsafe(_set_result, future, result)
+
+    def _connection(self, worker: int):
+        conn = self._connections.get(worker)
+        if conn is None or conn.closed or conn.broken:
+            conn = self._connections[worker] = self.connect()
+        return conn
+
+
+def _set_result(future: asyncio.Future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, error: Exception):
+    if not future.done():
+        future.set_exception(error)
+
+
+# Global micro-batcher instance
+_ingest_batcher: Optional[IngestMicroBatcher] = None
+
+def get_ingest_batcher(redis_client=None) -> IngestMicroBatcher:
+    """Get or create the process-wide ingest micro-batcher"""
+    global _ingest_batcher
+    if _ingest_batcher is None:
+        from config import settings
+        _ingest_batcher = IngestMicroBatcher(
+            dsn=settings.postgres_uri,
+            redis_client=redis_client,
+            max_batch_size=settings.ingest_batch_max_size,
+            max_wait_ms=settings.ingest_batch_max_wait_ms,
+            workers=settings.ingest_batch_workers
+        )
+    return _ingest_batcher
@@ -0,0 +1,290 @@
+"""
+Parallel CSV Ingestion
+Splits a large CSV into line-aligned byte ranges and loads them in a
+process pool, each worker process on its own connection
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Dict, List, Tuple, Callable, NamedTuple
+import io
+import logging
+import multiprocessing
+import os
+
+import psycopg
+
+from .csv_ingestor import CSVIngestor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RANGE_BYTES = 64 * 1024 * 1024
+SCAN_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+class ByteRange(NamedTuple):
+    """A slice of the file's data lines (header excluded)"""
+    start: int
+    end: int
+    first_row: int  # 0-based index of the range's first data row in the file
+    rows: int
+
+
+def split_line_ranges(path: str, range_bytes: int = DEFAULT_RANGE_BYTES) -> Tuple[bytes, List[ByteRange]]:
+    """
+    Split a CSV into ranges of roughly range_bytes that end on newlines
+
+    Newlines are counted in one sequential pass so every range knows its
+    starting row number. Assumes quoted fields contain no line breaks.
+
+    Returns: (header line, ranges)
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+
+        boundaries = [data_start]
+        while boundaries[-1] + range_bytes < size:
+            f.seek(boundaries[-1] + range_bytes)
+            f.readline()
+            if f.tell() >= size:
+                break
+            boundaries.append(f.tell())
+        boundaries.append(size)
+
+        ranges = []
+        first_row = 0
+        f.seek(data_start)
+        for start, end in zip(boundaries, boundaries[1:]):
+            rows = _count_lines(f, end - start)
+            ranges.append(ByteRange(start, end, first_row, rows))
+            first_row += rows
+
+    return header, [r for r in ranges if r.end > r.start]
+
+
+def _count_lines(f, length: int) -> int:
+    """Count lines in the next length bytes (a final unterminated line counts)"""
+    lines = 0
+    last = b''
+    while length > 0:
+        block = f.read(min(SCAN_BLOCK_BYTES, length))
+        if not block:
+            break
+        lines += block.count(b'\n')
+        last = block[-1:]
+        length -= len(block)
+    if last and last != b'\n':
+        lines += 1
+    return lines
+
+
+class _RangeReader(io.RawIOBase):
+    """File-like view of the header followed by one byte range"""
+
+    def __init__(self, path: str, header: bytes, start: int, end: int):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._header = header
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._header:
+            n = min(len(buffer), len(self._header))
+            buffer[:n] = self._header[:n]
+            self._header = self._header[n:]
+            return n
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:min(len(buffer), self._remaining)]
+        n = self._file.readinto(view)
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+# Per-process connection, reused for every range the worker loads
+_worker_dsn: Optional[str] = None
+_worker_db = None
+
+def _init_worker(dsn: str):
+    global _worker_dsn
+    _worker_dsn = dsn
+
+
+def _get_worker_db():
+    global _worker_db
+    if _worker_db is None or _worker_db.closed or _worker_db.broken:
+        _worker_db = psycopg.connect(_worker_dsn)
+    return _worker_db
+
+
+def _load_range(
+    tenant_id: str,
+    path: str,
+    header: bytes,
+    byte_range: ByteRange,
+    batch_size: int,
+    upload_id: Optional[int],
+    date_format: Optional[str] = None
+) -> Dict:
+    """
+    Parse, normalize and load one byte range (runs in a worker process)
+
+    date_format is the whole file's, so a range whose dates alone would
+    fit another format (e.g. only days <= 12) is read the same way.
+    """
+    progress = {"rows_processed": 0, "rows_inserted": 0, "rows_failed": 0}
+    try:
+        ingestor = CSVIngestor(_get_worker_db())
+        ingestor._date_format = date_format
+        with io.BufferedReader(_RangeReader(path, header, byte_range.start, byte_range.end)) as source:
+            return ingestor.load_chunks(
+                tenant_id,
+                ingestor._read_chunks(source, 'csv', batch_size),
+                upload_id=upload_id,
+                row_offset=byte_range.first_row,
+                on_chunk=progress.update
+            )
+    except Exception as e:
+        # Batches committed before the failure stay loaded
+        return {**progress, "errors": [], "error": str(e)}
+
+
+class ParallelCSVIngestor:
+    """
+    Loads one CSV with a pool of worker processes
+
+    Parsing, normalization and COPY all happen in the workers; every
+    range commits batch by batch on the worker's own connection. The
+    parent only validates the header, detects the date format, plans
+    ranges and merges results.
+    """
+
+    def __init__(self, dsn: str, workers: Optional[int] = None, range_bytes: int = DEFAULT_RANGE_BYTES):
+        self.dsn = dsn
+        self.workers = workers or os.cpu_count() or 1
+        self.range_bytes = range_bytes
+
+    def ingest(
+        self,
+        tenant_id: str,
+        file_path: str,
+        batch_size: int = 10000,
+        upload_id: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Ingest a CSV file in parallel
+
+        Returns: Ingestion statistics (same shape as CSVIngestor.ingest)
+        """
+        validation = CSVIngestor(None).validate(file_path=file_path, file_type='csv')
+        if not validation['valid']:
+            return {
+                "success": False,
+                "error": validation.get('error') or '; '.join(validation['errors']),
+                **validation
+            }
+
+        try:
+            with open(file_path, 'rb') as source:
+                date_format = CSVIngestor(None).detect_date_format(source, 'csv')
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+        header, ranges = split_line_ranges(file_path, self.range_bytes)
+        total_bytes = sum(r.end - r.start for r in ranges) or 1
+        workers = max(1, min(self.workers, len(ranges)))
+        logger.info(
+            f"Parallel ingestion: tenant_id={tenant_id}, ranges={len(ranges)}, workers={workers}"
+        )
+
+        results: List[Tuple[ByteRange, Dict]] = []
+        totals = {"rows_processed": 0, "rows_inserted": 0, "rows_failed": 0}
+        bytes_done = 0
+
+        # spawn: the caller may be a threaded server process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.dsn,)
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _load_range, tenant_id, file_path, header, r, batch_size, upload_id, date_format
+                ): r
+                for r in ranges
+            }
+            for future in as_completed(futures):
+                byte_range = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"rows_processed": 0, "rows_inserted": 0, "rows_failed": 0,
+                              "errors": [], "error": str(e)}
+                results.append((byte_range, result))
+
+                for key in totals:
+                    totals[key] += result[key]
+                bytes_done += byte_range.end - byte_range.start
+                if progress_callback:
+                    progress_callback({**totals, "fraction_read": bytes_done / total_bytes})
+
+        return self._reconcile(tenant_id, results)
+
+    def _reconcile(self, tenant_id: str, results: List[Tuple[ByteRange, Dict]]) -> Dict:
+        """Merge per-range results into one report"""
+        rows_processed = rows_inserted = rows_failed = 0
+        errors = []
+        failed_ranges = 0
+
+        for byte_range, result in sorted(results):
+            rows_processed += result['rows_processed']
+            rows_inserted += result['rows_inserted']
+            rows_failed += result['rows_failed']
+            errors.extend(result['errors'])
+
+            if result.get('error'):
+                # Rows the worker never reached count as failed
+                failed_ranges += 1
+                not_loaded = max(byte_range.rows - result['rows_processed'], 0)
+                first = byte_range.first_row + result['rows_processed'] + 2
+                rows_processed += not_loaded
+                rows_failed += not_loaded
+                errors.append({
+                    "row": first,
+                    "error": f"Rows {first}-{first + not_loaded - 1} not loaded: {result['error']}"
+                })
+                logger.error(f"Range starting at row {first} failed: {result['error']}")
+
+        expected_rows = sum(r.rows for r, _ in results)
+        if rows_processed != expected_rows:
+            # Blank lines or quoted line breaks; row numbers may be offset
+            logger.warning(
+                f"Parallel ingestion read {rows_processed} rows, expected {expected_rows} lines"
+            )
+
+        logger.info(f"Ingested {rows_inserted} transactions for tenant {tenant_id} in parallel")
+
+        errors.sort(key=lambda error: error['row'])
+        if results and failed_ranges == len(results):
+            return {"success": False, "error": errors[0]['error'], "errors": errors[:10]}
+
+        return {
+            "success": True,
+            "rows_processed": rows_processed,
+            "rows_inserted": rows_inserted,
+            "rows_failed": rows_failed,
+            "errors": errors[:10],  # First 10 errors
+            "ranges": len(results),
+            "failed_ranges": failed_ranges,
+            "tenant_id": tenant_id
+        }
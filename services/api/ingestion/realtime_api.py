@@ -5,7 +5,7 @@ Production-ready with ML integration, rate limiting, and error handling
 """
 from pydantic import BaseModel, Field, validator
 from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import logging
 import asyncio
@@ -13,8 +13,14 @@ from functools import wraps
 import time
 import re
 
+import numpy as np
+import pandas as pd
+from psycopg.types.json import Json
+
 # Import ML model
-from ml_enhanced_model import predict_fraud
+from ml_enhanced_model import predict_fraud, predict_fraud_batch
+from .feature_store import get_feature_store, DEFAULT_FEATURES
+from .idempotency import get_idempotency_guard, replay
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +28,11 @@ logger = logging.getLogger(__name__)
 MAX_RETRIES = 3
 RETRY_DELAY = 0.5  # seconds
 
+# Largest batch accepted by ingest_batch
+MAX_BATCH_SIZE = 10000
+
+VALID_CHANNELS = ('ATM', 'POS', 'ONLINE', 'MOBILE', 'PHONE')
+
 
 class TransactionCreate(BaseModel):
     """Schema for creating a transaction via API"""
@@ -165,6 +176,10 @@ class RealtimeTransactionAPI:
         from ml_model_versioning import get_model_version_manager
         model_manager = get_model_version_manager(redis_client)
         self.model_version = model_manager.get_model_version()
+        # Rolling per-account features (avoids history queries on every ingest)
+        self.feature_store = get_feature_store(redis_client)
+        # Duplicate reference_ids replay the original result
+        self.idempotency = get_idempotency_guard(redis_client)
     
     async def ingest_transaction(
         self,
@@ -180,6 +195,8 @@ class RealtimeTransactionAPI:
         - Comprehensive error handling
         - Retry logic for transient failures
         - Monitoring and metrics
+        - Idempotent on reference_id: a duplicate returns the original
+          result with "replayed": True
         
         Returns: Transaction ID and fraud score
         """
@@ -206,17 +223,37 @@ class RealtimeTransactionAPI:
         transaction_id = None
         
         try:
-            # Insert transaction with retry logic
-            transaction_id = await self._insert_transaction_with_retry(
-                tenant_id, transaction
+            if transaction.reference_id:
+                original = self.idempotency.find(
+                    self.db, tenant_id, [transaction.reference_id]
+                ).get(transaction.reference_id)
+                if original:
+                    return self._replay(tenant_id, original, start_time)
+            
+            # Score before writing: features come from the feature store and
+            # the request payload, so nothing is read back from the new row
+            fraud_score = await self._calculate_fraud_score(transaction, tenant_id)
+            
+            # Persist transaction with its final status (and alert) in one commit
+            transaction_id = await self._insert_scored_transaction_with_retry(
+                tenant_id, transaction, fraud_score
             )
-            
-            # Calculate fraud score using REAL ML model
-            fraud_score = await self._calculate_fraud_score(transaction_id, transaction, tenant_id)
-            
-            # Update transaction with fraud score and status
-            await self._update_transaction_status_with_retry(
-                transaction_id, fraud_score, tenant_id, transaction.account_id
+            if transaction_id is None:
+                # A concurrent request stored this reference_id first
+                original = self.idempotency.load(
+                    self.db, tenant_id, [transaction.reference_id]
+                )[transaction.reference_id]
+                return self._replay(tenant_id, original, start_time)
+            
+            # Fold the committed transaction into the account's rolling features
+            self.feature_store.record(
+                tenant_id,
+                transaction.account_id,
+                float(transaction.amount),
+                txn_time=transaction.transaction_time,
+                city=transaction.city,
+                country=transaction.country,
+                device_id=transaction.device_id
             )
             
             # Log metrics
@@ -228,14 +265,17 @@ class RealtimeTransactionAPI:
             
             # Return result
             status = "APPROVED" if fraud_score <= 0.5 else "REVIEW" if fraud_score <= 0.8 else "BLOCKED"
-            return {
+            result = {
                 "transaction_id": transaction_id,
                 "status": status,
                 "fraud_score": round(fraud_score, 3),
                 "reference_id": transaction.reference_id,
                 "timestamp": transaction.transaction_time.isoformat(),
+                "replayed": False,
                 "processing_time_ms": round(processing_time * 1000, 2)
             }
+            self.idempotency.remember(tenant_id, [result])
+            return result
             
         except ValueError as e:
             # Rate limit or validation errors
@@ -256,100 +296,94 @@ class RealtimeTransactionAPI:
             if cursor:
                 cursor.close()
     
-    @retry_on_failure(max_retries=3, delay=0.5)
-    async def _insert_transaction_with_retry(
-        self, tenant_id: str, transaction: TransactionCreate
-    ) -> int:
-        """Insert transaction with retry logic for transient database failures"""
-        cursor = self.db.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO transactions (
-                    tenant_id, account_id, amount, currency,
-                    merchant, merchant_id, mcc, channel,
-                    city, country, ip_address,
-                    device_id, device_type,
-                    txn_time, reference_id, status,
-                    metadata
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, 'PENDING', %s
-                )
-                RETURNING id
-            """, (
-                tenant_id,
-                transaction.account_id,
-                float(transaction.amount),
-                transaction.currency,
-                transaction.merchant,
-                transaction.merchant_id,
-                transaction.mcc,
-                transaction.channel,
-                transaction.city,
-                transaction.country,
-                transaction.ip_address,
-                transaction.device_id,
-                transaction.device_type,
-                transaction.transaction_time,
-                transaction.reference_id,
-                transaction.metadata
-            ))
-            
-            result = cursor.fetchone()
-            if not result:
-                raise ValueError("Failed to insert transaction - no ID returned")
-            
-            self.db.commit()
-            return result[0]
-            
-        except Exception as e:
-            self.db.rollback()
-            raise
-        finally:
-            cursor.close()
+    def _replay(self, tenant_id: str, original: dict, start_time: float) -> dict:
+        logger.info(
+            f"Replayed transaction {original['transaction_id']} for tenant {tenant_id} "
+            f"(duplicate reference_id {original['reference_id']})"
+        )
+        return {**replay(original), "processing_time_ms": round((time.time() - start_time) * 1000, 2)}
     
     @retry_on_failure(max_retries=3, delay=0.5)
-    async def _update_transaction_status_with_retry(
-        self, transaction_id: int, fraud_score: float,
-        tenant_id: str, account_id: str
-    ):
-        """Update transaction status and create alerts with retry logic"""
+    async def _insert_scored_transaction_with_retry(
+        self, tenant_id: str, transaction: TransactionCreate, fraud_score: float
+    ) -> Optional[int]:
+        """
+        Insert a scored transaction and its alert in one statement and commit
+        
+        Retries are safe: a failed attempt is rolled back as a whole.
+        Returns None if the tenant already has a transaction with this
+        reference_id (nothing is written).
+        """
         cursor = self.db.cursor()
         try:
-            # Update transaction
             cursor.execute("""
-                UPDATE transactions
-                SET risk_score = %s,
-                    status = CASE
-                        WHEN %s > 0.8 THEN 'BLOCKED'
-                        WHEN %s > 0.5 THEN 'REVIEW'
-                        ELSE 'APPROVED'
-                    END
-                WHERE id = %s AND tenant_id = %s
-            """, (fraud_score, fraud_score, fraud_score, transaction_id, tenant_id))
-            
-            # Create alert if high risk
-            if fraud_score > 0.5:
-                cursor.execute("""
+                WITH txn AS (
+                    INSERT INTO transactions (
+                        tenant_id, account_id, amount, currency,
+                        merchant, merchant_id, mcc, channel,
+                        city, country, ip_address,
+                        device_id, device_type,
+                        txn_time, reference_id, status, risk_score,
+                        metadata
+                    ) VALUES (
+                        %(tenant_id)s, %(account_id)s, %(amount)s, %(currency)s,
+                        %(merchant)s, %(merchant_id)s, %(mcc)s, %(channel)s,
+                        %(city)s, %(country)s, %(ip_address)s,
+                        %(device_id)s, %(device_type)s,
+                        %(txn_time)s, %(reference_id)s,
+                        CASE
+                            WHEN %(score)s > 0.8 THEN 'BLOCKED'
+                            WHEN %(score)s > 0.5 THEN 'REVIEW'
+                            ELSE 'APPROVED'
+                        END,
+                        %(score)s,
+                        %(metadata)s
+                    )
+                    ON CONFLICT (tenant_id, reference_id) WHERE reference_id IS NOT NULL DO NOTHING
+                    RETURNING id, account_id
+                ),
+                alert AS (
                     INSERT INTO fraud_alerts (
                         tenant_id, account_id, transaction_id,
                         rule_code, severity, reason, status
-                    ) VALUES (
-                        %s, %s, %s, 'HIGH_RISK_SCORE',
-                        CASE WHEN %s > 0.8 THEN 'HIGH' ELSE 'MEDIUM' END,
-                        'Fraud score: ' || %s::text,
-                        'OPEN'
                     )
+                    SELECT
+                        %(tenant_id)s, txn.account_id, txn.id, 'HIGH_RISK_SCORE',
+                        CASE WHEN %(score)s > 0.8 THEN 'HIGH' ELSE 'MEDIUM' END,
+                        'Fraud score: ' || %(score)s::text,
+                        'OPEN'
+                    FROM txn
+                    WHERE %(score)s > 0.5
                     ON CONFLICT DO NOTHING
-                """, (
-                    tenant_id,
-                    account_id,
-                    transaction_id,
-                    fraud_score,
-                    fraud_score
-                ))
+                )
+                SELECT id FROM txn
+            """, {
+                "tenant_id": tenant_id,
+                "account_id": transaction.account_id,
+                "amount": float(transaction.amount),
+                "currency": transaction.currency,
+                "merchant": transaction.merchant,
+                "merchant_id": transaction.merchant_id,
+                "mcc": transaction.mcc,
+                "channel": transaction.channel,
+                "city": transaction.city,
+                "country": transaction.country,
+                "ip_address": transaction.ip_address,
+                "device_id": transaction.device_id,
+                "device_type": transaction.device_type,
+                "txn_time": transaction.transaction_time,
+                "reference_id": transaction.reference_id,
+                "score": fraud_score,
+                "metadata": Json(transaction.metadata) if transaction.metadata is not None else None
+            })
+            
+            result = cursor.fetchone()
+            if not result and not transaction.reference_id:
+                raise ValueError("Failed to insert transaction - no ID returned")
             
             self.db.commit()
+            return result[0] if result else None
+            
         except Exception as e:
             self.db.rollback()
             raise
@@ -358,13 +392,15 @@ class RealtimeTransactionAPI:
     
     async def _calculate_fraud_score(
         self,
-        transaction_id: int,
         transaction: TransactionCreate,
         tenant_id: str
     ) -> float:
         """
         Calculate fraud score using REAL ML model (not simple rules!)
         
+        Runs before the transaction is written, so the account history
+        does not include it yet.
+        
         This method:
         1. Fetches historical data for ML features
         2. Formats transaction for ML model
@@ -376,7 +412,7 @@ class RealtimeTransactionAPI:
         try:
             # Get historical data for ML features
             historical_data = await self._get_account_historical_data(
-                tenant_id, transaction.account_id, transaction_id
+                tenant_id, transaction
             )
             
             # Prepare transaction dict for ML model
@@ -406,7 +442,7 @@ class RealtimeTransactionAPI:
                     cached = self.ml_cache.get(cache_key)
                     if cached:
                         cached_prediction = json.loads(cached)
-                        logger.debug(f"ML prediction cache hit for transaction {transaction_id}")
+                        logger.debug(f"ML prediction cache hit for account {transaction.account_id}")
                 except Exception as e:
                     logger.warning(f"Cache read error: {e}")
             
@@ -442,7 +478,7 @@ class RealtimeTransactionAPI:
             fraud_probability = max(0.0, min(1.0, float(fraud_probability)))
             
             logger.debug(
-                f"ML prediction for transaction {transaction_id}: "
+                f"ML prediction for account {transaction.account_id}: "
                 f"fraud_probability={fraud_probability:.3f}, "
                 f"risk_level={prediction.get('risk_level', 'UNKNOWN')}"
             )
@@ -451,7 +487,7 @@ class RealtimeTransactionAPI:
             
         except Exception as e:
             logger.error(
-                f"ML model scoring failed for transaction {transaction_id}: {e}. "
+                f"ML model scoring failed for account {transaction.account_id}: {e}. "
                 f"Falling back to rule-based scoring.",
                 exc_info=True
             )
@@ -459,137 +495,22 @@ class RealtimeTransactionAPI:
             return await self._fallback_risk_score(transaction)
     
     async def _get_account_historical_data(
-        self, tenant_id: str, account_id: str, current_transaction_id: int
+        self, tenant_id: str, transaction: TransactionCreate
     ) -> Dict[str, Any]:
-        """Get historical account data for ML features"""
-        cursor = self.db.cursor()
+        """Get historical account data for ML features from the online feature store"""
         try:
-            # Get velocity (transactions in last hour)
-            cursor.execute("""
-                SELECT COUNT(*) as velocity
-                FROM transactions
-                WHERE account_id = %s 
-                AND tenant_id = %s
-                AND txn_time > NOW() - INTERVAL '1 hour'
-                AND id != %s
-            """, (account_id, tenant_id, current_transaction_id))
-            velocity_row = cursor.fetchone()
-            velocity = int(velocity_row[0]) if velocity_row and velocity_row[0] else 1
-            
-            # Get historical average and std deviation
-            cursor.execute("""
-                SELECT 
-                    COALESCE(AVG(amount), 150) as avg_amount,
-                    COALESCE(STDDEV(amount), 50) as std_amount
-                FROM transactions
-                WHERE account_id = %s 
-                AND tenant_id = %s
-                AND txn_time > NOW() - INTERVAL '30 days'
-                AND id != %s
-            """, (account_id, tenant_id, current_transaction_id))
-            stats_row = cursor.fetchone()
-            avg_amount = float(stats_row[0]) if stats_row and stats_row[0] else 150.0
-            std_amount = float(stats_row[1]) if stats_row and stats_row[1] else 50.0
-            
-            # Get time since last transaction
-            cursor.execute("""
-                SELECT EXTRACT(EPOCH FROM (NOW() - MAX(txn_time))) / 60 as minutes
-                FROM transactions
-                WHERE account_id = %s 
-                AND tenant_id = %s
-                AND id != %s
-            """, (account_id, tenant_id, current_transaction_id))
-            time_row = cursor.fetchone()
-            minutes_since_last = float(time_row[0]) if time_row and time_row[0] is not None else 60.0
-            
-            # Check location change
-            cursor.execute("""
-                SELECT city, country
-                FROM transactions
-                WHERE account_id = %s 
-                AND tenant_id = %s
-                AND id != %s
-                ORDER BY txn_time DESC
-                LIMIT 1
-            """, (account_id, tenant_id, current_transaction_id))
-            last_txn = cursor.fetchone()
-            location_changed = False
-            
-            # Get current transaction location (need to query it)
-            cursor.execute("""
-                SELECT city, country
-                FROM transactions
-                WHERE id = %s
-            """, (current_transaction_id,))
-            current_txn = cursor.fetchone()
-            
-            if last_txn and current_txn:
-                last_city = last_txn[0] if last_txn[0] else ""
-                last_country = last_txn[1] if last_txn[1] else ""
-                current_city = current_txn[0] if current_txn[0] else ""
-                current_country = current_txn[1] if current_txn[1] else ""
-                location_changed = (
-                    (last_city and current_city and last_city != current_city) or
-                    (last_country and current_country and last_country != current_country)
-                )
-            
-            # Check device change
-            cursor.execute("""
-                SELECT device_id
-                FROM transactions
-                WHERE account_id = %s 
-                AND tenant_id = %s
-                AND id != %s
-                ORDER BY txn_time DESC
-                LIMIT 1
-            """, (account_id, tenant_id, current_transaction_id))
-            last_device = cursor.fetchone()
-            
-            cursor.execute("""
-                SELECT device_id
-                FROM transactions
-                WHERE id = %s
-            """, (current_transaction_id,))
-            current_device = cursor.fetchone()
-            
-            device_changed = False
-            if last_device and current_device:
-                last_did = last_device[0] if last_device[0] else ""
-                current_did = current_device[0] if current_device[0] else ""
-                device_changed = (last_did and current_did and last_did != current_did)
-            
-            # Get merchant risk (default to 0.2 if unknown)
-            merchant_risk = 0.2  # TODO: Implement merchant risk scoring from historical data
-            
-            # Get IP reputation (default to 0.8 if unknown)
-            ip_reputation = 0.8  # TODO: Implement IP reputation check
-            
-            return {
-                'velocity': velocity,
-                'avg_amount': avg_amount,
-                'std_amount': std_amount,
-                'minutes_since_last': minutes_since_last,
-                'location_changed': location_changed,
-                'device_changed': device_changed,
-                'merchant_risk': merchant_risk,
-                'ip_reputation': ip_reputation
-            }
-            
+            return self.feature_store.get_features(
+                self.db,
+                tenant_id,
+                transaction.account_id,
+                city=transaction.city,
+                country=transaction.country,
+                device_id=transaction.device_id
+            )
         except Exception as e:
             logger.error(f"Failed to get historical data: {e}")
-            # Return defaults if query fails
-            return {
-                'velocity': 1,
-                'avg_amount': 150.0,
-                'std_amount': 50.0,
-                'minutes_since_last': 60.0,
-                'location_changed': False,
-                'device_changed': False,
-                'merchant_risk': 0.2,
-                'ip_reputation': 0.8
-            }
-        finally:
-            cursor.close()
+            # Return defaults if the feature store fails
+            return dict(DEFAULT_FEATURES)
     
     async def _fallback_risk_score(self, transaction: TransactionCreate) -> float:
         """Fallback rule-based scoring if ML model fails"""
@@ -608,37 +529,362 @@ class RealtimeTransactionAPI:
         self,
         tenant_id: str,
         transactions: list[TransactionCreate],
-        max_batch_size: int = 100
+        max_batch_size: int = MAX_BATCH_SIZE
     ) -> dict:
         """
         Ingest multiple transactions at once
         
-        Returns: Batch processing results
+        The batch is validated column-wise, features for all of its accounts
+        are loaded together, every row is scored in one vectorized call and
+        the valid rows and their alerts are written by one statement with a
+        single commit. Invalid rows are skipped, not fatal. Items whose
+        reference_id was already ingested (or repeats one earlier in the
+        batch) are not written again; their outcome replays the original.
+        
+        Returns: Batch processing results with one outcome per input item,
+        in input order ("index" is the item's position in the request)
         """
+        start_time = time.time()
+        
         if len(transactions) > max_batch_size:
             return {
                 "success": False,
                 "error": f"Batch size {len(transactions)} exceeds maximum {max_batch_size}"
             }
         
+        # The whole batch counts as one request against the rate limit
+        if self.rate_limiter:
+            allowed, retry_after = self.rate_limiter.check_rate_limit(
+                tenant_id,
+                max_requests=100,
+                window_seconds=60
+            )
+            if not allowed:
+                logger.warning(f"Rate limit exceeded for tenant {tenant_id}")
+                raise ValueError(f"Rate limit exceeded. Retry after {retry_after} seconds")
+        
+        if not tenant_id or not tenant_id.strip():
+            raise ValueError("tenant_id cannot be empty")
+        tenant_id = tenant_id.strip()
+        
         results = {
             "total": len(transactions),
             "success": 0,
             "failed": 0,
+            "replayed": 0,
             "transactions": []
         }
+        if not transactions:
+            return results
+        
+        batch = self._batch_frame(transactions)
+        errors = self._validate_batch(tenant_id, batch)
+        valid = errors.isna().to_numpy()
+        batch = batch[valid].reset_index(drop=True)
+        
+        outcomes: Dict[int, dict] = {
+            int(index): {"index": int(index), "error": error, "reference_id": transactions[index].reference_id}
+            for index, error in errors.dropna().items()
+        }
+        
+        # Already ingested reference_ids replay the stored result; repeats
+        # within the batch replay their first occurrence once it is written
+        references = batch['reference_id']
+        originals = self.idempotency.find(self.db, tenant_id, references.dropna().tolist())
+        seen = references.isin(list(originals))
+        for row in batch[seen].itertuples(index=False):
+            outcomes[int(row.position)] = {"index": int(row.position), **replay(originals[row.reference_id])}
+        repeated = references.notna() & references.duplicated() & ~seen
+        repeats = batch[repeated]
+        batch = batch[~(seen | repeated)].reset_index(drop=True)
         
-        for transaction in transactions:
+        if len(batch):
+            scores = self._score_batch(tenant_id, batch)
             try:
-                result = await self.ingest_transaction(tenant_id, transaction)
-                results["transactions"].append(result)
-                results["success"] += 1
+                transaction_ids = await self._insert_batch_with_retry(tenant_id, batch, scores)
             except Exception as e:
-                results["failed"] += 1
-                results["transactions"].append({
-                    "error": str(e),
-                    "reference_id": transaction.reference_id
-                })
+                logger.error(f"Batch insert failed for tenant {tenant_id}: {e}", exc_info=True)
+                transaction_ids = None
+                for position in batch['position'].tolist():
+                    outcomes[position] = {
+                        "index": position,
+                        "error": f"Transaction ingestion failed: {str(e)}",
+                        "reference_id": transactions[position].reference_id
+                    }
+            
+            if transaction_ids is not None:
+                inserted, conflicts = [], []
+                for row, transaction_id, fraud_score in zip(
+                    batch.itertuples(index=False), transaction_ids, scores
+                ):
+                    if transaction_id is None:
+                        # Stored by a concurrent request since the lookup above
+                        conflicts.append(row)
+                        continue
+                    fraud_score = float(fraud_score)
+                    outcomes[int(row.position)] = {
+                        "index": int(row.position),
+                        "transaction_id": transaction_id,
+                        "status": "APPROVED" if fraud_score <= 0.5 else "REVIEW" if fraud_score <= 0.8 else "BLOCKED",
+                        "fraud_score": round(fraud_score, 3),
+                        "reference_id": row.reference_id,
+                        "timestamp": row.txn_time.isoformat(),
+                        "replayed": False
+                    }
+                    inserted.append(outcomes[int(row.position)])
+                    self.feature_store.record(
+                        tenant_id,
+                        row.account_id,
+                        float(row.amount),
+                        txn_time=row.txn_time,
+                        city=row.city,
+                        country=row.country,
+                        device_id=row.device_id
+                    )
+                self.idempotency.remember(tenant_id, inserted)
+                
+                if conflicts:
+                    originals = self.idempotency.load(
+                        self.db, tenant_id, [row.reference_id for row in conflicts]
+                    )
+                    for row in conflicts:
+                        outcomes[int(row.position)] = {
+                            "index": int(row.position), **replay(originals[row.reference_id])
+                        }
+        
+        first_positions = dict(zip(batch['reference_id'], batch['position']))
+        for row in repeats.itertuples(index=False):
+            first = outcomes[int(first_positions[row.reference_id])]
+            if "error" in first:
+                outcomes[int(row.position)] = {**first, "index": int(row.position)}
+            else:
+                outcomes[int(row.position)] = {"index": int(row.position), **replay(first)}
         
+        results["transactions"] = [outcomes[index] for index in range(len(transactions))]
+        results["failed"] = sum(1 for outcome in results["transactions"] if "error" in outcome)
+        results["success"] = len(transactions) - results["failed"]
+        results["replayed"] = sum(1 for outcome in results["transactions"] if outcome.get("replayed"))
+        results["processing_time_ms"] = round((time.time() - start_time) * 1000, 2)
+        
+        logger.info(
+            f"Ingested batch for tenant {tenant_id}: {results['success']} of "
+            f"{results['total']} transactions in {results['processing_time_ms']}ms"
+        )
         return results
-
+    
+    def _batch_frame(self, transactions: list[TransactionCreate]) -> pd.DataFrame:
+        """Columnar view of the batch; naive UTC timestamps like the CSV path"""
+        batch = pd.DataFrame([t.dict() for t in transactions])
+        batch.insert(0, 'position', range(len(transactions)))
+        batch['txn_time'] = [
+            t.transaction_time.astimezone(timezone.utc).replace(tzinfo=None)
+            if t.transaction_time.tzinfo else t.transaction_time
+            for t in transactions
+        ]
+        return batch.drop(columns=['transaction_time'])
+    
+    def _validate_batch(self, tenant_id: str, batch: pd.DataFrame) -> pd.Series:
+        """
+        Per-row error for values the transactions table would reject
+        
+        Field-level checks already ran in TransactionCreate; these are the
+        column and foreign key constraints, evaluated for the whole batch.
+        Returns a Series of error messages (None for valid rows).
+        """
+        def too_long(column: str, limit: int) -> np.ndarray:
+            return (batch[column].fillna('').str.len() > limit).to_numpy()
+        
+        account_ok = batch['account_id'].str.fullmatch(r'\d{1,9}').to_numpy()
+        account_ids = pd.to_numeric(batch['account_id'].where(account_ok), errors='coerce')
+        known = self._existing_accounts(tenant_id, account_ids.dropna().astype(int).unique().tolist())
+        
+        conditions = [
+            ~account_ok,
+            ~account_ids.isin(known).to_numpy(),
+            batch['amount'].astype(float).to_numpy() >= 1e13,
+            too_long('merchant', 128),
+            too_long('city', 64),
+            too_long('country', 2),
+            ~batch['channel'].isin(VALID_CHANNELS).to_numpy()
+        ]
+        messages = [
+            'account_id must be a numeric account id',
+            'Unknown account_id',
+            'amount out of range',
+            'merchant must be <= 128 characters',
+            'city must be <= 64 characters',
+            'country must be an ISO code',
+            'Invalid channel'
+        ]
+        errors = np.select(conditions, messages, default=None)
+        return pd.Series(errors, index=batch.index, dtype=object)
+    
+    def _existing_accounts(self, tenant_id: str, account_ids: list[int]) -> set:
+        if not account_ids:
+            return set()
+        cursor = self.db.cursor()
+        try:
+            cursor.execute("""
+                SELECT id FROM accounts
+                WHERE tenant_id = %s AND id = ANY(%s)
+            """, (tenant_id, account_ids))
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+    
+    def _score_batch(self, tenant_id: str, batch: pd.DataFrame) -> np.ndarray:
+        """Fraud probability for every row, using one vectorized model call"""
+        features = self.feature_store.get_features_batch(
+            self.db,
+            tenant_id,
+            batch[['account_id', 'amount', 'txn_time', 'city', 'country', 'device_id']].to_dict('records')
+        )
+        try:
+            def column(name: str) -> np.ndarray:
+                return np.array([f[name] for f in features], dtype=float)
+            
+            prediction = predict_fraud_batch({
+                'amount': batch['amount'].astype(float).to_numpy(),
+                'transactions_last_hour': column('velocity'),
+                'historical_avg_amount': column('avg_amount'),
+                'historical_std_amount': column('std_amount'),
+                'minutes_since_last_transaction': column('minutes_since_last'),
+                'location_changed': column('location_changed'),
+                'merchant_risk_score': column('merchant_risk'),
+                'device_changed': column('device_changed'),
+                'ip_reputation_score': column('ip_reputation')
+            })
+            return np.clip(prediction['fraud_probability'].astype(float), 0.0, 1.0)
+        except Exception as e:
+            logger.error(
+                f"Batch ML scoring failed: {e}. Falling back to rule-based scoring.",
+                exc_info=True
+            )
+            return self._fallback_risk_scores(batch)
+    
+    def _fallback_risk_scores(self, batch: pd.DataFrame) -> np.ndarray:
+        """Column-wise _fallback_risk_score"""
+        amount = batch['amount'].astype(float).to_numpy()
+        score = np.select([amount > 5000, amount > 1000], [0.5, 0.3], 0.0)
+        country = batch['country']
+        score += np.where((country.notna() & ~country.isin(['USA', 'CAN', 'US'])).to_numpy(), 0.2, 0.0)
+        score += np.where((batch['channel'] == 'ONLINE').to_numpy(), 0.1, 0.0)
+        return np.minimum(score, 1.0)
+    
+    @retry_on_failure(max_retries=3, delay=0.5)
+    async def _insert_batch_with_retry(
+        self, tenant_id: str, batch: pd.DataFrame, scores: np.ndarray
+    ) -> list[Optional[int]]:
+        """
+        Insert scored rows and their alerts in one statement and commit
+        
+        reference_ids must be unique within the batch.
+        Returns: transaction ids in batch order (None for rows whose
+        reference_id the tenant already has)
+        """
+        def values(column: str) -> list:
+            return batch[column].astype(object).where(batch[column].notna(), None).tolist()
+        
+        cursor = self.db.cursor()
+        try:
+            cursor.execute("""
+                WITH input AS (
+                    -- Ids are drawn up front so inserted rows map back to ord by id
+                    SELECT nextval('seq_txns') AS id, *
+                    FROM unnest(
+                        %(account_id)s::int[], %(amount)s::numeric[], %(currency)s::text[],
+                        %(merchant)s::text[], %(merchant_id)s::text[], %(mcc)s::text[],
+                        %(channel)s::text[], %(city)s::text[], %(country)s::text[],
+                        %(ip_address)s::text[], %(device_id)s::text[], %(device_type)s::text[],
+                        %(txn_time)s::timestamp[], %(reference_id)s::text[],
+                        %(risk_score)s::numeric[], %(metadata)s::jsonb[]
+                    ) WITH ORDINALITY AS i(
+                        account_id, amount, currency, merchant, merchant_id, mcc,
+                        channel, city, country, ip_address, device_id, device_type,
+                        txn_time, reference_id, risk_score, metadata, ord
+                    )
+                ),
+                txn AS (
+                    INSERT INTO transactions (
+                        id, tenant_id, account_id, amount, currency,
+                        merchant, merchant_id, mcc, channel,
+                        city, country, ip_address,
+                        device_id, device_type,
+                        txn_time, reference_id, status, risk_score,
+                        metadata
+                    )
+                    SELECT
+                        id, %(tenant_id)s, account_id, amount, currency,
+                        merchant, merchant_id, mcc, channel,
+                        city, country, ip_address,
+                        device_id, device_type,
+                        txn_time, reference_id,
+                        CASE
+                            WHEN risk_score > 0.8 THEN 'BLOCKED'
+                            WHEN risk_score > 0.5 THEN 'REVIEW'
+                            ELSE 'APPROVED'
+                        END,
+                        risk_score,
+                        metadata
+                    FROM input
+                    ORDER BY ord
+                    ON CONFLICT (tenant_id, reference_id) WHERE reference_id IS NOT NULL DO NOTHING
+                    RETURNING id, account_id, reference_id, risk_score
+                ),
+                alerts AS (
+                    INSERT INTO fraud_alerts (
+                        tenant_id, account_id, transaction_id,
+                        rule_code, severity, reason, status
+                    )
+                    SELECT
+                        %(tenant_id)s, account_id, id, 'HIGH_RISK_SCORE',
+                        CASE WHEN risk_score > 0.8 THEN 'HIGH' ELSE 'MEDIUM' END,
+                        'Fraud score: ' || risk_score::text,
+                        'OPEN'
+                    FROM txn
+                    WHERE risk_score > 0.5
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT i.ord, t.id
+                FROM txn t
+                JOIN input i ON i.id = t.id
+            """, {
+                "tenant_id": tenant_id,
+                "account_id": batch['account_id'].astype(int).tolist(),
+                "amount": batch['amount'].tolist(),
+                "currency": values('currency'),
+                "merchant": values('merchant'),
+                "merchant_id": values('merchant_id'),
+                "mcc": values('mcc'),
+                "channel": values('channel'),
+                "city": values('city'),
+                "country": values('country'),
+                "ip_address": values('ip_address'),
+                "device_id": values('device_id'),
+                "device_type": values('device_type'),
+                "txn_time": [ts.to_pydatetime() for ts in batch['txn_time']],
+                "reference_id": values('reference_id'),
+                "risk_score": [float(score) for score in scores],
+                "metadata": [Json(m) if m is not None else None for m in batch['metadata']]
+            })
+            
+            # ord is 1-based; rows skipped on a reference_id conflict return nothing
+            ids = dict(cursor.fetchall())
+            transaction_ids = [ids.get(ord) for ord in range(1, len(batch) + 1)]
+            missing = [
+                ord for ord, (transaction_id, reference_id) in enumerate(
+                    zip(transaction_ids, values('reference_id')), start=1
+                )
+                if transaction_id is None and reference_id is None
+            ]
+            if missing:
+                raise ValueError(f"Batch insert returned no id for rows {missing}")
+            
+            self.db.commit()
+            return transaction_ids
+            
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            cursor.close()
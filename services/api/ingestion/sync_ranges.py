@@ -0,0 +1,328 @@
+"""
+Parallel Range Backfill
+Splits a source table into key ranges and extracts them concurrently over
+a small pool of source connections, with a checkpoint per range in
+data_sync_ranges so an interrupted backfill resumes only unfinished ranges
+"""
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Optional, Dict, List, Tuple, Any
+import asyncio
+import logging
+
+from psycopg.types.json import Json
+
+from .account_resolver import AccountResolver
+from .db_connectors import (
+    DatabaseConnector, SyncProgress, create_connector, load_sync_batch,
+    parse_watermark, watermark_of
+)
+
+logger = logging.getLogger(__name__)
+
+
+def split_key_range(low: Any, high: Any, parts: int) -> List[Tuple[Any, Any]]:
+    """
+    Split [low, high] into up to `parts` equal-width (lower, upper] ranges
+
+    The first range has no lower bound, so it includes low itself. Works
+    for integer keys and timestamps; anything else stays one open range.
+    """
+    if isinstance(low, Decimal) and isinstance(high, Decimal):
+        if low == low.to_integral_value() and high == high.to_integral_value():
+            low, high = int(low), int(high)
+    splittable = (
+        (isinstance(low, int) and isinstance(high, int)) or
+        (isinstance(low, datetime) and isinstance(high, datetime))
+    )
+    if not splittable or isinstance(low, bool) or high <= low or parts <= 1:
+        return [(None, None)]
+
+    step = (high - low) / parts
+    bounds = []
+    for i in range(1, parts):
+        bound = low + (round(step * i) if isinstance(low, int) else step * i)
+        if not bounds or bound > bounds[-1]:
+            bounds.append(bound)
+    uppers = [bound for bound in bounds if bound < high] + [high]
+    return list(zip([None] + uppers[:-1], uppers))
+
+
+def _json_bound(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _parse_bound(key_column: str, value: Any) -> Any:
+    if key_column == 'transaction_date' and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class _KeyRange:
+    __slots__ = ('range_no', 'key_column', 'lower', 'upper', 'watermark', 'high_water', 'rows_loaded')
+
+    def __init__(self, range_no: int, key_column: str, lower: Any, upper: Any,
+                 watermark: Optional[Dict] = None, high_water: Optional[Dict] = None, rows_loaded: int = 0):
+        self.range_no = range_no
+        self.key_column = key_column
+        self.lower = lower
+        self.upper = upper
+        self.watermark = watermark
+        self.high_water = high_water
+        self.rows_loaded = rows_loaded
+
+
+class RangeBackfill:
+    """
+    Parallel backfill of one data sync job
+
+    The source is split by its key: numeric ids when the mapped 'id' column
+    is an integer, otherwise the mapped transaction_date, using equal-width
+    ranges between the MIN and MAX found at planning time. Each of
+    `connections` workers owns one source connection and one connection to
+    our database, takes the next unfinished range and streams it through
+    the bulk-load path. Every batch commits with its range's checkpoint
+    (position and latest (transaction_date, id) seen).
+
+    When all ranges are done, the latest row over all ranges becomes the
+    job's incremental watermark and the ranges are removed. Rows added to
+    the source above the planned MAX are left to the incremental syncs.
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        job_id: int,
+        tenant_id: str,
+        connector_type: str,
+        connection_params: Dict,
+        table_name: str,
+        column_mapping: Dict,
+        arraysize: int
+    ):
+        self.scheduler = scheduler
+        self.db = scheduler.db
+        self.job_id = job_id
+        self.tenant_id = tenant_id
+        self.connector_type = connector_type
+        self.connection_params = connection_params
+        self.table_name = table_name
+        self.column_mapping = column_mapping
+        self.arraysize = arraysize
+        self.connections = scheduler.backfill_connections
+        self.ranges = scheduler.backfill_ranges
+        if scheduler.connect is None:
+            raise ValueError("A parallel backfill needs a connect factory for our database")
+
+    async def run(self, connector: DatabaseConnector, progress: SyncProgress):
+        """Backfill every unfinished range, then hand over to incremental sync"""
+        ranges = await asyncio.to_thread(self._pending_ranges)
+        if ranges is None:
+            ranges = await asyncio.to_thread(self._plan, connector)
+
+        queue = asyncio.Queue()
+        for key_range in ranges:
+            queue.put_nowait(key_range)
+        workers = min(self.connections, len(ranges))
+        logger.info(
+            f"Backfilling sync job {self.job_id}: {len(ranges)} ranges over {workers} connections"
+        )
+
+        errors = await asyncio.gather(
+            *(self._worker(queue, progress) for _ in range(workers)),
+            return_exceptions=True
+        )
+        failures = [error for error in errors if isinstance(error, BaseException)]
+        if failures:
+            raise failures[0]
+
+        await asyncio.to_thread(self._finish)
+
+    # ------------------------------------------------------------------
+    # Planning and checkpoints (our database)
+    # ------------------------------------------------------------------
+
+    def _pending_ranges(self) -> Optional[List[_KeyRange]]:
+        """Ranges of an interrupted backfill (None if there is none)"""
+        cursor = self.db.cursor()
+        try:
+            cursor.execute("""
+                SELECT range_no, key_column, lower_bound, upper_bound,
+                       watermark, high_water, rows_loaded, status
+                FROM data_sync_ranges
+                WHERE job_id = %s
+                ORDER BY range_no
+            """, (self.job_id,))
+            rows = cursor.fetchall()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        if not rows:
+            return None
+        return [
+            _KeyRange(
+                range_no, key_column,
+                _parse_bound(key_column, lower), _parse_bound(key_column, upper),
+                parse_watermark(watermark), parse_watermark(high_water), rows_loaded
+            )
+            for range_no, key_column, lower, upper, watermark, high_water, rows_loaded, status in rows
+            if status != 'DONE'
+        ]
+
+    def _plan(self, connector: DatabaseConnector) -> List[_KeyRange]:
+        """Split the source by its key bounds and store the ranges"""
+        bounds = connector.key_bounds(self.table_name, self.column_mapping)
+        if bounds['id'][0] is None:
+            return []  # empty source
+        key_column = 'id'
+        splits = split_key_range(*bounds['id'], self.ranges)
+        if len(splits) == 1 and 'transaction_date' in bounds:
+            key_column = 'transaction_date'
+            splits = split_key_range(*bounds['transaction_date'], self.ranges)
+
+        ranges = [_KeyRange(i, key_column, lower, upper) for i, (lower, upper) in enumerate(splits)]
+        cursor = self.db.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO data_sync_ranges (job_id, range_no, key_column, lower_bound, upper_bound)
+                SELECT %s, range_no, %s, lower_bound, upper_bound
+                FROM unnest(%s::int[], %s::jsonb[], %s::jsonb[]) AS r(range_no, lower_bound, upper_bound)
+            """, (
+                self.job_id, key_column,
+                [r.range_no for r in ranges],
+                [Json(_json_bound(r.lower)) for r in ranges],
+                [Json(_json_bound(r.upper)) for r in ranges]
+            ))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            cursor.close()
+        return ranges
+
+    def _finish(self):
+        """Latest row over all ranges becomes the job watermark; ranges are dropped"""
+        cursor = self.db.cursor()
+        try:
+            cursor.execute("""
+                SELECT high_water FROM data_sync_ranges
+                WHERE job_id = %s AND high_water IS NOT NULL
+            """, (self.job_id,))
+            marks = [parse_watermark(row[0]) for row in cursor.fetchall()]
+            latest = max(marks, key=self._order_key, default=None)
+
+            if latest is not None:
+                cursor.execute("""
+                    UPDATE data_sync_jobs SET watermark = %s WHERE id = %s
+                """, (Json(watermark_of({'transaction_date': latest['time'], 'id': latest['id']})), self.job_id))
+            cursor.execute("DELETE FROM data_sync_ranges WHERE job_id = %s", (self.job_id,))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _order_key(self, mark: Dict) -> tuple:
+        """(transaction_date, id) order of the incremental keyset"""
+        if 'transaction_date' in self.column_mapping:
+            return (mark['time'], mark['id'])
+        return (mark['id'],)
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _worker(self, queue: asyncio.Queue, progress: SyncProgress):
+        connector = create_connector(self.connector_type, self.connection_params, keep_connection=True)
+        db = self.scheduler.connect()
+        # Pending account creations are per transaction, so per connection
+        resolver = AccountResolver()
+        try:
+            while not queue.empty():
+                key_range = queue.get_nowait()
+                await self._extract(connector, db, resolver, key_range, progress)
+        finally:
+            connector.close_quietly()
+            db.close()
+
+    async def _extract(self, connector, db, resolver, key_range: _KeyRange, progress: SyncProgress):
+        batches = connector.stream_transactions(
+            self.table_name,
+            self.column_mapping,
+            watermark=key_range.watermark,
+            arraysize=self.arraysize,
+            key_range=(key_range.key_column, key_range.lower, key_range.upper)
+        )
+        try:
+            async for transactions in batches:
+                result = await asyncio.to_thread(
+                    self._load, db, resolver, key_range, transactions
+                )
+                progress.add(len(transactions), result)
+        finally:
+            await batches.aclose()
+
+        await asyncio.to_thread(self._complete, db, key_range)
+        logger.info(
+            f"Sync job {self.job_id} range {key_range.range_no} done ({key_range.rows_loaded} rows)"
+        )
+
+    def _load(self, db, resolver, key_range: _KeyRange, transactions: List[Dict]) -> Dict:
+        position = watermark_of(transactions[-1])
+        high_water = key_range.high_water
+        latest = self._latest_row(transactions)
+        if latest is not None:
+            mark = {'time': latest.get('transaction_date'), 'id': latest.get('id')}
+            if high_water is None or self._order_key(mark) > self._order_key(high_water):
+                high_water = mark
+        rows_loaded = key_range.rows_loaded + len(transactions)
+
+        def checkpoint(cursor):
+            cursor.execute("""
+                UPDATE data_sync_ranges
+                SET watermark = %s, high_water = %s, rows_loaded = %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND range_no = %s
+            """, (
+                Json(position),
+                Json(watermark_of({'transaction_date': high_water['time'], 'id': high_water['id']}))
+                if high_water else None,
+                rows_loaded, self.job_id, key_range.range_no
+            ))
+
+        result = load_sync_batch(
+            db, resolver, self.tenant_id, self.job_id,
+            transactions, key_range.rows_loaded, checkpoint
+        )
+        key_range.watermark = parse_watermark(position)
+        key_range.high_water = high_water
+        key_range.rows_loaded = rows_loaded
+        return result
+
+    def _latest_row(self, transactions: List[Dict]) -> Optional[Dict]:
+        """Row of the batch that comes last in (transaction_date, id) order"""
+        if 'transaction_date' in self.column_mapping:
+            dated = [txn for txn in transactions if txn.get('transaction_date') is not None]
+            return max(dated, key=lambda txn: (txn['transaction_date'], txn['id']), default=None)
+        return max(transactions, key=lambda txn: txn['id'], default=None)
+
+    def _complete(self, db, key_range: _KeyRange):
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                UPDATE data_sync_ranges
+                SET status = 'DONE', updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND range_no = %s
+            """, (self.job_id, key_range.range_no))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
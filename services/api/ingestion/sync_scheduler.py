@@ -0,0 +1,413 @@
+"""
+Sync Job Scheduler
+Runs data_sync_jobs on their cron schedules: due jobs are leased with
+FOR UPDATE SKIP LOCKED and synced concurrently, within a global and a
+per-tenant concurrency cap
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple, Callable, Any
+import asyncio
+import json
+import logging
+import signal
+import threading
+import time
+
+import psycopg
+from apscheduler.triggers.cron import CronTrigger
+
+from .account_resolver import AccountResolver
+from .db_connectors import DataSyncScheduler, DatabaseConnector, create_connector
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1024)
+def cron_trigger(schedule: str) -> CronTrigger:
+    """Parsed cron expression (raises ValueError if invalid)"""
+    return CronTrigger.from_crontab(schedule, timezone=timezone.utc)
+
+
+def next_run_after(schedule: str, moment: datetime) -> datetime:
+    """First fire time of the schedule strictly after moment"""
+    trigger = cron_trigger(schedule)
+    return trigger.get_next_fire_time(None, moment + timedelta(seconds=1))
+
+
+class _LeasedJob:
+    __slots__ = ('id', 'tenant_id', 'connector_type', 'connection_params', 'lag_ms')
+
+    def __init__(self, id: int, tenant_id: str, connector_type: str, connection_params: dict, lag_ms: int):
+        self.id = id
+        self.tenant_id = tenant_id
+        self.connector_type = connector_type
+        self.connection_params = connection_params
+        self.lag_ms = lag_ms
+
+
+class SyncJobScheduler:
+    """
+    Cron scheduler and runner for database connector syncs
+
+    Every poll (or as soon as a run finishes) the scheduler leases due
+    jobs: status ACTIVE, next_run_at reached (NULL = never run) and no live
+    lease. A lease sets lease_until and advances next_run_at to the next
+    cron fire time, so missed fires collapse into one run. At most
+    max_concurrency jobs run at once, and at most tenant_concurrency per
+    tenant counting leases held by other scheduler processes (processes
+    lease one at a time under an advisory lock to keep that cap). Each run
+    has its own worker thread, so a slow source only occupies its own
+    slot; leases of running jobs are renewed every poll and expire (making
+    the job claimable again) if the process dies.
+
+    Source connections are kept open between runs of jobs with the same
+    connection parameters and closed after idle_seconds. First syncs are
+    backfilled over backfill_connections parallel key ranges (sync_ranges). Every run
+    records its duration, rows and lag (start time minus the fire time it
+    was due at) on the job and in data_sync_history.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        max_concurrency: int = 16,
+        tenant_concurrency: int = 2,
+        poll_seconds: float = 5.0,
+        lease_seconds: int = 300,
+        idle_seconds: float = 300.0,
+        backfill_connections: int = 1,
+        backfill_ranges: int = 16,
+        connect: Optional[Callable] = None
+    ):
+        self.dsn = dsn
+        self.max_concurrency = max_concurrency
+        self.tenant_concurrency = tenant_concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.idle_seconds = idle_seconds
+        self.backfill_connections = backfill_connections
+        self.backfill_ranges = backfill_ranges
+        self.connect = connect or (lambda: psycopg.connect(self.dsn))
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='sync')
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._scheduler_db = None
+        self._thread_dbs: List[Any] = []
+        self._idle_connectors: Dict[Tuple[str, str], List[Tuple[DatabaseConnector, float]]] = {}
+
+    def start(self):
+        """Start the scheduling loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._schedule_loop())
+
+    async def shutdown(self):
+        """Stop leasing jobs and wait for running syncs"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+        with self._lock:
+            idle = [connector for entries in self._idle_connectors.values() for connector, _ in entries]
+            self._idle_connectors.clear()
+        for connector in idle:
+            connector.close_quietly()
+        for db in self._thread_dbs + [self._scheduler_db]:
+            if db is not None:
+                db.close()
+
+    async def _schedule_loop(self):
+        while not self._closing:
+            self._wakeup.clear()
+            free = self.max_concurrency - len(self._running)
+            try:
+                jobs = await asyncio.to_thread(self._lease, free, list(self._running))
+            except Exception as e:
+                logger.error(f"Leasing sync jobs failed: {e}", exc_info=True)
+                jobs = []
+
+            for job in jobs:
+                self._running[job.id] = asyncio.create_task(self._run(job))
+            self._close_idle_connectors()
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: _LeasedJob):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor, self._run_job, job)
+        except Exception as e:
+            logger.error(f"Sync job {job.id} crashed: {e}", exc_info=True)
+        finally:
+            self._running.pop(job.id, None)
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Leasing
+    # ------------------------------------------------------------------
+
+    def _lease(self, limit: int, running: List[int]) -> List[_LeasedJob]:
+        """Renew leases of running jobs and lease up to limit due ones (worker thread)"""
+        if self._scheduler_db is None or self._scheduler_db.closed or self._scheduler_db.broken:
+            self._scheduler_db = self.connect()
+        db = self._scheduler_db
+        cursor = db.cursor()
+        try:
+            if running:
+                cursor.execute("""
+                    UPDATE data_sync_jobs
+                    SET lease_until = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                    WHERE id = ANY(%s) AND lease_until IS NOT NULL
+                """, (self.lease_seconds, running))
+
+            rows = []
+            if limit > 0:
+                # The tenant cap is checked against a snapshot of live leases,
+                # so scheduler processes take turns leasing; the lock is held
+                # until this transaction commits its leases
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext('sync_job_lease'))")
+                # A tenant's due jobs are ranked after the leases it already
+                # holds, so only those within its cap are candidates
+                cursor.execute("""
+                    WITH leased AS (
+                        SELECT tenant_id, count(*) AS running
+                        FROM data_sync_jobs
+                        WHERE lease_until > CURRENT_TIMESTAMP
+                        GROUP BY tenant_id
+                    ),
+                    due AS (
+                        SELECT j.id, j.next_run_at,
+                               COALESCE(l.running, 0) + row_number() OVER (
+                                   PARTITION BY j.tenant_id ORDER BY j.next_run_at NULLS FIRST, j.id
+                               ) AS slot
+                        FROM data_sync_jobs j
+                        LEFT JOIN leased l ON l.tenant_id = j.tenant_id
+                        WHERE j.status = 'ACTIVE'
+                        AND (j.next_run_at IS NULL OR j.next_run_at <= CURRENT_TIMESTAMP)
+                        AND (j.lease_until IS NULL OR j.lease_until <= CURRENT_TIMESTAMP)
+                    )
+                    SELECT id, tenant_id, connector_type, connection_params, schedule,
+                           next_run_at, created_at, CURRENT_TIMESTAMP
+                    FROM data_sync_jobs
+                    WHERE id IN (
+                        SELECT id FROM due
+                        WHERE slot <= %s
+                        ORDER BY next_run_at NULLS FIRST, id
+                        LIMIT %s
+                    )
+                    AND status = 'ACTIVE'
+                    AND (lease_until IS NULL OR lease_until <= CURRENT_TIMESTAMP)
+                    FOR UPDATE SKIP LOCKED
+                """, (self.tenant_concurrency, limit))
+                rows = cursor.fetchall()
+
+            jobs, leases, invalid = [], {}, {}
+            for job_id, tenant_id, connector_type, params, schedule, due_at, created_at, now in rows:
+                try:
+                    leases[job_id] = next_run_after(schedule, max(now, due_at or now))
+                except ValueError as e:
+                    invalid[job_id] = f"Invalid schedule '{schedule}': {e}"
+                    continue
+                lag = now - (due_at or created_at or now)
+                jobs.append(_LeasedJob(job_id, tenant_id, connector_type, params, int(lag.total_seconds() * 1000)))
+
+            if leases:
+                cursor.execute("""
+                    UPDATE data_sync_jobs j
+                    SET lease_until = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                        next_run_at = l.next_run_at
+                    FROM unnest(%s::int[], %s::timestamptz[]) AS l(id, next_run_at)
+                    WHERE j.id = l.id
+                """, (self.lease_seconds, list(leases), list(leases.values())))
+            if invalid:
+                cursor.execute("""
+                    UPDATE data_sync_jobs j
+                    SET status = 'FAILED', last_sync_status = 'FAILED', last_sync_error = i.error
+                    FROM unnest(%s::int[], %s::text[]) AS i(id, error)
+                    WHERE j.id = i.id
+                """, (list(invalid), list(invalid.values())))
+                for job_id, error in invalid.items():
+                    logger.error(f"Sync job {job_id} disabled: {error}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        if jobs:
+            logger.info(f"Leased {len(jobs)} sync jobs ({len(running) + len(jobs)} running)")
+        return jobs
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    def _run_job(self, job: _LeasedJob):
+        """Sync one leased job and record its metrics (worker thread)"""
+        db = self._thread_db()
+        resolver = getattr(self._local, 'resolver', None)
+        if resolver is None:
+            # Pending account creations are per transaction, so per thread
+            resolver = self._local.resolver = AccountResolver()
+
+        started_at = datetime.now(timezone.utc)
+        started = time.monotonic()
+        connector = None
+        try:
+            connector = self._checkout_connector(job)
+            result = asyncio.run(
+                DataSyncScheduler(
+                    db, resolver,
+                    connect=self.connect,
+                    backfill_connections=self.backfill_connections,
+                    backfill_ranges=self.backfill_ranges
+                ).run_sync_job(job.id, connector=connector)
+            )
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            if connector is not None:
+                self._checkin_connector(job, connector)
+        duration_ms = int((time.monotonic() - started) * 1000)
+
+        self._record_run(db, job, started_at, duration_ms, result)
+        logger.info(
+            f"Sync job {job.id} ({job.tenant_id}) {'succeeded' if result.get('success') else 'failed'}: "
+            f"{result.get('transactions_inserted', 0)} rows in {duration_ms} ms, lag {job.lag_ms} ms"
+        )
+        return result
+
+    def _record_run(self, db, job: _LeasedJob, started_at: datetime, duration_ms: int, result: Dict[str, Any]):
+        fetched = result.get('transactions_fetched', 0)
+        inserted = result.get('transactions_inserted', 0)
+        rejected = result.get('transactions_rejected', 0)
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                UPDATE data_sync_jobs
+                SET lease_until = NULL,
+                    last_sync_duration_ms = %s,
+                    last_sync_lag_ms = %s
+                WHERE id = %s
+            """, (duration_ms, job.lag_ms, job.id))
+            cursor.execute("""
+                INSERT INTO data_sync_history (
+                    job_id, started_at, completed_at, duration_ms, lag_ms, status,
+                    rows_fetched, rows_inserted, rows_failed, error_message, throughput_rps
+                ) VALUES (%s, %s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                job.id, started_at, duration_ms, job.lag_ms,
+                'SUCCESS' if result.get('success') else 'FAILED',
+                fetched, inserted, rejected, result.get('error'),
+                round(fetched / (duration_ms / 1000), 2) if duration_ms else None
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Recording sync run of job {job.id} failed: {e}")
+        finally:
+            cursor.close()
+
+    def _thread_db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or db.closed or db.broken:
+            db = self._local.db = self.connect()
+            with self._lock:
+                self._thread_dbs.append(db)
+        return db
+
+    # ------------------------------------------------------------------
+    # Source connections
+    # ------------------------------------------------------------------
+
+    def _connector_key(self, job: _LeasedJob) -> Tuple[str, str]:
+        return job.connector_type, json.dumps(job.connection_params, sort_keys=True, default=str)
+
+    def _checkout_connector(self, job: _LeasedJob) -> DatabaseConnector:
+        """An idle connector for the job's source, or a new one"""
+        with self._lock:
+            idle = self._idle_connectors.get(self._connector_key(job))
+            if idle:
+                return idle.pop()[0]
+        return create_connector(job.connector_type, job.connection_params, keep_connection=True)
+
+    def _checkin_connector(self, job: _LeasedJob, connector: DatabaseConnector):
+        if connector.connection is None:
+            return  # the stream closed it (failed run)
+        if self._closing:
+            connector.close_quietly()
+            return
+        with self._lock:
+            self._idle_connectors.setdefault(self._connector_key(job), []).append(
+                (connector, time.monotonic())
+            )
+
+    def _close_idle_connectors(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        expired = []
+        with self._lock:
+            for key, entries in list(self._idle_connectors.items()):
+                expired += [connector for connector, idle_since in entries if idle_since < cutoff]
+                entries[:] = [entry for entry in entries if entry[1] >= cutoff]
+                if not entries:
+                    del self._idle_connectors[key]
+        for connector in expired:
+            connector.close_quietly()
+
+
+# Global scheduler instance
+_sync_scheduler: Optional[SyncJobScheduler] = None
+
+def get_sync_scheduler() -> SyncJobScheduler:
+    """Get or create the process-wide sync job scheduler"""
+    global _sync_scheduler
+    if _sync_scheduler is None:
+        from config import settings
+        _sync_scheduler = SyncJobScheduler(
+            dsn=settings.postgres_uri,
+            max_concurrency=settings.sync_scheduler_max_concurrency,
+            tenant_concurrency=settings.sync_scheduler_tenant_concurrency,
+            poll_seconds=settings.sync_scheduler_poll_seconds,
+            lease_seconds=settings.sync_scheduler_lease_seconds,
+            backfill_connections=settings.sync_backfill_connections,
+            backfill_ranges=settings.sync_backfill_ranges
+        )
+    return _sync_scheduler
+
+
+async def _run_scheduler():
+    """Run scheduled syncs until SIGINT/SIGTERM"""
+    scheduler = get_sync_scheduler()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    scheduler.start()
+    logger.info(
+        f"Sync scheduler running ({scheduler.max_concurrency} slots, "
+        f"{scheduler.tenant_concurrency} per tenant)"
+    )
+    await stop.wait()
+    await scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    # python -m ingestion.sync_scheduler (from services/api)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_scheduler())
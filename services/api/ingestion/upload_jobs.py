@@ -0,0 +1,389 @@
+"""
+Upload Jobs
+Runs file ingestion in the background with bounded concurrency and
+writes progress to file_uploads as each chunk is loaded
+"""
+from collections import deque
+from typing import Optional, Dict, Callable, Set
+import asyncio
+import logging
+import os
+import time
+
+import psycopg
+
+from .bulk_scorer import BulkFraudScorer
+from .csv_ingestor import CSVIngestor
+from .parallel_ingest import ParallelCSVIngestor
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which an upload no longer changes
+TERMINAL_STATUSES = ('COMPLETED', 'FAILED')
+
+
+class UploadJobExecutor:
+    """
+    Background executor for file upload jobs
+
+    Every job waits for a slot in its tenant's semaphore and then in the
+    global one, so one tenant cannot occupy every slot. Ingestion itself
+    is blocking, so it runs in a worker thread on its own connection.
+    CSVs of at least parallel_min_bytes are loaded by a process pool of
+    parallel_workers processes instead, each with its own connection, so
+    such a job takes parallel_workers global slots (at most max_concurrent).
+    max_concurrent therefore bounds loader connections, not just jobs.
+    Once loaded, the upload's rows are fraud-scored by BulkFraudScorer
+    before it is marked COMPLETED.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        max_concurrent: int = 4,
+        max_per_tenant: int = 2,
+        parallel_workers: int = 4,
+        parallel_min_bytes: int = 256 * 1024 * 1024,
+        connect: Optional[Callable] = None
+    ):
+        self.dsn = dsn
+        self.max_concurrent = max_concurrent
+        self.max_per_tenant = max_per_tenant
+        self.parallel_workers = parallel_workers
+        self.parallel_min_bytes = parallel_min_bytes
+        self.connect = connect or (lambda: psycopg.connect(self.dsn))
+        self._global_slots = _WeightedSlots(max_concurrent)
+        self._tenant_slots: Dict[str, asyncio.Semaphore] = {}
+        self._tenant_jobs: Dict[str, int] = {}  # queued + running, to prune _tenant_slots
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._running: Set[int] = set()
+
+    def submit(
+        self,
+        upload_id: int,
+        tenant_id: str,
+        file_path: str,
+        file_type: str,
+        on_complete: Optional[Callable[[Dict], None]] = None
+    ) -> asyncio.Task:
+        """
+        Queue an upload for ingestion
+
+        The job owns file_path and deletes it when done. on_complete is
+        called (in the worker thread) with the result of a successful run.
+        """
+        task = asyncio.create_task(
+            self._run(upload_id, tenant_id, file_path, file_type, on_complete)
+        )
+        self._tasks[upload_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(upload_id, None))
+        return task
+
+    def active_jobs(self) -> int:
+        return len(self._tasks)
+
+    async def shutdown(self):
+        """Cancel jobs that have not started yet and wait for running jobs to finish"""
+        for upload_id, task in list(self._tasks.items()):
+            if upload_id not in self._running:
+                task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _run(
+        self,
+        upload_id: int,
+        tenant_id: str,
+        file_path: str,
+        file_type: str,
+        on_complete: Optional[Callable[[Dict], None]]
+    ):
+        tenant_slots = self._tenant_slots.setdefault(
+            tenant_id, asyncio.Semaphore(self.max_per_tenant)
+        )
+        self._tenant_jobs[tenant_id] = self._tenant_jobs.get(tenant_id, 0) + 1
+        started = False
+        try:
+            async with tenant_slots:
+                slots = self._slots_needed(file_path, file_type)
+                await self._global_slots.acquire(slots)
+                try:
+                    started = True
+                    self._running.add(upload_id)
+                    await asyncio.to_thread(
+                        self._process_spooled, upload_id, tenant_id, file_path, file_type, on_complete
+                    )
+                finally:
+                    await self._global_slots.release(slots)
+        except asyncio.CancelledError:
+            if not started:
+                await asyncio.to_thread(
+                    self._mark_failed, upload_id, "Upload job cancelled before it started"
+                )
+            raise
+        except Exception as e:
+            logger.error(f"Upload job {upload_id} crashed: {e}", exc_info=True)
+            await asyncio.to_thread(self._mark_failed, upload_id, str(e))
+        finally:
+            self._running.discard(upload_id)
+            self._tenant_jobs[tenant_id] -= 1
+            if not self._tenant_jobs[tenant_id]:
+                del self._tenant_jobs[tenant_id]
+                del self._tenant_slots[tenant_id]
+            if not started:
+                _remove_file(file_path)
+
+    def _process_spooled(
+        self,
+        upload_id: int,
+        tenant_id: str,
+        file_path: str,
+        file_type: str,
+        on_complete: Optional[Callable[[Dict], None]]
+    ):
+        """Run _process, then delete the spooled file from the same thread"""
+        # A cancelled to_thread keeps running, so the file can only go once it is done
+        try:
+            self._process(upload_id, tenant_id, file_path, file_type, on_complete)
+        finally:
+            _remove_file(file_path)
+
+    def _process(
+        self,
+        upload_id: int,
+        tenant_id: str,
+        file_path: str,
+        file_type: str,
+        on_complete: Optional[Callable[[Dict], None]]
+    ):
+        """Ingest one upload (runs in a worker thread)"""
+        db = self.connect()
+        try:
+            cursor = db.cursor()
+            cursor.execute("""
+                UPDATE file_uploads
+                SET status = 'PROCESSING',
+                    processing_started_at = CURRENT_TIMESTAMP,
+                    progress_updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (upload_id,))
+            db.commit()
+
+            started_at = time.monotonic()
+
+            def report_progress(progress: Dict):
+                elapsed = max(time.monotonic() - started_at, 1e-6)
+                rows_per_second = progress['rows_processed'] / elapsed
+                fraction = progress.get('fraction_read')
+                eta_seconds = (
+                    int(elapsed * (1 - fraction) / fraction) if fraction else None
+                )
+                cursor.execute("""
+                    UPDATE file_uploads
+                    SET rows_processed = %s,
+                        rows_inserted = %s,
+                        rows_failed = %s,
+                        rows_per_second = %s,
+                        eta_seconds = %s,
+                        progress_updated_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, (
+                    progress['rows_processed'],
+                    progress['rows_inserted'],
+                    progress['rows_failed'],
+                    round(rows_per_second, 2),
+                    eta_seconds,
+                    upload_id
+                ))
+                db.commit()
+
+            if self._use_parallel(file_path, file_type):
+                result = ParallelCSVIngestor(self.dsn, workers=self.parallel_workers).ingest(
+                    tenant_id,
+                    file_path,
+                    upload_id=upload_id,
+                    progress_callback=report_progress
+                )
+            else:
+                result = CSVIngestor(db).ingest(
+                    tenant_id,
+                    file_path=file_path,
+                    file_type=file_type,
+                    upload_id=upload_id,
+                    progress_callback=report_progress
+                )
+
+            error_summary = None
+            if result.get('success'):
+                try:
+                    result.update(self._score(db, cursor, upload_id, tenant_id, result))
+                except Exception as e:
+                    # Loaded rows stay PENDING and can be re-scored later
+                    db.rollback()
+                    logger.error(f"Scoring upload {upload_id} failed: {e}", exc_info=True)
+                    error_summary = f"Scoring failed: {e}"
+
+            if result.get('success'):
+                cursor.execute("""
+                    UPDATE file_uploads
+                    SET status = 'COMPLETED',
+                        rows_total = %s,
+                        rows_processed = %s,
+                        rows_inserted = %s,
+                        rows_failed = %s,
+                        error_summary = %s,
+                        eta_seconds = 0,
+                        progress_updated_at = CURRENT_TIMESTAMP,
+                        completed_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, (
+                    result['rows_processed'],
+                    result['rows_processed'],
+                    result['rows_inserted'],
+                    result['rows_failed'],
+                    error_summary,
+                    upload_id
+                ))
+            else:
+                cursor.execute("""
+                    UPDATE file_uploads
+                    SET status = 'FAILED',
+                        error_summary = %s,
+                        eta_seconds = NULL,
+                        progress_updated_at = CURRENT_TIMESTAMP,
+                        completed_at = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, (result.get('error', 'Unknown error'), upload_id))
+            db.commit()
+            cursor.close()
+
+            if result.get('success'):
+                logger.info(f"File upload {upload_id} completed: {result['rows_inserted']} rows")
+                if on_complete:
+                    try:
+                        on_complete(result)
+                    except Exception as e:
+                        logger.warning(f"Upload {upload_id} completion hook failed: {e}")
+            else:
+                logger.error(f"File upload {upload_id} ingestion failed: {result.get('error')}")
+        finally:
+            db.close()
+
+    def _score(self, db, cursor, upload_id: int, tenant_id: str, result: Dict) -> Dict:
+        """Run the post-load scoring stage, reporting progress as it goes"""
+        started_at = time.monotonic()
+        rows_to_score = result['rows_inserted']
+
+        def report_scoring(progress: Dict):
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            rows_per_second = progress['rows_scored'] / elapsed
+            remaining = max(rows_to_score - progress['rows_scored'], 0)
+            cursor.execute("""
+                UPDATE file_uploads
+                SET rows_scored = %s,
+                    alerts_created = %s,
+                    rows_per_second = %s,
+                    eta_seconds = %s,
+                    progress_updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (
+                progress['rows_scored'],
+                progress['alerts_created'],
+                round(rows_per_second, 2),
+                int(remaining / rows_per_second) if rows_per_second else None,
+                upload_id
+            ))
+            db.commit()
+
+        return BulkFraudScorer(db).score_upload(
+            tenant_id, upload_id, progress_callback=report_scoring
+        )
+
+    def _slots_needed(self, file_path: str, file_type: str) -> int:
+        """Global slots for a job: one per loader connection it opens"""
+        try:
+            if self._use_parallel(file_path, file_type):
+                return min(self.parallel_workers, self.max_concurrent)
+        except OSError:
+            pass  # Missing file; _process reports the error
+        return 1
+
+    def _use_parallel(self, file_path: str, file_type: str) -> bool:
+        return (
+            file_type == 'csv'
+            and self.parallel_workers > 1
+            and self.dsn is not None
+            and os.path.getsize(file_path) >= self.parallel_min_bytes
+        )
+
+    def _mark_failed(self, upload_id: int, error: str):
+        try:
+            db = self.connect()
+        except Exception as e:
+            logger.error(f"Could not mark upload {upload_id} as failed: {e}")
+            return
+        try:
+            cursor = db.cursor()
+            cursor.execute("""
+                UPDATE file_uploads
+                SET status = 'FAILED',
+                    error_summary = %s,
+                    completed_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND status NOT IN ('COMPLETED', 'FAILED')
+            """, (error, upload_id))
+            db.commit()
+            cursor.close()
+        finally:
+            db.close()
+
+
+class _WeightedSlots:
+    """Semaphore where a holder takes several slots at once, granted in FIFO order"""
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters = deque()
+        self._changed = asyncio.Condition()
+
+    async def acquire(self, slots: int):
+        async with self._changed:
+            token = object()
+            self._waiters.append(token)
+            try:
+                # First in line only, so small jobs cannot starve a large one
+                await self._changed.wait_for(
+                    lambda: self._waiters[0] is token and self._free >= slots
+                )
+            finally:
+                self._waiters.remove(token)
+                self._changed.notify_all()
+            self._free -= slots
+
+    async def release(self, slots: int):
+        async with self._changed:
+            self._free += slots
+            self._changed.notify_all()
+
+
+def _remove_file(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# Global executor instance
+_upload_executor: Optional[UploadJobExecutor] = None
+
+def get_upload_executor() -> UploadJobExecutor:
+    """Get or create the process-wide upload job executor"""
+    global _upload_executor
+    if _upload_executor is None:
+        from config import settings
+        _upload_executor = UploadJobExecutor(
+            dsn=settings.postgres_uri,
+            max_concurrent=settings.upload_max_concurrent_jobs,
+            max_per_tenant=settings.upload_max_jobs_per_tenant,
+            parallel_workers=settings.upload_parallel_workers,
+            parallel_min_bytes=settings.upload_parallel_min_bytes
+        )
+    return _upload_executor
@@ -0,0 +1,159 @@
+"""
+Payment Gateway Webhook Events
+Maps Stripe and PayPal webhook events to TransactionCreate
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Dict
+
+from .realtime_api import TransactionCreate
+
+# Event types that carry a transaction to ingest; everything else is
+# acknowledged without being queued
+INGESTED_EVENT_TYPES = {
+    'stripe': ('charge.succeeded', 'payment_intent.succeeded'),
+    'paypal': ('PAYMENT.CAPTURE.COMPLETED', 'CHECKOUT.ORDER.COMPLETED'),
+}
+
+
+def transaction_from_event(provider: str, event: dict) -> Optional[TransactionCreate]:
+    """
+    Build the transaction for a queued webhook event
+
+    Returns None for events without a transaction (e.g. an order with no
+    purchase units). Raises ValueError (pydantic ValidationError) for
+    payloads that do not make a valid transaction.
+    """
+    if provider == 'stripe':
+        event_type = event.get('type', '')
+        data = event.get('data', {}).get('object', {})
+        if event_type == 'charge.succeeded':
+            return _stripe_charge(data)
+        if event_type == 'payment_intent.succeeded':
+            return _stripe_payment_intent(data)
+    elif provider == 'paypal':
+        event_type = event.get('event_type', '')
+        resource = event.get('resource', {})
+        if event_type == 'PAYMENT.CAPTURE.COMPLETED':
+            return _paypal_capture(resource)
+        if event_type == 'CHECKOUT.ORDER.COMPLETED':
+            return _paypal_order(resource)
+    return None
+
+
+def recommendation(fraud_score: float) -> Dict[str, Optional[str]]:
+    """Suggested merchant action for a scored webhook transaction"""
+    if fraud_score > 0.7:
+        return {
+            "action": "blocked",
+            "recommendation": "High fraud risk detected. Consider refunding this charge."
+        }
+    if fraud_score > 0.5:
+        return {
+            "action": "review",
+            "recommendation": "Medium fraud risk. Review before fulfillment."
+        }
+    return {"action": "approved", "recommendation": None}
+
+
+def _stripe_charge(charge: dict) -> TransactionCreate:
+    """Stripe charge.succeeded"""
+    # Get billing details
+    billing = charge.get('billing_details') or {}
+    address = billing.get('address') or {}
+
+    # Get payment method details
+    payment_method = charge.get('payment_method_details') or {}
+    card = payment_method.get('card') or {}
+
+    return TransactionCreate(
+        account_id=charge.get('customer') or 'unknown',
+        amount=Decimal(str(charge.get('amount', 0) / 100)),  # Stripe uses cents
+        currency=charge.get('currency', 'usd').upper(),
+        merchant=charge.get('description', 'Unknown Merchant') or 'Unknown Merchant',
+        merchant_id=charge.get('merchant', None),
+        channel='ONLINE',
+        city=address.get('city'),
+        country=address.get('country'),
+        ip_address=(charge.get('metadata') or {}).get('ip_address'),
+        device_id=(charge.get('source') or {}).get('fingerprint'),
+        transaction_time=datetime.fromtimestamp(charge.get('created', 0)),
+        reference_id=charge.get('id'),
+        metadata={
+            'stripe_charge_id': charge.get('id'),
+            'payment_method': payment_method.get('type'),
+            'card_brand': card.get('brand'),
+            'card_last4': card.get('last4'),
+            'source': 'stripe_webhook',
+            'receipt_url': charge.get('receipt_url')
+        }
+    )
+
+
+def _stripe_payment_intent(payment_intent: dict) -> TransactionCreate:
+    """Stripe payment_intent.succeeded"""
+    return TransactionCreate(
+        account_id=payment_intent.get('customer') or 'unknown',
+        amount=Decimal(str(payment_intent.get('amount', 0) / 100)),
+        currency=payment_intent.get('currency', 'usd').upper(),
+        merchant='Payment Intent',
+        channel='ONLINE',
+        transaction_time=datetime.fromtimestamp(payment_intent.get('created', 0)),
+        reference_id=payment_intent.get('id'),
+        metadata={
+            'stripe_payment_intent_id': payment_intent.get('id'),
+            'source': 'stripe_webhook'
+        }
+    )
+
+
+def _paypal_capture(capture: dict) -> TransactionCreate:
+    """PayPal PAYMENT.CAPTURE.COMPLETED"""
+    amount_info = capture.get('amount') or {}
+    payer_info = capture.get('payer') or {}
+
+    return TransactionCreate(
+        account_id=payer_info.get('payer_id', 'unknown'),
+        amount=Decimal(str(amount_info.get('value', 0))),
+        currency=amount_info.get('currency_code', 'USD'),
+        merchant=capture.get('merchant_id', 'PayPal Merchant'),
+        channel='ONLINE',
+        transaction_time=_paypal_time(capture.get('create_time')),
+        reference_id=capture.get('id'),
+        metadata={
+            'paypal_capture_id': capture.get('id'),
+            'paypal_order_id': capture.get('supplementary_data', {}).get('related_ids', {}).get('order_id'),
+            'source': 'paypal_webhook'
+        }
+    )
+
+
+def _paypal_order(order: dict) -> Optional[TransactionCreate]:
+    """PayPal CHECKOUT.ORDER.COMPLETED (first purchase unit)"""
+    purchase_units = order.get('purchase_units') or []
+    if not purchase_units:
+        return None
+
+    unit = purchase_units[0]
+    amount = unit.get('amount') or {}
+    payer = order.get('payer') or {}
+
+    return TransactionCreate(
+        account_id=payer.get('payer_id', 'unknown'),
+        amount=Decimal(str(amount.get('value', 0))),
+        currency=amount.get('currency_code', 'USD'),
+        merchant=unit.get('payee', {}).get('email_address', 'PayPal Merchant'),
+        channel='ONLINE',
+        transaction_time=_paypal_time(order.get('create_time')),
+        reference_id=order.get('id'),
+        metadata={
+            'paypal_order_id': order.get('id'),
+            'source': 'paypal_webhook'
+        }
+    )
+
+
+def _paypal_time(value: Optional[str]) -> datetime:
+    if not value:
+        return datetime.utcnow()
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
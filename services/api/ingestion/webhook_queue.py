@@ -0,0 +1,449 @@
+"""
+Webhook Queue
+Durable queue of payment gateway events in webhook_events: webhooks are
+acknowledged once the event is stored, and consumers ingest queued
+events in batches claimed with FOR UPDATE SKIP LOCKED
+"""
+from collections import defaultdict
+from typing import Optional, Dict, List, Tuple, Callable, Any
+import asyncio
+import logging
+import signal
+
+import psycopg
+from psycopg.types.json import Json
+
+from .account_resolver import get_account_resolver
+from .realtime_api import RealtimeTransactionAPI
+from .webhook_events import transaction_from_event, recommendation
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which an event no longer changes
+TERMINAL_EVENT_STATUSES = ('PROCESSED', 'FAILED')
+
+
+class _PendingEvent:
+    __slots__ = ('tenant_id', 'provider', 'event_id', 'event_type', 'payload', 'future')
+
+    def __init__(self, tenant_id: str, provider: str, event_id: str, event_type: str, payload: dict, future: asyncio.Future):
+        self.tenant_id = tenant_id
+        self.provider = provider
+        self.event_id = event_id
+        self.event_type = event_type
+        self.payload = payload
+        self.future = future
+
+
+class _ClaimedEvent:
+    __slots__ = ('id', 'tenant_id', 'provider', 'payload', 'attempts')
+
+    def __init__(self, id: int, tenant_id: str, provider: str, payload: dict, attempts: int):
+        self.id = id
+        self.tenant_id = tenant_id
+        self.provider = provider
+        self.payload = payload
+        self.attempts = attempts
+
+
+class WebhookQueue:
+    """
+    Enqueue side and consumer pool for webhook_events
+
+    enqueue() is group-committed: events arriving within max_wait_ms share
+    one INSERT and commit, so a webhook is acknowledged after a single
+    durable write. `consumers` loops each claim up to batch_size ready
+    events, resolve gateway customer ids to accounts and ingest them per
+    tenant through RealtimeTransactionAPI.ingest_batch. A claim is a lease:
+    events of a consumer that dies become claimable again after
+    lease_seconds. Transient failures are retried with back-off up to
+    max_attempts; invalid payloads fail immediately.
+
+    Consumers share the process (and GIL) with whatever enqueues; with
+    consumers=0 the API only enqueues and `python -m ingestion.webhook_queue`
+    runs the consumers in their own process.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        redis_client=None,
+        consumers: int = 2,
+        batch_size: int = 200,
+        poll_seconds: float = 1.0,
+        lease_seconds: int = 60,
+        max_attempts: int = 5,
+        max_wait_ms: float = 2.0,
+        connect: Optional[Callable] = None
+    ):
+        self.dsn = dsn
+        self.redis_client = redis_client
+        self.consumers = consumers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_wait = max_wait_ms / 1000
+        self.connect = connect or (lambda: psycopg.connect(self.dsn))
+        self._inbox: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._connections: Dict[str, Any] = {}
+        self._closing = False
+
+    def start(self):
+        """Start the enqueue flusher and the consumer loops"""
+        if self._tasks:
+            return
+        self._inbox = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._enqueue_loop())] + [
+            asyncio.create_task(self._consume_loop(worker)) for worker in range(self.consumers)
+        ]
+
+    async def shutdown(self):
+        """Store events already received, then stop; claimed events finish"""
+        self._closing = True
+        if self._tasks:
+            await self._inbox.put(None)
+            self._wakeup.set()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+        for conn in self._connections.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._connections.clear()
+
+    async def enqueue(
+        self,
+        tenant_id: str,
+        provider: str,
+        event_id: str,
+        event_type: str,
+        payload: dict
+    ) -> dict:
+        """
+        Durably store a webhook event for asynchronous ingestion
+
+        A redelivered event (same tenant, provider and event_id) is not
+        stored twice; the existing queue entry is returned.
+
+        Returns: {"queue_id", "event_id", "event_type", "duplicate"}
+        """
+        if self._closing:
+            raise ValueError("Webhook queue is shutting down")
+        self.start()
+        pending = _PendingEvent(
+            tenant_id, provider, event_id, event_type, payload,
+            asyncio.get_running_loop().create_future()
+        )
+        await self._inbox.put(pending)
+        return await pending.future
+
+    # ------------------------------------------------------------------
+    # Enqueue (group commit)
+    # ------------------------------------------------------------------
+
+    async def _enqueue_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._inbox.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < 1000:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._inbox.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+
+            try:
+                stored = await asyncio.to_thread(self._insert_events, batch)
+            except Exception as e:
+                logger.error(f"Storing {len(batch)} webhook events failed: {e}", exc_info=True)
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                continue
+
+            for pending, result in zip(batch, stored):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+            self._wakeup.set()
+
+    def _insert_events(self, batch: List[_PendingEvent]) -> List[dict]:
+        """Insert new events in one statement and commit (worker thread)"""
+        unique: Dict[Tuple[str, str, str], _PendingEvent] = {}
+        for pending in batch:
+            unique.setdefault((pending.tenant_id, pending.provider, pending.event_id), pending)
+        events = list(unique.values())
+
+        db = self._connection('enqueue')
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                WITH input AS (
+                    SELECT *
+                    FROM unnest(
+                        %(tenant_id)s::text[], %(provider)s::text[], %(event_id)s::text[],
+                        %(event_type)s::text[], %(payload)s::jsonb[]
+                    ) AS i(tenant_id, provider, event_id, event_type, payload)
+                ),
+                inserted AS (
+                    INSERT INTO webhook_events (tenant_id, provider, event_id, event_type, payload)
+                    SELECT tenant_id, provider, event_id, event_type, payload
+                    FROM input
+                    ON CONFLICT (tenant_id, provider, event_id) DO NOTHING
+                    RETURNING id, tenant_id, provider, event_id
+                )
+                SELECT i.tenant_id, i.provider, i.event_id, COALESCE(n.id, e.id), n.id IS NULL
+                FROM input i
+                LEFT JOIN inserted n
+                    ON n.tenant_id = i.tenant_id AND n.provider = i.provider AND n.event_id = i.event_id
+                LEFT JOIN webhook_events e
+                    ON n.id IS NULL
+                    AND e.tenant_id = i.tenant_id AND e.provider = i.provider AND e.event_id = i.event_id
+            """, {
+                "tenant_id": [p.tenant_id for p in events],
+                "provider": [p.provider for p in events],
+                "event_id": [p.event_id for p in events],
+                "event_type": [p.event_type for p in events],
+                "payload": [Json(p.payload) for p in events]
+            })
+            rows = {(t, p, e): (queue_id, duplicate) for t, p, e, queue_id, duplicate in cursor.fetchall()}
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        results = []
+        first_seen = set()
+        for pending in batch:
+            key = (pending.tenant_id, pending.provider, pending.event_id)
+            queue_id, duplicate = rows[key]
+            results.append({
+                "queue_id": queue_id,
+                "event_id": pending.event_id,
+                "event_type": pending.event_type,
+                "duplicate": bool(duplicate) or key in first_seen
+            })
+            first_seen.add(key)
+        return results
+
+    # ------------------------------------------------------------------
+    # Consumers
+    # ------------------------------------------------------------------
+
+    async def _consume_loop(self, worker: int):
+        while not self._closing:
+            # Cleared before claiming so an enqueue during the batch wakes us
+            self._wakeup.clear()
+            try:
+                claimed = await asyncio.to_thread(self._process_batch, worker)
+            except Exception as e:
+                # Claimed events are retried once their lease expires
+                logger.error(f"Webhook consumer {worker} failed: {e}", exc_info=True)
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue  # more events are probably waiting
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _process_batch(self, worker: int) -> int:
+        """Claim, ingest and complete one batch of events (worker thread)"""
+        db = self._connection(f"consumer-{worker}")
+        events = self._claim(db)
+        if not events:
+            return 0
+
+        outcomes: Dict[int, Tuple[str, Optional[dict], Optional[str]]] = {}
+        by_tenant = defaultdict(list)
+        for event in events:
+            try:
+                transaction = transaction_from_event(event.provider, event.payload)
+            except Exception as e:
+                outcomes[event.id] = ('FAILED', None, f"Invalid event payload: {e}")
+                continue
+            if transaction is None:
+                outcomes[event.id] = ('PROCESSED', {"status": "skipped", "reason": "No transaction in event"}, None)
+            else:
+                by_tenant[event.tenant_id].append((event, transaction))
+
+        for tenant_id, items in by_tenant.items():
+            try:
+                outcomes.update(self._ingest(db, tenant_id, items))
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Webhook ingestion failed for tenant {tenant_id}: {e}", exc_info=True)
+                for event, _ in items:
+                    outcomes[event.id] = self._retry(event, f"Transaction ingestion failed: {e}")
+
+        self._complete(db, outcomes)
+        logger.info(f"Webhook consumer {worker} processed {len(events)} events")
+        return len(events)
+
+    def _claim(self, db) -> List[_ClaimedEvent]:
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                UPDATE webhook_events
+                SET status = 'PROCESSING',
+                    attempts = attempts + 1,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                WHERE id IN (
+                    SELECT id
+                    FROM webhook_events
+                    WHERE status IN ('QUEUED', 'PROCESSING')
+                    AND available_at <= CURRENT_TIMESTAMP
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, tenant_id, provider, payload, attempts
+            """, (self.lease_seconds, self.batch_size))
+            events = [_ClaimedEvent(*row) for row in cursor.fetchall()]
+            db.commit()
+            return sorted(events, key=lambda event: event.id)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _ingest(self, db, tenant_id: str, items: list) -> Dict[int, Tuple[str, Optional[dict], Optional[str]]]:
+        # Gateway customer ids become accounts, as for file uploads
+        resolver = get_account_resolver()
+        created = {}
+        cursor = db.cursor()
+        try:
+            accounts = resolver.resolve(cursor, tenant_id, (t.account_id for _, t in items), created)
+            db.commit()
+            resolver.commit_pending(created)
+        finally:
+            cursor.close()
+
+        api = RealtimeTransactionAPI(db, self.redis_client)
+        api.rate_limiter = None  # gateway events are not throttled once accepted
+        transactions = [
+            t.copy(update={"account_id": str(accounts[t.account_id.strip()])}) for _, t in items
+        ]
+        result = asyncio.run(api.ingest_batch(tenant_id, transactions, max_batch_size=len(transactions)))
+
+        outcomes = {}
+        for (event, _), outcome in zip(items, result['transactions']):
+            if "error" not in outcome:
+                outcomes[event.id] = ('PROCESSED', {
+                    "transaction_id": outcome['transaction_id'],
+                    "status": outcome['status'],
+                    "fraud_score": outcome['fraud_score'],
+                    "replayed": outcome['replayed'],
+                    **recommendation(outcome['fraud_score'])
+                }, None)
+            elif outcome['error'].startswith("Transaction ingestion failed"):
+                # The batch write failed (not this row's data); try again later
+                outcomes[event.id] = self._retry(event, outcome['error'])
+            else:
+                outcomes[event.id] = ('FAILED', None, outcome['error'])
+        return outcomes
+
+    def _retry(self, event: _ClaimedEvent, error: str) -> Tuple[str, Optional[dict], Optional[str]]:
+        if event.attempts >= self.max_attempts:
+            return ('FAILED', None, f"{error} (after {event.attempts} attempts)")
+        return ('QUEUED', None, error)
+
+    def _complete(self, db, outcomes: Dict[int, Tuple[str, Optional[dict], Optional[str]]]):
+        ids = list(outcomes)
+        cursor = db.cursor()
+        try:
+            cursor.execute("""
+                UPDATE webhook_events e
+                SET status = o.status,
+                    result = o.result,
+                    error = o.error,
+                    available_at = CASE
+                        WHEN o.status = 'QUEUED'
+                        THEN CURRENT_TIMESTAMP + make_interval(secs => %(backoff)s * e.attempts)
+                        ELSE e.available_at
+                    END,
+                    processed_at = CASE
+                        WHEN o.status IN ('PROCESSED', 'FAILED') THEN CURRENT_TIMESTAMP
+                    END
+                FROM unnest(%(id)s::bigint[], %(status)s::text[], %(result)s::jsonb[], %(error)s::text[])
+                    AS o(id, status, result, error)
+                WHERE e.id = o.id
+            """, {
+                "backoff": self.poll_seconds * 5,
+                "id": ids,
+                "status": [outcomes[i][0] for i in ids],
+                "result": [Json(outcomes[i][1]) if outcomes[i][1] is not None else None for i in ids],
+                "error": [outcomes[i][2] for i in ids]
+            })
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _connection(self, name: str):
+        conn = self._connections.get(name)
+        if conn is None or conn.closed or conn.broken:
+            conn = self._connections[name] = self.connect()
+        return conn
+
+
+# Global queue instance
+_webhook_queue: Optional[WebhookQueue] = None
+
+def get_webhook_queue(redis_client=None) -> WebhookQueue:
+    """Get or create the process-wide webhook queue"""
+    global _webhook_queue
+    if _webhook_queue is None:
+        from config import settings
+        _webhook_queue = WebhookQueue(
+            dsn=settings.postgres_uri,
+            redis_client=redis_client,
+            consumers=settings.webhook_queue_consumers,
+            batch_size=settings.webhook_queue_batch_size,
+            poll_seconds=settings.webhook_queue_poll_seconds,
+            max_attempts=settings.webhook_queue_max_attempts
+        )
+    return _webhook_queue
+
+
+async def _run_consumers():
+    """Drain the queue until SIGINT/SIGTERM, outside the API process"""
+    from deps import get_redis
+    queue = get_webhook_queue(next(get_redis()))
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    queue.start()
+    logger.info(f"Webhook consumers running ({queue.consumers} loops)")
+    await stop.wait()
+    await queue.shutdown()
+
+
+if __name__ == "__main__":
+    # python -m ingestion.webhook_queue (from services/api)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_consumers())
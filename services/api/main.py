@@ -18,6 +18,10 @@ from routers import users  # RBAC user management
 from routers import audit  # Audit logs and CRUD monitoring
 from config import settings
 from middleware import TenantMiddleware
+from ingestion.upload_jobs import get_upload_executor
+from ingestion.micro_batcher import get_ingest_batcher
+from ingestion.webhook_queue import get_webhook_queue
+from deps import get_redis
 
 # Configure structured logging
 logging.basicConfig(
@@ -163,6 +167,26 @@ app.include_router(users.router, prefix="/v1", tags=["users", "rbac"])  # User m
 app.include_router(audit.router, prefix="/v1", tags=["audit", "monitoring"])  # Audit logs & CRUD monitoring
 app.include_router(network.router, tags=["network", "visualization"])  # Network graph & fraud map
 
+@app.on_event("startup")
+async def start_webhook_consumers():
+    """Start draining queued payment gateway webhooks"""
+    get_webhook_queue(next(get_redis())).start()
+
+@app.on_event("shutdown")
+async def shutdown_upload_jobs():
+    """Mark queued upload jobs as failed; running jobs run to completion"""
+    await get_upload_executor().shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_ingest_batcher():
+    """Write ingests that are still queued before the process exits"""
+    await get_ingest_batcher().shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_webhook_queue():
+    """Store webhooks already acknowledged, then stop the consumers"""
+    await get_webhook_queue().shutdown()
+
 @app.get("/")
 async def root():
     return {
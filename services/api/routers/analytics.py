@@ -1,7 +1,9 @@
+from datetime import date
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from psycopg import Connection
 from deps import get_postgres
+from archive import archived_files, query_archive
 
 router = APIRouter()
 
@@ -64,32 +66,131 @@ async def get_anomalies(
 
 
 @router.get("/analytics/midnight-high-amount")
-async def get_midnight_high_amount(days: int = Query(7, ge=1, le=30)):
-    # This would call the analytics function
-    return {"message": "Use Postgres function get_midnight_high_amount_txns"}
+async def get_midnight_high_amount(
+    days: int = Query(7, ge=1, le=30),
+    postgres: Connection = Depends(get_postgres)
+):
+    # Evaluated by the worker's anomaly pipeline after each ETL run
+    with postgres.cursor() as cursor:
+        cursor.execute("""
+            SELECT txn_id, account_id, event_time, extra
+            FROM anomaly_events
+            WHERE rule = 'MIDNIGHT_HIGH_AMOUNT'
+              AND event_time >= CURRENT_DATE - %s
+            ORDER BY event_time DESC
+            LIMIT 1000
+        """, (days,))
+        rows = cursor.fetchall()
+        
+        return [
+            {
+                "txn_id": txn_id,
+                "account_id": account_id,
+                "amount": (extra or {}).get("amount"),
+                "txn_time": event_time.isoformat() if event_time else None,
+                "hour": (extra or {}).get("hour")
+            }
+            for txn_id, account_id, event_time, extra in rows
+        ]
 
 
 @router.get("/analytics/velocity-anomalies")
-async def get_velocity_anomalies(hours: int = Query(24, ge=1, le=168)):
-    # This would call the analytics function
-    return {"message": "Use Postgres function get_velocity_anomalies"}
-
-
-@router.get("/analytics/geo-jumps")
-async def get_geo_jumps(postgres: Connection = Depends(get_postgres)):
+async def get_velocity_anomalies(
+    hours: int = Query(24, ge=1, le=168),
+    postgres: Connection = Depends(get_postgres)
+):
+    # One event per account and hour window, kept current by the worker
     with postgres.cursor() as cursor:
-        cursor.execute("SELECT * FROM get_geo_jump_anomalies()")
+        cursor.execute("""
+            SELECT account_id, event_time, extra
+            FROM anomaly_events
+            WHERE rule = 'VELOCITY'
+              AND event_time >= NOW() - INTERVAL '1 hour' * %s
+            ORDER BY event_time DESC, score DESC
+            LIMIT 1000
+        """, (hours,))
         rows = cursor.fetchall()
         
         return [
             {
-                "account_id": row[0],
-                "txn_id": row[1],
-                "distance_meters": float(row[2]) if row[2] else None,
-                "time_diff_hours": float(row[3]) if row[3] else None,
-                "from_city": row[4],
-                "to_city": row[5]
+                "account_id": account_id,
+                "hour_window": event_time.isoformat() if event_time else None,
+                "txn_count": (extra or {}).get("txn_count"),
+                "p95_peer": (extra or {}).get("p95_peer"),
+                "is_anomaly": True
             }
-            for row in rows
+            for account_id, event_time, extra in rows
         ]
 
+
+@router.get("/analytics/geo-jumps")
+async def get_geo_jumps(postgres: Connection = Depends(get_postgres)):
+    # Detected incrementally by the worker after each ETL run
+    with postgres.cursor() as cursor:
+        cursor.execute("""
+            SELECT account_id, txn_id, extra
+            FROM anomaly_events
+            WHERE rule = 'GEO_JUMP'
+            ORDER BY detected_at DESC
+            LIMIT 1000
+        """)
+        rows = cursor.fetchall()
+        
+        jumps = []
+        for account_id, txn_id, extra in rows:
+            extra = extra or {}
+            distance_km = extra.get("distance_km")
+            jumps.append({
+                "account_id": account_id,
+                "txn_id": txn_id,
+                "distance_meters": distance_km * 1000 if distance_km is not None else None,
+                "time_diff_hours": extra.get("time_hours"),
+                "from_city": extra.get("from_city"),
+                "to_city": extra.get("to_city")
+            })
+        return jumps
+
+
+@router.get("/analytics/daily-volume")
+async def get_daily_volume(
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    postgres: Connection = Depends(get_postgres)
+):
+    # Hot partitions and archived days, read from one snapshot so no day is counted twice
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    
+    with postgres.cursor() as cursor:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute("""
+            SELECT day, COUNT(*), SUM(amount)
+            FROM fact_transactions
+            WHERE day BETWEEN %s AND %s
+            GROUP BY day
+        """, (date_from, date_to))
+        hot = cursor.fetchall()
+        files = archived_files(cursor, 'fact_transactions', date_from, date_to)
+    
+    archived = query_archive(files, """
+        SELECT day, COUNT(*), SUM(amount)
+        FROM archive
+        WHERE day BETWEEN ? AND ?
+        GROUP BY day
+    """, [date_from, date_to])
+    
+    # A day archived and then loaded late is in both
+    volume = {}
+    for day, txn_count, total_amount in hot + archived:
+        totals = volume.setdefault(day, [0, 0])
+        totals[0] += txn_count
+        totals[1] += total_amount or 0
+    
+    return [
+        {
+            "day": day.isoformat(),
+            "txn_count": txn_count,
+            "total_amount": float(total_amount)
+        }
+        for day, (txn_count, total_amount) in sorted(volume.items())
+    ]
@@ -3,23 +3,152 @@ Data Ingestion Router
 Handles CSV uploads, real-time transaction API, and database connectors
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+import asyncio
+import hashlib
 import io
+import json
 import logging
+import os
+import tempfile
+
+import psycopg
 
 from ingestion.csv_ingestor import CSVIngestor
+from ingestion.upload_jobs import get_upload_executor, TERMINAL_STATUSES
 from ingestion.realtime_api import RealtimeTransactionAPI, TransactionCreate
+from ingestion.micro_batcher import get_ingest_batcher
 from ingestion.db_connectors import PostgreSQLConnector, MySQLConnector, DataSyncScheduler
 from middleware import get_current_tenant, get_current_user_id
 from deps import get_postgres, get_redis
+from config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/ingestion", tags=["data-ingestion"])
 
+# Uploads are spooled to disk in chunks of this size instead of read whole
+UPLOAD_SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# Seconds between progress polls for the upload events stream
+UPLOAD_EVENTS_POLL_SECONDS = 1.0
+
+
+async def spool_upload(file: UploadFile, suffix: str = "") -> tuple:
+    """
+    Copy an upload to a temp file without holding it in memory
+    
+    Returns: (path, size in bytes, sha256 hex digest)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    spool = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.upload_spool_dir)
+    try:
+        with spool:
+            while True:
+                chunk = await file.read(UPLOAD_SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                spool.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    except Exception:
+        os.unlink(spool.name)
+        raise
+    return spool.name, size, digest.hexdigest()
+
+
+def clear_transactions_cache(redis_client, tenant_id: str):
+    """Clear transactions cache after upload so new data shows immediately"""
+    try:
+        if redis_client:
+            # Generate cache keys manually (same logic as transactions router)
+            def get_cache_key(endpoint: str, **kwargs) -> str:
+                params = "_".join(f"{k}_{v}" for k, v in sorted(kwargs.items()) if v)
+                return f"api:{endpoint}:{params}" if params else f"api:{endpoint}"
+
+            keys_deleted = 0
+
+            # Method 1: Clear all transaction cache keys using pattern matching
+            try:
+                # Try multiple patterns to catch all variations
+                patterns = [
+                    "api:/transactions:*",  # Standard format
+                    "*:/transactions:*",     # Any prefix
+                    "api:transactions:*",   # Without leading slash
+                ]
+
+                for pattern in patterns:
+                    try:
+                        if hasattr(redis_client, 'keys'):
+                            keys = redis_client.keys(pattern)
+                            if keys:
+                                # Handle both bytes and string keys
+                                keys_list = []
+                                if isinstance(keys, (list, tuple)):
+                                    keys_list = [k.decode() if isinstance(k, bytes) else k for k in keys]
+                                else:
+                                    keys_list = [k.decode() if isinstance(k, bytes) else k for k in list(keys)]
+
+                                if keys_list:
+                                    # Delete all keys at once
+                                    redis_client.delete(*keys_list)
+                                    keys_deleted += len(keys_list)
+                                    logger.debug(f"Deleted {len(keys_list)} keys matching pattern {pattern}")
+                    except Exception as pattern_err:
+                        logger.debug(f"Pattern {pattern} failed: {pattern_err}")
+                        continue
+
+                # Method 2: Clear specific common cache key combinations
+                common_combinations = [
+                    # Different limit/offset combinations
+                    get_cache_key("/transactions", tenant_id=tenant_id),
+                    get_cache_key("/transactions", tenant_id=tenant_id, limit=10),
+                    get_cache_key("/transactions", tenant_id=tenant_id, limit=50),
+                    get_cache_key("/transactions", tenant_id=tenant_id, limit=100),
+                    get_cache_key("/transactions", tenant_id=tenant_id, limit=1000),
+                    get_cache_key("/transactions", tenant_id=tenant_id, limit=100, offset=0),
+                    get_cache_key("/transactions", tenant_id=tenant_id, limit=100, offset=100),
+                    # Without tenant_id (for demo mode)
+                    get_cache_key("/transactions"),
+                    get_cache_key("/transactions", limit=100),
+                    get_cache_key("/transactions", limit=100, offset=0),
+                ]
+
+                for cache_key in common_combinations:
+                    try:
+                        result = redis_client.delete(cache_key)
+                        if result:
+                            keys_deleted += result
+                        logger.debug(f"Deleted cache key: {cache_key}")
+                    except Exception as key_err:
+                        logger.debug(f"Failed to delete key {cache_key}: {key_err}")
+
+                # Method 3: If tenant_id filtering is used, clear all keys and let them rebuild
+                # This is a more aggressive approach but ensures fresh data
+                try:
+                    # Clear all API cache keys if pattern matching didn't work well
+                    all_api_keys = redis_client.keys("api:*")
+                    if all_api_keys and isinstance(all_api_keys, (list, tuple)):
+                        transaction_keys = [k.decode() if isinstance(k, bytes) else k 
+                                          for k in all_api_keys 
+                                          if '/transactions' in (k.decode() if isinstance(k, bytes) else k)]
+                        if transaction_keys:
+                            redis_client.delete(*transaction_keys)
+                            keys_deleted += len(transaction_keys)
+                            logger.info(f"Cleared {len(transaction_keys)} transaction cache keys via bulk delete")
+                except Exception as bulk_err:
+                    logger.debug(f"Bulk cache clear failed: {bulk_err}")
+
+                logger.info(f"Cleared transactions cache after upload for tenant {tenant_id} (deleted {keys_deleted} keys total)")
+            except Exception as cache_err:
+                logger.warning(f"Cache clearing encountered errors but continuing: {cache_err}")
+    except Exception as e:
+        logger.warning(f"Cache clearing skipped: {e}")
+
 
 # ============================================================================
 # CSV/Excel Upload Endpoints
@@ -27,18 +156,21 @@ router = APIRouter(prefix="/api/v1/ingestion", tags=["data-ingestion"])
 
 @router.post("/files")
 async def upload_file(
+    request: Request,
     file: UploadFile = File(...),
     tenant_id: str = Depends(get_current_tenant),
-    request: Request,
     db=Depends(get_postgres),
     redis_client=Depends(get_redis)
 ):
     """
     📤 Upload CSV or Excel file
     
-    Bulk upload historical transaction data
+    Bulk upload historical transaction data. The file is validated and
+    queued; the response is 202 with the upload_id. Follow progress with
+    GET /files/{upload_id} or the SSE stream at /files/{upload_id}/events.
     Note: user_id is optional when using API key authentication
     """
+    file_path = None
     try:
         logger.info(f"File upload request received: filename={file.filename}, tenant_id={tenant_id}")
         
@@ -53,197 +185,73 @@ async def upload_file(
         
         logger.debug(f"Upload context: tenant_id={tenant_id}, user_id={user_id}, filename={file.filename}")
         
-        # Read file
-        file_content = await file.read()
         file_type = file.filename.split('.')[-1].lower()
         
-        logger.info(f"File read: size={len(file_content)} bytes, type={file_type}")
-        
         if file_type not in ['csv', 'xlsx', 'xls']:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Unsupported file type: {file_type}. Supported: csv, xlsx, xls"
             )
         
+        # Spool to disk; the ingestor streams it back in chunks
+        file_path, file_size, file_hash = await spool_upload(file, suffix=f".{file_type}")
+        
+        logger.info(f"File spooled: size={file_size} bytes, type={file_type}")
+        
         # Store file upload record
         cursor = db.cursor()
         cursor.execute("""
             INSERT INTO file_uploads (
                 tenant_id, uploaded_by, filename, file_type,
-                file_size, status
-            ) VALUES (%s, %s, %s, %s, %s, 'PROCESSING')
+                file_size, file_hash, status
+            ) VALUES (%s, %s, %s, %s, %s, %s, 'PENDING')
             RETURNING id
-        """, (tenant_id, user_id, file.filename, file_type, len(file_content)))
+        """, (tenant_id, user_id, file.filename, file_type, file_size, file_hash))
         
         upload_id = cursor.fetchone()[0]
         db.commit()
         
-        # Validate and ingest file
-        ingestor = CSVIngestor(db)
-        result = await ingestor.ingest_file(
-            tenant_id=tenant_id,
-            file_content=file_content,
-            file_type=file_type
-        )
-        
-        # If ingestion failed, return error immediately with proper status code
-        if not result.get('success', False):
-            error_msg = result.get('error', 'Unknown error during file ingestion')
-            # Check if it's a validation error (should return 400)
-            if 'Missing required columns' in error_msg or 'must be' in error_msg or 'Unsupported file type' in error_msg:
-                # Rollback the file_uploads record
-                cursor.execute("""
-                    UPDATE file_uploads
-                    SET status = 'FAILED',
-                        error_summary = %s,
-                        completed_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (error_msg, upload_id))
-                db.commit()
-                cursor.close()
-                logger.error(f"File upload {upload_id} validation failed: {error_msg}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=error_msg
-                )
-            else:
-                # Other errors (500)
-                cursor.execute("""
-                    UPDATE file_uploads
-                    SET status = 'FAILED',
-                        error_summary = %s,
-                        completed_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (error_msg, upload_id))
-                db.commit()
-                cursor.close()
-                logger.error(f"File upload {upload_id} ingestion failed: {error_msg}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"File ingestion failed: {error_msg}"
-                )
-        
-        # Clear transactions cache after upload so new data shows immediately
-        try:
-            if redis_client:
-                # Generate cache keys manually (same logic as transactions router)
-                def get_cache_key(endpoint: str, **kwargs) -> str:
-                    params = "_".join(f"{k}_{v}" for k, v in sorted(kwargs.items()) if v)
-                    return f"api:{endpoint}:{params}" if params else f"api:{endpoint}"
-                
-                keys_deleted = 0
-                
-                # Method 1: Clear all transaction cache keys using pattern matching
-                try:
-                    # Try multiple patterns to catch all variations
-                    patterns = [
-                        "api:/transactions:*",  # Standard format
-                        "*:/transactions:*",     # Any prefix
-                        "api:transactions:*",   # Without leading slash
-                    ]
-                    
-                    for pattern in patterns:
-                        try:
-                            if hasattr(redis_client, 'keys'):
-                                keys = redis_client.keys(pattern)
-                                if keys:
-                                    # Handle both bytes and string keys
-                                    keys_list = []
-                                    if isinstance(keys, (list, tuple)):
-                                        keys_list = [k.decode() if isinstance(k, bytes) else k for k in keys]
-                                    else:
-                                        keys_list = [k.decode() if isinstance(k, bytes) else k for k in list(keys)]
-                                    
-                                    if keys_list:
-                                        # Delete all keys at once
-                                        redis_client.delete(*keys_list)
-                                        keys_deleted += len(keys_list)
-                                        logger.debug(f"Deleted {len(keys_list)} keys matching pattern {pattern}")
-                        except Exception as pattern_err:
-                            logger.debug(f"Pattern {pattern} failed: {pattern_err}")
-                            continue
-                    
-                    # Method 2: Clear specific common cache key combinations
-                    common_combinations = [
-                        # Different limit/offset combinations
-                        get_cache_key("/transactions", tenant_id=tenant_id),
-                        get_cache_key("/transactions", tenant_id=tenant_id, limit=10),
-                        get_cache_key("/transactions", tenant_id=tenant_id, limit=50),
-                        get_cache_key("/transactions", tenant_id=tenant_id, limit=100),
-                        get_cache_key("/transactions", tenant_id=tenant_id, limit=1000),
-                        get_cache_key("/transactions", tenant_id=tenant_id, limit=100, offset=0),
-                        get_cache_key("/transactions", tenant_id=tenant_id, limit=100, offset=100),
-                        # Without tenant_id (for demo mode)
-                        get_cache_key("/transactions"),
-                        get_cache_key("/transactions", limit=100),
-                        get_cache_key("/transactions", limit=100, offset=0),
-                    ]
-                    
-                    for cache_key in common_combinations:
-                        try:
-                            result = redis_client.delete(cache_key)
-                            if result:
-                                keys_deleted += result
-                            logger.debug(f"Deleted cache key: {cache_key}")
-                        except Exception as key_err:
-                            logger.debug(f"Failed to delete key {cache_key}: {key_err}")
-                    
-                    # Method 3: If tenant_id filtering is used, clear all keys and let them rebuild
-                    # This is a more aggressive approach but ensures fresh data
-                    try:
-                        # Clear all API cache keys if pattern matching didn't work well
-                        all_api_keys = redis_client.keys("api:*")
-                        if all_api_keys and isinstance(all_api_keys, (list, tuple)):
-                            transaction_keys = [k.decode() if isinstance(k, bytes) else k 
-                                              for k in all_api_keys 
-                                              if '/transactions' in (k.decode() if isinstance(k, bytes) else k)]
-                            if transaction_keys:
-                                redis_client.delete(*transaction_keys)
-                                keys_deleted += len(transaction_keys)
-                                logger.info(f"Cleared {len(transaction_keys)} transaction cache keys via bulk delete")
-                    except Exception as bulk_err:
-                        logger.debug(f"Bulk cache clear failed: {bulk_err}")
-                    
-                    logger.info(f"Cleared transactions cache after upload for tenant {tenant_id} (deleted {keys_deleted} keys total)")
-                except Exception as cache_err:
-                    logger.warning(f"Cache clearing encountered errors but continuing: {cache_err}")
-        except Exception as e:
-            logger.warning(f"Cache clearing skipped: {e}")
-        
-        # Update file upload status
-        if result.get('success'):
-            cursor.execute("""
-                UPDATE file_uploads
-                SET status = 'COMPLETED',
-                    rows_total = %s,
-                    rows_inserted = %s,
-                    rows_failed = %s,
-                    completed_at = CURRENT_TIMESTAMP
-                WHERE id = %s
-            """, (
-                result['rows_processed'],
-                result['rows_inserted'],
-                result['rows_failed'],
-                upload_id
-            ))
-        else:
+        # Check header and first rows now so bad files fail fast with 400
+        validation = await CSVIngestor(db).validate_file(file_path=file_path, file_type=file_type)
+        if not validation['valid']:
+            error_msg = validation.get('error') or '; '.join(validation.get('errors', []))
             cursor.execute("""
                 UPDATE file_uploads
                 SET status = 'FAILED',
                     error_summary = %s,
                     completed_at = CURRENT_TIMESTAMP
                 WHERE id = %s
-            """, (result.get('error', 'Unknown error'), upload_id))
-        
-        db.commit()
+            """, (error_msg, upload_id))
+            db.commit()
+            cursor.close()
+            logger.error(f"File upload {upload_id} validation failed: {error_msg}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error_msg
+            )
         cursor.close()
         
-        logger.info(f"File upload {upload_id} completed: {result['rows_inserted']} rows")
-        
-        return {
-            "upload_id": upload_id,
-            "result": result
-        }
+        # Hand off to the background executor; the job now owns the spooled file
+        get_upload_executor().submit(
+            upload_id,
+            tenant_id,
+            file_path,
+            file_type,
+            on_complete=lambda result: clear_transactions_cache(redis_client, tenant_id)
+        )
+        file_path = None
+        
+        logger.info(f"File upload {upload_id} queued for tenant {tenant_id}")
+        
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "upload_id": upload_id,
+                "status": "PENDING",
+                "status_url": f"{router.prefix}/files/{upload_id}",
+                "events_url": f"{router.prefix}/files/{upload_id}/events"
+            }
+        )
         
     except HTTPException:
         raise
@@ -253,6 +261,9 @@ async def upload_file(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"File upload failed: {str(e)}"
         )
+    finally:
+        if file_path:
+            os.unlink(file_path)
 
 
 @router.get("/files")
@@ -270,7 +281,8 @@ async def list_uploads(
         cursor.execute("""
             SELECT 
                 id, filename, file_type, file_size, status,
-                rows_total, rows_inserted, rows_failed,
+                rows_total, rows_processed, rows_inserted, rows_failed,
+                rows_scored, alerts_created, rows_per_second, eta_seconds,
                 created_at, completed_at
             FROM file_uploads
             WHERE tenant_id = %s
@@ -316,12 +328,12 @@ async def get_upload_status(
         """, (upload_id, tenant_id))
         
         result = cursor.fetchone()
+        columns = [desc[0] for desc in cursor.description]
         cursor.close()
         
         if not result:
             raise HTTPException(status_code=404, detail="Upload not found")
         
-        columns = [desc[0] for desc in cursor.description]
         upload = dict(zip(columns, result))
         
         return {"upload": upload}
@@ -336,6 +348,87 @@ async def get_upload_status(
         )
 
 
+async def upload_progress_stream(upload_id: int, tenant_id: str):
+    """Poll file_uploads and emit an SSE event whenever progress changes"""
+    conn = await psycopg.AsyncConnection.connect(settings.postgres_uri, autocommit=True)
+    try:
+        last_progress = None
+        idle_polls = 0
+        while True:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    SELECT
+                        id, status, rows_total, rows_processed,
+                        rows_inserted, rows_failed, rows_scored,
+                        alerts_created, rows_per_second,
+                        eta_seconds, error_summary, progress_updated_at
+                    FROM file_uploads
+                    WHERE id = %s AND tenant_id = %s
+                """, (upload_id, tenant_id))
+                row = await cursor.fetchone()
+                columns = [desc[0] for desc in cursor.description]
+            
+            if not row:
+                yield f"event: error\ndata: {json.dumps({'detail': 'Upload not found'})}\n\n"
+                return
+            
+            progress = dict(zip(columns, row))
+            if progress['rows_per_second'] is not None:
+                progress['rows_per_second'] = float(progress['rows_per_second'])
+            
+            if progress != last_progress:
+                yield f"event: progress\ndata: {json.dumps(progress, default=str)}\n\n"
+                last_progress = progress
+                idle_polls = 0
+            else:
+                idle_polls += 1
+                if idle_polls % 15 == 0:
+                    yield ": keep-alive\n\n"
+            
+            if progress['status'] in TERMINAL_STATUSES:
+                return
+            
+            await asyncio.sleep(UPLOAD_EVENTS_POLL_SECONDS)
+            
+    except asyncio.CancelledError:
+        logger.debug(f"Client disconnected from upload {upload_id} events")
+    finally:
+        await conn.close()
+
+
+@router.get("/files/{upload_id}/events")
+async def upload_events(
+    upload_id: int,
+    tenant_id: str = Depends(get_current_tenant),
+    db=Depends(get_postgres)
+):
+    """
+    📡 Stream file upload progress (Server-Sent Events)
+    
+    Emits a `progress` event whenever rows processed or scored, throughput,
+    ETA or status change, and closes once the upload is COMPLETED or FAILED.
+    """
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT 1 FROM file_uploads WHERE id = %s AND tenant_id = %s
+    """, (upload_id, tenant_id))
+    found = cursor.fetchone()
+    cursor.close()
+    
+    if not found:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return StreamingResponse(
+        upload_progress_stream(upload_id, tenant_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"  # Disable nginx buffering
+        }
+    )
+
+
 @router.get("/template")
 async def download_template():
     """
@@ -370,7 +463,6 @@ async def download_template():
 async def ingest_transaction(
     transaction: TransactionCreate,
     tenant_id: str = Depends(get_current_tenant),
-    db=Depends(get_postgres),
     redis_client = Depends(get_redis)
 ):
     """
@@ -381,21 +473,13 @@ async def ingest_transaction(
     - Rate limiting per tenant
     - Comprehensive error handling
     - Retry logic for transient failures
+    - Group commit: concurrent requests share one write and commit
     
     Returns fraud score and status
     """
     try:
-        api = RealtimeTransactionAPI(db, redis_client)
-        
-        result = await api.ingest_transaction(tenant_id, transaction)
-        
-        # Record transaction for usage metering
-        try:
-            from billing.usage_metering import UsageMetering
-            usage = UsageMetering(db, redis_client)
-            await usage.record_transaction(tenant_id, result['transaction_id'])
-        except Exception as e:
-            logger.warning(f"Failed to record transaction for usage metering: {e}")
+        # Usage metering is recorded per micro-batch by the batcher
+        result = await get_ingest_batcher(redis_client).submit(tenant_id, transaction)
         
         logger.info(f"Ingested transaction {result['transaction_id']} for tenant {tenant_id}")
         
@@ -427,17 +511,31 @@ async def ingest_batch(
     """
     ⚡ Ingest multiple transactions at once
     
-    Max 100 transactions per batch
+    Max 10,000 transactions per batch. The batch is scored and stored in
+    one pass; `transactions` holds one outcome per item, in request order,
+    with either `transaction_id` or `error`.
     """
     try:
         api = RealtimeTransactionAPI(db, redis_client)
         
         result = await api.ingest_batch(tenant_id, transactions)
+        if "error" in result:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result["error"])
         
         logger.info(f"Batch ingested: {result['success']} success, {result['failed']} failed")
         
         return result
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Rate limit or validation errors
+        logger.warning(f"Batch ingestion rejected: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS if "rate limit" in str(e).lower()
+            else status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Batch ingestion failed: {e}")
         raise HTTPException(
@@ -532,7 +630,8 @@ async def create_connector(
             connection_params=request.connection_params,
             table_name=request.source_table,
             column_mapping=request.column_mapping,
-            schedule=request.schedule
+            schedule=request.schedule,
+            name=request.name
         )
         
         logger.info(f"Created sync job {job_id} for tenant {tenant_id}")
@@ -566,7 +665,8 @@ async def list_connectors(
             SELECT 
                 id, name, connector_type, source_table,
                 schedule, status, last_sync_at, last_sync_status,
-                last_sync_count, total_synced, created_at
+                last_sync_count, total_synced, next_run_at,
+                last_sync_duration_ms, last_sync_lag_ms, created_at
             FROM data_sync_jobs
             WHERE tenant_id = %s
             ORDER BY created_at DESC
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import Dict, Optional
-from ml_enhanced_model import predict_fraud, explain_fraud_prediction
+from datetime import datetime
+from ml_enhanced_model import predict_fraud, predict_fraud_batch, explain_fraud_prediction
 from deps import get_postgres, PgConnection
 import logging
 
@@ -98,33 +99,58 @@ async def get_model_info():
     }
 
 @router.post("/ml/batch-predict")
-async def batch_predict(transactions: list[TransactionPredict]):
-    """Predict fraud risk for multiple transactions"""
+async def batch_predict(
+    transactions: list[TransactionPredict],
+    explain: bool = Query(True, description="Include triggered_rules and feature_contributions")
+):
+    """Predict fraud risk for multiple transactions in a single vectorized pass"""
     try:
+        if not transactions:
+            raise HTTPException(status_code=400, detail="No transactions provided")
+        
+        rows = [txn.dict() for txn in transactions]
+        columns = {
+            field: [row[field] for row in rows]
+            for field in TransactionPredict.__fields__
+            if field != 'merchant_id'
+        }
+        batch = predict_fraud_batch(columns, explain=explain)
+        timestamp = datetime.now().isoformat()
+        
         predictions = []
-        for txn in transactions:
-            pred = predict_fraud(txn.dict())
+        for i, row in enumerate(rows):
             predictions.append({
-                "transaction": txn.dict(),
-                "prediction": pred
+                "transaction": row,
+                "prediction": {
+                    "risk_score": float(batch['risk_score'][i]),
+                    "fraud_probability": float(batch['fraud_probability'][i]),
+                    "risk_level": batch['risk_level'][i],
+                    "model_confidence": float(batch['model_confidence'][i]),
+                    "model_scores": {
+                        model: float(scores[i]) for model, scores in batch['model_scores'].items()
+                    },
+                    "recommendation": batch['recommendation'][i],
+                    "timestamp": timestamp
+                }
             })
+            if explain:
+                predictions[-1]["prediction"]["triggered_rules"] = batch['triggered_rules'][i]
+                predictions[-1]["prediction"]["feature_contributions"] = batch['feature_contributions'][i]
         
         # Summary statistics
-        high_risk_count = sum(1 for p in predictions if p['prediction']['risk_level'] == 'HIGH')
-        medium_risk_count = sum(1 for p in predictions if p['prediction']['risk_level'] == 'MEDIUM')
-        low_risk_count = sum(1 for p in predictions if p['prediction']['risk_level'] == 'LOW')
-        avg_risk_score = sum(p['prediction']['risk_score'] for p in predictions) / len(predictions)
+        risk_levels = batch['risk_level']
         
         return {
             "predictions": predictions,
             "summary": {
                 "total": len(transactions),
-                "high_risk": high_risk_count,
-                "medium_risk": medium_risk_count,
-                "low_risk": low_risk_count,
-                "average_risk_score": round(avg_risk_score, 2)
+                "high_risk": int((risk_levels == 'HIGH').sum()),
+                "medium_risk": int((risk_levels == 'MEDIUM').sum()),
+                "low_risk": int((risk_levels == 'LOW').sum()),
+                "average_risk_score": round(float(batch['risk_score'].mean()), 2)
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 import redis
 import json
 import logging
-from datetime import timedelta
+import csv
+import heapq
+import io
+import itertools
+import psycopg
+from datetime import date, timedelta
 from oracledb import Connection
 from psycopg import Connection as PostgresConnection
 from deps import get_oracle, get_redis, get_postgres
+from archive import archived_files_by_day, iter_archive
 from models.transaction import Transaction, TransactionCreate
 from config import settings
 from middleware.tenant import get_current_tenant
@@ -19,6 +26,10 @@ router = APIRouter()
 # Cache TTL in seconds
 CACHE_TTL = 300  # 5 minutes
 
+EXPORT_COLUMNS = ['id', 'account_id', 'amount', 'currency', 'merchant', 'mcc', 'channel',
+                  'city', 'country', 'txn_time', 'status', 'risk_score']
+EXPORT_CHUNK_BYTES = 64 * 1024
+
 def get_cache_key(endpoint: str, **kwargs) -> str:
     """Generate cache key from endpoint and parameters"""
     params = "_".join(f"{k}_{v}" for k, v in sorted(kwargs.items()) if v)
@@ -335,6 +346,63 @@ async def list_transactions(
     finally:
         cursor.close()
 
+def export_transactions_csv(tenant_id: str, date_from: date, date_to: date):
+    """Stream a tenant's transactions of date_from..date_to as CSV, hot and archived rows merged by time"""
+    columns = ', '.join(EXPORT_COLUMNS)
+    with psycopg.connect(settings.postgres_uri) as conn:
+        with conn.cursor() as cursor:
+            # The archive listing and the hot rows must come from one snapshot
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            files = archived_files_by_day(cursor, 'transactions', date_from, date_to, tenant_id)
+        
+        with conn.cursor(name='transactions_export') as hot:
+            hot.execute(f"""
+                SELECT {columns}
+                FROM transactions
+                WHERE tenant_id = %s AND txn_time >= %s AND txn_time < %s
+                ORDER BY txn_time, id
+            """, (tenant_id, date_from, date_to + timedelta(days=1)))
+            # Archive days don't overlap in txn_time, so each is sorted on its own
+            archived = itertools.chain.from_iterable(
+                iter_archive(paths, f"""
+                    SELECT {columns}
+                    FROM archive
+                    WHERE tenant_id = ?
+                    ORDER BY txn_time, id
+                """, [tenant_id])
+                for paths in files.values()
+            )
+            
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in heapq.merge(hot, archived, key=lambda row: (row[9], row[0])):
+                writer.writerow(row)
+                if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+
+@router.get("/transactions/export")
+async def export_transactions(
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    tenant_id: str = Depends(get_current_tenant)
+):
+    """Export transactions as CSV, including rows moved to the archive tier"""
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    
+    return StreamingResponse(
+        export_transactions_csv(tenant_id, date_from, date_to),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename=transactions_{date_from}_{date_to}.csv"
+        }
+    )
+
 @router.get("/cache/stats")
 async def get_cache_stats(redis_client: redis.Redis = Depends(get_redis)):
     """Get Redis cache statistics"""
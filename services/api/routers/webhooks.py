@@ -2,17 +2,17 @@
 Payment Gateway Webhook Integration
 Handles real-time transaction events from payment processors
 """
-from fastapi import APIRouter, Request, HTTPException, Depends, Header, status
+from fastapi import APIRouter, Request, HTTPException, Depends, Header, Query, status
 from fastapi.responses import JSONResponse
 from typing import Optional
 from datetime import datetime
-from decimal import Decimal
 import logging
 import hmac
 import hashlib
 import json
 
-from ingestion.realtime_api import RealtimeTransactionAPI, TransactionCreate
+from ingestion.webhook_events import INGESTED_EVENT_TYPES
+from ingestion.webhook_queue import get_webhook_queue
 from middleware import get_current_tenant
 from deps import get_postgres, get_redis
 from config import settings
@@ -29,7 +29,6 @@ router = APIRouter(prefix="/api/v1/webhooks", tags=["webhooks"])
 async def stripe_webhook(
     request: Request,
     tenant_id: str = Depends(get_current_tenant),
-    db=Depends(get_postgres),
     redis_client=Depends(get_redis)
 ):
     """
@@ -41,7 +40,9 @@ async def stripe_webhook(
     - payment_intent.succeeded: Successful payment intent
     - payment_intent.payment_failed: Failed payment intent
     
-    Returns fraud score and recommendation
+    Payment events are queued once the signature is verified and ingested
+    asynchronously; the fraud score and recommendation are available from
+    GET /api/v1/webhooks/events/{queue_id}
     """
     try:
         # Get raw body for signature verification
@@ -58,7 +59,7 @@ async def stripe_webhook(
         if settings.stripe_webhook_secret:
             try:
                 import stripe
-                event = stripe.Webhook.construct_event(
+                stripe.Webhook.construct_event(
                     body, sig_header, settings.stripe_webhook_secret
                 )
             except ValueError as e:
@@ -75,22 +76,17 @@ async def stripe_webhook(
                 )
         else:
             # In development, parse without verification
-            event = json.loads(body.decode('utf-8'))
             logger.warning("Stripe webhook signature verification disabled (no secret configured)")
-        
-        # Initialize ingestion API
-        api = RealtimeTransactionAPI(db, redis_client)
+        event = json.loads(body.decode('utf-8'))
         
         # Handle different event types
         event_type = event.get('type', '')
-        event_data = event.get('data', {}).get('object', {})
         
-        if event_type == 'charge.succeeded':
-            return await _handle_stripe_charge(api, tenant_id, event_data)
-        elif event_type == 'payment_intent.succeeded':
-            return await _handle_stripe_payment_intent(api, tenant_id, event_data)
+        if event_type in INGESTED_EVENT_TYPES['stripe']:
+            return await _enqueue_event(redis_client, tenant_id, 'stripe', event.get('id'), event_type, event, body)
         elif event_type in ['charge.failed', 'payment_intent.payment_failed']:
-            return await _handle_stripe_failed(api, tenant_id, event_data, event_type)
+            logger.info(f"Stripe {event_type} event received - payment failed")
+            return {"status": "received", "event_type": event_type, "action": "log_failure"}
         else:
             logger.info(f"Unhandled Stripe event type: {event_type}")
             return {"status": "received", "event_type": event_type}
@@ -105,121 +101,6 @@ async def stripe_webhook(
         )
 
 
-async def _handle_stripe_charge(
-    api: RealtimeTransactionAPI,
-    tenant_id: str,
-    charge: dict
-) -> dict:
-    """Handle Stripe charge.succeeded event"""
-    # Extract transaction data
-    customer_id = charge.get('customer', 'unknown')
-    amount = charge.get('amount', 0) / 100  # Stripe uses cents
-    currency = charge.get('currency', 'usd').upper()
-    
-    # Get billing details
-    billing = charge.get('billing_details', {})
-    address = billing.get('address', {})
-    
-    # Get payment method details
-    payment_method = charge.get('payment_method_details', {})
-    card = payment_method.get('card', {})
-    
-    # Create transaction
-    transaction = TransactionCreate(
-        account_id=customer_id,
-        amount=Decimal(str(amount)),
-        currency=currency,
-        merchant=charge.get('description', 'Unknown Merchant') or 'Unknown Merchant',
-        merchant_id=charge.get('merchant', None),
-        channel='ONLINE',
-        city=address.get('city'),
-        country=address.get('country'),
-        ip_address=charge.get('metadata', {}).get('ip_address'),
-        device_id=charge.get('source', {}).get('fingerprint'),
-        transaction_time=datetime.fromtimestamp(charge.get('created', 0)),
-        reference_id=charge.get('id'),
-        metadata={
-            'stripe_charge_id': charge.get('id'),
-            'payment_method': payment_method.get('type'),
-            'card_brand': card.get('brand'),
-            'card_last4': card.get('last4'),
-            'source': 'stripe_webhook',
-            'receipt_url': charge.get('receipt_url')
-        }
-    )
-    
-    # Ingest transaction and get fraud score
-    result = await api.ingest_transaction(tenant_id, transaction)
-    
-    # If high risk, recommend action
-    action = "approved"
-    recommendation = None
-    if result['fraud_score'] > 0.7:
-        action = "blocked"
-        recommendation = "High fraud risk detected. Consider refunding this charge."
-    elif result['fraud_score'] > 0.5:
-        action = "review"
-        recommendation = "Medium fraud risk. Review before fulfillment."
-    
-    return {
-        "status": "processed",
-        "transaction_id": result['transaction_id'],
-        "fraud_score": result['fraud_score'],
-        "action": action,
-        "recommendation": recommendation,
-        "stripe_charge_id": charge.get('id')
-    }
-
-
-async def _handle_stripe_payment_intent(
-    api: RealtimeTransactionAPI,
-    tenant_id: str,
-    payment_intent: dict
-) -> dict:
-    """Handle Stripe payment_intent.succeeded event"""
-    # Similar to charge but from payment intent
-    customer_id = payment_intent.get('customer', 'unknown')
-    amount = payment_intent.get('amount', 0) / 100
-    
-    transaction = TransactionCreate(
-        account_id=customer_id,
-        amount=Decimal(str(amount)),
-        currency=payment_intent.get('currency', 'usd').upper(),
-        merchant='Payment Intent',
-        channel='ONLINE',
-        transaction_time=datetime.fromtimestamp(payment_intent.get('created', 0)),
-        reference_id=payment_intent.get('id'),
-        metadata={
-            'stripe_payment_intent_id': payment_intent.get('id'),
-            'source': 'stripe_webhook'
-        }
-    )
-    
-    result = await api.ingest_transaction(tenant_id, transaction)
-    
-    return {
-        "status": "processed",
-        "transaction_id": result['transaction_id'],
-        "fraud_score": result['fraud_score'],
-        "stripe_payment_intent_id": payment_intent.get('id')
-    }
-
-
-async def _handle_stripe_failed(
-    api: RealtimeTransactionAPI,
-    tenant_id: str,
-    event_data: dict,
-    event_type: str
-) -> dict:
-    """Handle failed payment events"""
-    logger.info(f"Stripe {event_type} event received - payment failed")
-    return {
-        "status": "received",
-        "event_type": event_type,
-        "action": "log_failure"
-    }
-
-
 # ============================================================================
 # PayPal Webhook
 # ============================================================================
@@ -228,7 +109,6 @@ async def _handle_stripe_failed(
 async def paypal_webhook(
     request: Request,
     tenant_id: str = Depends(get_current_tenant),
-    db=Depends(get_postgres),
     redis_client=Depends(get_redis)
 ):
     """
@@ -238,21 +118,19 @@ async def paypal_webhook(
     - PAYMENT.CAPTURE.COMPLETED: Payment captured
     - PAYMENT.CAPTURE.DENIED: Payment denied
     - CHECKOUT.ORDER.COMPLETED: Order completed
+    
+    Payment events are queued and ingested asynchronously, like Stripe's
     """
     try:
-        body = await request.json()
+        raw_body = await request.body()
+        body = json.loads(raw_body)
         event_type = body.get('event_type', '')
-        resource = body.get('resource', {})
         
         # Verify webhook signature (PayPal provides verification endpoint)
         # TODO: Implement PayPal webhook verification
         
-        api = RealtimeTransactionAPI(db, redis_client)
-        
-        if event_type == 'PAYMENT.CAPTURE.COMPLETED':
-            return await _handle_paypal_payment(api, tenant_id, resource)
-        elif event_type == 'CHECKOUT.ORDER.COMPLETED':
-            return await _handle_paypal_order(api, tenant_id, resource)
+        if event_type in INGESTED_EVENT_TYPES['paypal']:
+            return await _enqueue_event(redis_client, tenant_id, 'paypal', body.get('id'), event_type, body, raw_body)
         else:
             logger.info(f"Unhandled PayPal event: {event_type}")
             return {"status": "received", "event_type": event_type}
@@ -265,81 +143,123 @@ async def paypal_webhook(
         )
 
 
-async def _handle_paypal_payment(
-    api: RealtimeTransactionAPI,
+async def _enqueue_event(
+    redis_client,
     tenant_id: str,
-    capture: dict
+    provider: str,
+    event_id: Optional[str],
+    event_type: str,
+    event: dict,
+    raw_body: bytes
 ) -> dict:
-    """Handle PayPal payment capture"""
-    amount_info = capture.get('amount', {})
-    payer_info = capture.get('payer', {})
-    
-    transaction = TransactionCreate(
-        account_id=payer_info.get('payer_id', 'unknown'),
-        amount=Decimal(str(amount_info.get('value', 0))),
-        currency=amount_info.get('currency_code', 'USD'),
-        merchant=capture.get('merchant_id', 'PayPal Merchant'),
-        channel='ONLINE',
-        transaction_time=datetime.fromisoformat(
-            capture.get('create_time', datetime.utcnow().isoformat()).replace('Z', '+00:00')
-        ),
-        reference_id=capture.get('id'),
-        metadata={
-            'paypal_capture_id': capture.get('id'),
-            'paypal_order_id': capture.get('supplementary_data', {}).get('related_ids', {}).get('order_id'),
-            'source': 'paypal_webhook'
-        }
+    """Store the event for the webhook consumers and acknowledge it"""
+    # Without a gateway event id, identical bodies count as redeliveries
+    event_id = event_id or "sha256:" + hashlib.sha256(raw_body).hexdigest()
+    queued = await get_webhook_queue(redis_client).enqueue(
+        tenant_id, provider, event_id, event_type, event
     )
-    
-    result = await api.ingest_transaction(tenant_id, transaction)
-    
-    return {
-        "status": "processed",
-        "transaction_id": result['transaction_id'],
-        "fraud_score": result['fraud_score'],
-        "paypal_capture_id": capture.get('id')
-    }
+    logger.info(
+        f"Queued {provider} {event_type} event {event_id} for tenant {tenant_id} "
+        f"(queue id {queued['queue_id']}{', duplicate' if queued['duplicate'] else ''})"
+    )
+    return {"status": "queued", **queued}
 
 
-async def _handle_paypal_order(
-    api: RealtimeTransactionAPI,
-    tenant_id: str,
-    order: dict
-) -> dict:
-    """Handle PayPal order completion"""
-    purchase_units = order.get('purchase_units', [])
-    if not purchase_units:
-        return {"status": "skipped", "reason": "No purchase units"}
+# ============================================================================
+# Webhook Event Status
+# ============================================================================
+
+@router.get("/events/{queue_id}")
+async def get_webhook_event(
+    queue_id: int,
+    tenant_id: str = Depends(get_current_tenant),
+    db=Depends(get_postgres)
+):
+    """
+    Get the processing status of a queued webhook event
     
-    # Process first purchase unit
-    unit = purchase_units[0]
-    amount = unit.get('amount', {})
-    payer = order.get('payer', {})
+    Status is QUEUED, PROCESSING, PROCESSED (result holds the transaction
+    id, fraud score and recommended action) or FAILED (see error)
+    """
+    try:
+        cursor = db.cursor()
+        
+        cursor.execute("""
+            SELECT
+                id AS queue_id, provider, event_id, event_type, status,
+                attempts, result, error, received_at, processed_at
+            FROM webhook_events
+            WHERE id = %s AND tenant_id = %s
+        """, (queue_id, tenant_id))
+        
+        row = cursor.fetchone()
+        columns = [desc[0] for desc in cursor.description]
+        cursor.close()
+        
+    except Exception as e:
+        logger.error(f"Failed to get webhook event: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get webhook event"
+        )
     
-    transaction = TransactionCreate(
-        account_id=payer.get('payer_id', 'unknown'),
-        amount=Decimal(str(amount.get('value', 0))),
-        currency=amount.get('currency_code', 'USD'),
-        merchant=unit.get('payee', {}).get('email_address', 'PayPal Merchant'),
-        channel='ONLINE',
-        transaction_time=datetime.fromisoformat(
-            order.get('create_time', datetime.utcnow().isoformat()).replace('Z', '+00:00')
-        ),
-        reference_id=order.get('id'),
-        metadata={
-            'paypal_order_id': order.get('id'),
-            'source': 'paypal_webhook'
-        }
-    )
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Webhook event not found"
+        )
     
-    result = await api.ingest_transaction(tenant_id, transaction)
+    return dict(zip(columns, row))
+
+
+@router.get("/events")
+async def list_webhook_events(
+    provider: Optional[str] = None,
+    event_id: Optional[str] = None,
+    event_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    tenant_id: str = Depends(get_current_tenant),
+    db=Depends(get_postgres)
+):
+    """
+    List webhook events, newest first
     
-    return {
-        "status": "processed",
-        "transaction_id": result['transaction_id'],
-        "fraud_score": result['fraud_score'],
-        "paypal_order_id": order.get('id')
-    }
+    Filter by provider, gateway event_id or status
+    """
+    try:
+        cursor = db.cursor()
+        
+        cursor.execute("""
+            SELECT
+                id AS queue_id, provider, event_id, event_type, status,
+                attempts, result, error, received_at, processed_at
+            FROM webhook_events
+            WHERE tenant_id = %(tenant_id)s
+            AND (%(provider)s::text IS NULL OR provider = %(provider)s)
+            AND (%(event_id)s::text IS NULL OR event_id = %(event_id)s)
+            AND (%(status)s::text IS NULL OR status = %(status)s)
+            ORDER BY received_at DESC
+            LIMIT %(limit)s
+        """, {
+            "tenant_id": tenant_id,
+            "provider": provider,
+            "event_id": event_id,
+            "status": event_status.upper() if event_status else None,
+            "limit": limit
+        })
+        
+        columns = [desc[0] for desc in cursor.description]
+        events = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        cursor.close()
+        
+        return {"events": events}
+        
+    except Exception as e:
+        logger.error(f"Failed to list webhook events: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list webhook events"
+        )
 
 
 # ============================================================================
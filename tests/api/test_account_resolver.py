@@ -0,0 +1,93 @@
+"""Tests for set-based account resolution"""
+import sys
+from pathlib import Path
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.account_resolver import AccountResolver
+
+
+class FakeCursor:
+    """Serves a fixed accounts table and hands out ids for new customers"""
+
+    def __init__(self, accounts):
+        self.accounts = dict(accounts)  # customer_id -> id
+        self.next_id = max(self.accounts.values(), default=0) + 1
+        self.queries = []
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if 'SELECT customer_id, id' in query:
+            _, keys, numeric_ids = params
+            self.rows = [
+                (customer_id, account_id) for customer_id, account_id in self.accounts.items()
+                if customer_id in keys or account_id in numeric_ids
+            ]
+        elif 'INSERT INTO accounts' in query:
+            _, keys = params
+            self.rows = []
+            for key in keys:
+                if key not in self.accounts:
+                    self.accounts[key] = self.next_id
+                    self.next_id += 1
+                self.rows.append((key, self.accounts[key]))
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_resolves_batch_with_one_lookup_and_one_insert():
+    """Existing and new keys are resolved with two statements in total"""
+    cursor = FakeCursor({'C1': 1, 'C2': 2})
+    resolver = AccountResolver()
+
+    resolved = resolver.resolve(cursor, 't1', ['C1', 'C2', 'C3', 'C1', ' C3 ', None, ''])
+
+    assert resolved == {'C1': 1, 'C2': 2, 'C3': 3}
+    assert len(cursor.queries) == 2
+
+
+def test_numeric_key_matches_account_id():
+    """A numeric key with no customer_id match resolves to accounts.id"""
+    cursor = FakeCursor({'C7': 7})
+    resolved = AccountResolver().resolve(cursor, 't1', ['7'])
+
+    assert resolved == {'7': 7}
+    assert not any('INSERT' in query for query in cursor.queries)
+
+
+def test_cache_only_keeps_committed_accounts():
+    """Created ids are cached after commit and never after rollback"""
+    cursor = FakeCursor({'C1': 1})
+    resolver = AccountResolver()
+
+    resolver.resolve(cursor, 't1', ['C1', 'NEW'], {})  # transaction rolled back
+    cursor.queries.clear()
+    pending = {}
+    resolver.resolve(cursor, 't1', ['C1', 'NEW'], pending)
+    # C1 came from the lookup and stays cached; NEW has to be resolved again
+    assert len(cursor.queries) == 1
+
+    resolver.commit_pending(pending)
+    cursor.queries.clear()
+    assert resolver.resolve(cursor, 't1', ['C1', 'NEW']) == {'C1': 1, 'NEW': 2}
+    assert cursor.queries == []
+
+
+def test_pending_accounts_belong_to_their_caller():
+    """One caller's commit doesn't cache accounts another caller may roll back"""
+    cursor = FakeCursor({})
+    resolver = AccountResolver()
+    first, second = {}, {}
+
+    resolver.resolve(cursor, 't1', ['A'], first)
+    resolver.resolve(cursor, 't1', ['B'], second)
+    resolver.commit_pending(first)
+
+    cursor.queries.clear()
+    assert resolver.resolve(cursor, 't1', ['A']) == {'A': 1}
+    assert cursor.queries == []
+    resolver.resolve(cursor, 't1', ['B'])
+    assert cursor.queries  # B's transaction never committed
@@ -0,0 +1,70 @@
+"""Tests for queries over the Parquet archive tier"""
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+import archive
+from archive import archived_files, archived_files_by_day, iter_archive, query_archive
+
+
+class FakeCursor:
+    """archive_files listing (day, path) rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def write_file(path, ids, day):
+    table = pa.table({
+        'id': pa.array(ids, type=pa.int32()),
+        'tenant_id': pa.array(['t1'] * len(ids)),
+        'amount': pa.array([Decimal('2.50')] * len(ids), type=pa.decimal128(15, 2)),
+        'day': pa.array([day] * len(ids), type=pa.date32()),
+    })
+    pq.write_table(table, path, compression='zstd')
+    return str(path)
+
+
+def test_listing_is_grouped_by_day_and_filtered_by_tenant():
+    cursor = FakeCursor([(date(2024, 1, 1), 'a'), (date(2024, 1, 1), 'b'), (date(2024, 1, 2), 'c')])
+
+    files = archived_files_by_day(cursor, 'transactions', date(2024, 1, 1), date(2024, 1, 2), 't1')
+
+    assert files == {date(2024, 1, 1): ['a', 'b'], date(2024, 1, 2): ['c']}
+    query, params = cursor.queries[0]
+    assert 'superseded_at IS NULL' in query and 'tenant_id = %s' in query
+    assert params == ['transactions', date(2024, 1, 1), date(2024, 1, 2), 't1']
+    assert archived_files(cursor, 'transactions', date(2024, 1, 1), date(2024, 1, 2)) == ['a', 'b', 'c']
+    assert 'tenant_id' not in cursor.queries[1][0]
+
+
+def test_queries_span_the_listed_files_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, 'ARCHIVE_FETCH_ROWS', 2)
+    first = write_file(tmp_path / "it's-1.parquet", [1, 2, 3], date(2024, 1, 1))
+    second = write_file(tmp_path / 'part-2.parquet', [4, 5], date(2024, 1, 2))
+    write_file(tmp_path / 'unlisted.parquet', [6], date(2024, 1, 2))
+
+    rows = query_archive(
+        [first, second],
+        "SELECT day, COUNT(*), SUM(amount) FROM archive WHERE day >= ? GROUP BY day ORDER BY day",
+        [date(2024, 1, 1)]
+    )
+
+    assert rows == [(date(2024, 1, 1), 3, Decimal('7.50')), (date(2024, 1, 2), 2, Decimal('5.00'))]
+    assert list(iter_archive([first, second], "SELECT id FROM archive ORDER BY id")) == [(i,) for i in range(1, 6)]
+    assert query_archive([], "SELECT * FROM archive") == []
+    assert list(iter_archive([], "SELECT * FROM archive")) == []
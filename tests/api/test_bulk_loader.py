@@ -0,0 +1,202 @@
+"""Tests for the COPY -> staging -> reject -> INSERT bulk loader"""
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.bulk_loader import BulkTransactionLoader, REJECT_REASON_SQL
+
+
+def staging_row(row_num, account_key='ACC1', amount=10, merchant='Store', currency='USD', channel='POS'):
+    return (row_num, account_key, amount, currency, merchant, '5411', channel, 'NYC', 'US',
+            datetime(2025, 1, 1, 10, 0))
+
+
+class FakeCopy:
+    def __init__(self, staged):
+        self.staged = staged
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.staged.append(row)
+
+
+class FakeCursor:
+    """Stages copied rows; rejects and insert outcome are scripted per test"""
+
+    def __init__(self, rejected_rows=(), insert_error=None):
+        self.rejected_rows = set(rejected_rows)
+        self.insert_error = insert_error
+        self.staged = []
+        self.queries = []
+        self.rows = []
+        self.rowcount = 0
+
+    def copy(self, statement):
+        return FakeCopy(self.staged)
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if 'DELETE FROM ingest_staging' in query:
+            assert REJECT_REASON_SQL in query
+            self.rows = [(row[0], 'Missing account_id') for row in self.staged if row[0] in self.rejected_rows]
+            self.staged = [row for row in self.staged if row[0] not in self.rejected_rows]
+        elif 'SELECT DISTINCT account_key' in query:
+            self.rows = [(key,) for key in {row[1] for row in self.staged}]
+        elif 'INSERT INTO transactions' in query:
+            if self.insert_error:
+                raise self.insert_error
+            self.rowcount = len(self.staged)
+        elif 'INSERT INTO ingestion_rejects' in query:
+            self.rows = [(row[0], params[3]) for row in self.staged]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeResolver:
+    def __init__(self):
+        self.committed = []
+
+    def resolve(self, cursor, tenant_id, keys, pending=None):
+        accounts = {key: i for i, key in enumerate(sorted(keys), start=1)}
+        pending.setdefault(tenant_id, {}).update(accounts)
+        return accounts
+
+    def commit_pending(self, pending):
+        self.committed.append(dict(pending))
+
+
+def test_invalid_rows_are_rejected_and_counted():
+    """Rows flagged by REJECT_REASON_SQL become errors; the rest are inserted"""
+    cursor = FakeCursor(rejected_rows={2})
+    conn = FakeConnection(cursor)
+    resolver = FakeResolver()
+
+    result = BulkTransactionLoader(conn, resolver).load_rows(
+        't1', [staging_row(1), staging_row(2, account_key=''), staging_row(3)], upload_id=5
+    )
+
+    assert result == {"rows_inserted": 2, "rows_failed": 1, "errors": [{"row": 2, "error": "Missing account_id"}]}
+    assert conn.commits == 1 and resolver.committed == [{'t1': {'ACC1': 1}}]
+
+
+def test_failed_insert_rejects_the_whole_batch():
+    """An unexpected constraint error rolls back to the savepoint and rejects every staged row"""
+    cursor = FakeCursor(rejected_rows={3}, insert_error=ValueError("value too long"))
+    conn = FakeConnection(cursor)
+    watermarks = []
+
+    result = BulkTransactionLoader(conn, FakeResolver()).load_rows(
+        't1', [staging_row(1), staging_row(2), staging_row(3, account_key='')],
+        before_commit=lambda cur: watermarks.append(cur)
+    )
+
+    assert result["rows_inserted"] == 0
+    assert result["rows_failed"] == 3
+    assert result["errors"][1:] == [{"row": 1, "error": "value too long"}, {"row": 2, "error": "value too long"}]
+    assert "ROLLBACK TO SAVEPOINT before_insert" in cursor.queries
+    assert watermarks == [cursor] and conn.commits == 1
+
+
+def test_errors_before_the_insert_roll_back():
+    cursor = FakeCursor()
+    conn = FakeConnection(cursor)
+    resolver = FakeResolver()
+
+    def failing_rows():
+        yield staging_row(1)
+        raise RuntimeError("read failed")
+
+    with pytest.raises(RuntimeError):
+        BulkTransactionLoader(conn, resolver).load_rows('t1', failing_rows())
+
+    assert conn.commits == 0 and conn.rollbacks == 1
+    assert resolver.committed == []
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URI"), reason="TEST_POSTGRES_URI not set")
+def test_reject_reasons_on_postgres():
+    """REJECT_REASON_SQL routes each kind of bad row to ingestion_rejects"""
+    import psycopg
+
+    conn = psycopg.connect(os.environ["TEST_POSTGRES_URI"])
+    try:
+        with conn.cursor() as cursor:
+            # Temp tables shadow the real ones for this session
+            cursor.execute("""
+                CREATE TEMP TABLE ingestion_rejects (
+                    tenant_id TEXT, upload_id INT, sync_job_id INT,
+                    row_number INT, error TEXT, raw_row JSONB
+                )
+            """)
+            cursor.execute("""
+                CREATE TEMP TABLE transactions (
+                    tenant_id TEXT, account_id INT, amount NUMERIC(15,2), currency TEXT,
+                    merchant TEXT, mcc TEXT, channel TEXT, city TEXT, country TEXT,
+                    txn_time TIMESTAMP, upload_id INT, reference_id TEXT, status TEXT
+                )
+            """)
+            cursor.execute("""
+                CREATE UNIQUE INDEX ON transactions (tenant_id, reference_id)
+                WHERE reference_id IS NOT NULL
+            """)
+        conn.commit()
+
+        rows = [
+            staging_row(1),
+            staging_row(2, account_key=''),
+            staging_row(3, amount=None),
+            staging_row(4, amount=10 ** 14),
+            staging_row(5, merchant=''),
+            staging_row(6, currency='usd'),
+            staging_row(7, channel='FAX'),
+            staging_row(8),
+            staging_row(9, account_key='A' * 65),
+        ]
+        result = BulkTransactionLoader(conn, FakeResolver()).load_rows('t1', rows, upload_id=9)
+
+        assert result["rows_inserted"] == 2
+        assert sorted((e["row"], e["error"]) for e in result["errors"]) == [
+            (2, 'Missing account_id'),
+            (3, 'Invalid amount'),
+            (4, 'amount out of range'),
+            (5, 'Missing merchant'),
+            (6, 'Invalid currency: usd'),
+            (7, 'Invalid channel: FAX'),
+            (9, 'account_id must be <= 64 characters'),
+        ]
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT upload_id, raw_row->>'merchant' FROM ingestion_rejects WHERE row_number = 6")
+            assert cursor.fetchone() == (9, 'Store')
+    finally:
+        conn.close()
@@ -0,0 +1,93 @@
+"""Tests for post-load scoring of uploaded transactions"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.bulk_scorer import BulkFraudScorer, score_features, FEATURE_COLUMNS
+from ingestion.feature_store import DEFAULT_FEATURES
+from ml_enhanced_model import predict_fraud_batch
+
+
+def make_batch(rows):
+    return pd.DataFrame(rows, columns=list(FEATURE_COLUMNS))
+
+
+def test_first_transaction_uses_feature_store_defaults():
+    """No history (NULL window aggregates) scores like the real-time defaults"""
+    batch = make_batch([(1, 10, 120.0, 0, None, None, None, False, False, 14, False)])
+
+    expected = predict_fraud_batch({
+        'amount': [120.0],
+        'transactions_last_hour': [DEFAULT_FEATURES['velocity']],
+        'historical_avg_amount': [DEFAULT_FEATURES['avg_amount']],
+        'historical_std_amount': [DEFAULT_FEATURES['std_amount']],
+        'minutes_since_last_transaction': [DEFAULT_FEATURES['minutes_since_last']],
+        'location_changed': [0],
+        'merchant_risk_score': [DEFAULT_FEATURES['merchant_risk']],
+        'device_changed': [0],
+        'ip_reputation_score': [DEFAULT_FEATURES['ip_reputation']],
+        'hour_of_day': [14],
+        'is_weekend': [0]
+    })
+
+    assert np.allclose(score_features(batch), expected['fraud_probability'])
+
+
+def test_outlier_after_steady_history_scores_higher():
+    batch = make_batch([
+        (1, 10, 22.0, 2, 22.5, 3.5, 10.0, False, False, 10, False),
+        (2, 10, 9000.0, 3, 22.3, 2.5, 1.0, True, False, 3, True),
+    ])
+
+    scores = score_features(batch)
+
+    assert scores.shape == (2,)
+    assert ((scores >= 0) & (scores <= 1)).all()
+    assert scores[1] > 0.5 > scores[0]
+
+
+class LostCursor:
+    """Named cursor whose portal was dropped by a rollback"""
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchmany(self, size):
+        return [(1,) * len(FEATURE_COLUMNS)]
+
+    def close(self):
+        raise RuntimeError('cursor "upload_scoring_1" does not exist')
+
+
+class FailingConnection:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def cursor(self, name=None, withhold=False):
+        return LostCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_batch_error_is_not_masked_by_cursor_close(monkeypatch):
+    conn = FailingConnection()
+    scorer = BulkFraudScorer(conn)
+
+    def failing_batch(tenant_id, batch):
+        raise ValueError("batch failed")
+
+    monkeypatch.setattr(scorer, '_score_batch', failing_batch)
+
+    with pytest.raises(ValueError, match="batch failed"):
+        scorer.score_upload('t1', 1)
+    assert conn.rollbacks == 1
@@ -0,0 +1,154 @@
+"""Tests for chunked CSV/Excel reading in CSVIngestor"""
+import asyncio
+import io
+import sys
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.csv_ingestor import CSVIngestor
+
+
+HEADER = ['account_id', 'amount', 'merchant', 'transaction_date']
+
+
+def make_rows(n):
+    return [[f"ACC{i}", 10 + i, "Store", f"2025-01-01 10:{i % 60:02d}:00"] for i in range(n)]
+
+
+def test_csv_chunks_keep_file_row_index(tmp_path):
+    """Chunk indexes continue across chunks so reject row numbers stay correct"""
+    path = tmp_path / "upload.csv"
+    path.write_text("\n".join(",".join(map(str, r)) for r in [HEADER] + make_rows(25)) + "\n")
+
+    chunks = list(CSVIngestor(None)._read_chunks(str(path), 'csv', 10))
+
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert list(chunks[2].index) == list(range(20, 25))
+
+
+def test_xlsx_chunks_stream_in_read_only_mode():
+    """xlsx files are read in chunks with the same running index"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    for row in make_rows(12):
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    chunks = list(CSVIngestor(None)._read_chunks(buffer, 'xlsx', 5))
+
+    assert [len(c) for c in chunks] == [5, 5, 2]
+    assert list(chunks[1].columns) == HEADER
+    assert chunks[2].index[0] == 10
+    assert chunks[0]['amount'].dtype.kind in 'if'
+
+
+def test_later_chunk_values_are_coerced_not_fatal():
+    """A bad value outside the first chunk becomes NULL for row-level rejection"""
+    ingestor = CSVIngestor(None)
+    content = "\n".join(
+        ",".join(map(str, r)) for r in [HEADER] + make_rows(5) + [["ACC9", "oops", "Store", "not a date"]]
+    ).encode()
+
+    chunks = list(ingestor._read_chunks(io.BytesIO(content), 'csv', 5))
+    assert ingestor._validate_chunk(chunks[0])['valid']
+
+    last = ingestor._prepare_chunk(chunks[1])
+    assert last['amount'].isna().all()
+    assert last['transaction_date'].isna().all()
+
+
+def test_validate_file_reports_missing_columns():
+    result = asyncio.run(CSVIngestor(None).validate_file(b"account_id,amount\n1,2\n"))
+
+    assert not result['valid']
+    assert 'merchant' in result['error']
+
+
+def test_normalize_chunk_uses_column_operations():
+    """Staging frame matches the per-row normalization rules"""
+    ingestor = CSVIngestor(None)
+    content = (
+        "account_id,amount,merchant,transaction_date,currency,mcc,channel,country\n"
+        "ACC1,10,Store , 2025-01-02 10:00:00,usd,5411,POS,United States\n"
+        "ACC2,20,Shop,2025-01-03 11:30:00,,12,,fr\n"
+        "ACC3,30,  ,2025-01-04 12:00:00,eur,,ATM,\n"
+    ).encode()
+
+    chunk = next(ingestor._read_chunks(io.BytesIO(content), 'csv', 10))
+    staging = ingestor._normalize_chunk(ingestor._prepare_chunk(chunk))
+
+    assert list(staging['row_num']) == [2, 3, 4]
+    assert list(staging['currency']) == ['USD', 'USD', 'EUR']
+    assert list(staging['mcc']) == ['5411', '0012', '0000']
+    assert list(staging['channel']) == ['POS', 'ONLINE', 'ATM']
+    assert list(staging['country'].fillna('')) == ['US', 'FR', '']
+    assert staging['merchant'].isna().tolist() == [False, False, True]
+    assert staging['txn_time'].iloc[1].minute == 30
+
+
+def test_date_format_is_picked_from_the_first_chunk():
+    """Day-first dates are detected from any sampled value, then reused for later chunks"""
+    ingestor = CSVIngestor(None)
+    content = (
+        "account_id,amount,merchant,transaction_date\n"
+        "ACC1,10,Store,01/02/2025 10:00\n"
+        "ACC2,20,Store,13/02/2025 11:00\n"
+        "ACC3,30,Store,05/03/2025 12:00\n"
+    ).encode()
+
+    first, second = ingestor._read_chunks(io.BytesIO(content), 'csv', 2)
+    dates = ingestor._prepare_chunk(first)['transaction_date']
+    later = ingestor._prepare_chunk(second)['transaction_date']
+
+    assert ingestor._date_format == '%d/%m/%Y %H:%M'
+    assert [d.month for d in dates] == [2, 2]
+    assert later.iloc[0].month == 3
+
+
+def day_first_csv(days):
+    lines = ["account_id,amount,merchant,transaction_date"]
+    lines += [f"ACC{day},10,Store,{day:02d}/03/2025 10:00" for day in days]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_sorted_day_first_file_is_detected_beyond_the_first_chunk():
+    """A first chunk with days <= 12 only is ambiguous; the rest of the file settles it"""
+    ingestor = CSVIngestor(None)
+    source = io.BytesIO(day_first_csv(range(1, 29)))
+
+    assert ingestor.detect_date_format(source, 'csv', 12) == '%d/%m/%Y %H:%M'
+
+    ingestor._date_format = '%d/%m/%Y %H:%M'
+    source.seek(0)
+    chunks = [ingestor._prepare_chunk(c) for c in ingestor._read_chunks(source, 'csv', 12)]
+    dates = pd.concat([c['transaction_date'] for c in chunks])
+    assert dates.notna().all()
+    assert set(dates.dt.month) == {3}
+    assert list(dates.dt.day) == list(range(1, 29))
+
+
+def test_file_ambiguous_throughout_is_rejected():
+    with pytest.raises(ValueError, match="Ambiguous transaction_date"):
+        CSVIngestor(None).detect_date_format(io.BytesIO(day_first_csv(range(1, 13))), 'csv', 5)
+
+    result = CSVIngestor(None).ingest('t1', day_first_csv(range(1, 13)))
+    assert not result['success'] and 'Ambiguous' in result['error']
+
+
+def test_values_in_another_format_are_parsed_not_dropped():
+    ingestor = CSVIngestor(None)
+    ingestor._date_format = 'ISO8601'
+
+    parsed = ingestor._parse_dates(pd.Series(['2025-03-01 10:00:00', '25/03/2025', 'garbage']))
+
+    assert list(parsed.dt.day[:2]) == [1, 25]
+    assert pd.isna(parsed.iloc[2])
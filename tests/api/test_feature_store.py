@@ -0,0 +1,151 @@
+"""Tests for the online per-account feature store"""
+import pytest
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.feature_store import AccountFeatureState, OnlineFeatureStore, DEFAULT_FEATURES
+
+
+class FakeCursor:
+    def __init__(self, row, calls):
+        self.row = row
+        self.calls = calls
+
+    def execute(self, query, params=None):
+        self.calls.append(params)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self, row):
+        self.row = row
+        self.calls = []
+
+    def cursor(self):
+        return FakeCursor(self.row, self.calls)
+
+    def rollback(self):
+        pass
+
+
+class StubRedis:
+    """What deps.get_redis hands out when Redis is down"""
+
+    def get(self, key):
+        return None
+
+    def setex(self, key, ttl, value):
+        pass
+
+
+def test_welford_matches_numpy():
+    """Running mean/std agree with a full recomputation"""
+    amounts = [120.0, 80.5, 300.0, 45.25, 990.0]
+    state = AccountFeatureState()
+    for amount in amounts:
+        state.update(amount, time.time())
+
+    features = state.features()
+    assert features['avg_amount'] == pytest.approx(np.mean(amounts))
+    assert features['std_amount'] == pytest.approx(np.std(amounts, ddof=1))
+    assert features['velocity'] == len(amounts)
+
+
+def test_empty_state_uses_defaults():
+    """An account with no history gets the same defaults as before"""
+    features = AccountFeatureState().features(city='NYC', device_id='d1')
+    for key, value in DEFAULT_FEATURES.items():
+        assert features[key] == value
+
+
+def test_velocity_window_prunes_old_transactions():
+    """Only transactions from the last hour count towards velocity"""
+    now = time.time()
+    state = AccountFeatureState()
+    state.update(10.0, now - 7200)
+    state.update(10.0, now - 60)
+    state.update(10.0, now - 30)
+
+    assert state.features(now=now)['velocity'] == 2
+
+
+def test_location_and_device_change():
+    """Changes are detected against the last seen city/country/device"""
+    state = AccountFeatureState()
+    state.update(50.0, time.time(), city='NYC', country='US', device_id='dev-1')
+
+    same = state.features(city='NYC', country='US', device_id='dev-1')
+    moved = state.features(city='London', country='GB', device_id='dev-2')
+
+    assert not same['location_changed'] and not same['device_changed']
+    assert moved['location_changed'] and moved['device_changed']
+
+
+def test_store_hydrates_once_then_serves_from_memory():
+    """A miss costs one query; later lookups and updates stay in process"""
+    now = time.time()
+    db = FakeDB((3, 200.0, 2500.0, [now - 120], now - 120, 'NYC', 'US', 'dev-1'))
+    store = OnlineFeatureStore()
+
+    first = store.get_features(db, 't1', 'acc-1', city='NYC', country='US')
+    assert first['avg_amount'] == pytest.approx(200.0)
+    assert first['std_amount'] == pytest.approx(50.0)
+    assert first['velocity'] == 1
+    assert len(db.calls) == 1
+
+    store.record('t1', 'acc-1', 400.0, city='Paris', country='FR')
+    second = store.get_features(db, 't1', 'acc-1', city='Paris', country='FR')
+
+    assert len(db.calls) == 1
+    assert second['velocity'] == 2
+    assert second['avg_amount'] == pytest.approx(250.0)
+    assert not second['location_changed']
+
+
+def test_stub_redis_keeps_state_in_process():
+    """A stub client doesn't force a Postgres hydration on every lookup"""
+    db = FakeDB((0, None, None, None, None, None, None, None))
+    store = OnlineFeatureStore(StubRedis())
+    store.local_ttl_seconds = 0
+
+    store.get_features(db, 't1', 'acc-1')
+    store.record('t1', 'acc-1', 75.0)
+    features = store.get_features(db, 't1', 'acc-1')
+
+    assert not store.redis_enabled
+    assert len(db.calls) == 1
+    assert features['avg_amount'] == pytest.approx(75.0)
+
+
+def test_store_shares_state_through_redis():
+    """Workers fold transactions into the shared state without losing each other's"""
+    fakeredis = pytest.importorskip('fakeredis')
+    redis_client = fakeredis.FakeRedis()
+    db = FakeDB((0, None, None, None, None, None, None, None))
+
+    first = OnlineFeatureStore(redis_client)
+    second = OnlineFeatureStore(redis_client)
+    first.get_features(db, 't1', 'acc-1')
+    second.get_features(db, 't1', 'acc-1')
+    first.record('t1', 'acc-1', 75.0, city='NYC')
+    second.record('t1', 'acc-1', 125.0, city='Boston', device_id='dev-1')
+
+    reader = OnlineFeatureStore(redis_client)
+    features = reader.get_features(db, 't1', 'acc-1', city='NYC', device_id='dev-1')
+
+    assert len(db.calls) == 1
+    assert features['velocity'] == 2
+    assert features['avg_amount'] == pytest.approx(100.0)
+    assert features['std_amount'] == pytest.approx(np.std([75.0, 125.0], ddof=1))
+    assert features['location_changed'] and not features['device_changed']
@@ -0,0 +1,137 @@
+"""Tests for group-committed single-transaction ingestion"""
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion import micro_batcher
+from ingestion.micro_batcher import IngestMicroBatcher
+from ingestion.realtime_api import TransactionCreate
+
+
+class FakeConnection:
+    closed = False
+    broken = False
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAPI:
+    """Stands in for RealtimeTransactionAPI; records each ingest_batch call"""
+    batches = []
+
+    def __init__(self, db, redis_client=None):
+        self.db = db
+        self.redis = redis_client
+        self.rate_limiter = object()
+
+    async def ingest_batch(self, tenant_id, transactions, max_batch_size=None):
+        FakeAPI.batches.append((tenant_id, [t.account_id for t in transactions]))
+        if tenant_id == 'broken':
+            raise RuntimeError("current transaction is aborted")
+        outcomes = []
+        for index, transaction in enumerate(transactions):
+            if transaction.account_id == 'bad':
+                outcomes.append({"index": index, "status": "error", "error": "Unknown account_id"})
+            else:
+                outcomes.append({
+                    "index": index,
+                    "transaction_id": 1000 + index,
+                    "fraud_score": 0.1,
+                    "status": "APPROVED"
+                })
+        success = sum(1 for outcome in outcomes if "error" not in outcome)
+        return {"success": success, "transactions": outcomes}
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    FakeAPI.batches = []
+    monkeypatch.setattr(micro_batcher, 'RealtimeTransactionAPI', FakeAPI)
+    return FakeAPI
+
+
+def transaction(account_id):
+    return TransactionCreate(account_id=account_id, amount=10, merchant='Store')
+
+
+async def submit_all(batcher, requests):
+    results = await asyncio.gather(
+        *(batcher.submit(tenant_id, transaction(account_id)) for tenant_id, account_id in requests),
+        return_exceptions=True
+    )
+    await batcher.shutdown()
+    return results
+
+
+def test_concurrent_submits_share_one_batch_per_tenant(fake_api):
+    connections = []
+
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    batcher = IngestMicroBatcher(max_wait_ms=50, workers=1, connect=connect)
+    requests = [('t1', 'a1'), ('t2', 'b1'), ('t1', 'a2'), ('t1', 'a3')]
+
+    results = asyncio.run(submit_all(batcher, requests))
+
+    assert sorted(fake_api.batches) == [('t1', ['a1', 'a2', 'a3']), ('t2', ['b1'])]
+    assert [r['transaction_id'] for r in results] == [1000, 1000, 1001, 1002]
+    assert all('index' not in r and 'processing_time_ms' in r for r in results)
+    assert len(connections) == 1 and connections[0].closed
+
+
+def test_item_error_only_fails_its_caller(fake_api):
+    batcher = IngestMicroBatcher(max_wait_ms=50, workers=1, connect=FakeConnection)
+
+    ok, failed = asyncio.run(submit_all(batcher, [('t1', 'a1'), ('t1', 'bad')]))
+
+    assert ok['status'] == 'APPROVED'
+    assert isinstance(failed, ValueError) and 'Unknown account_id' in str(failed)
+
+
+def test_batch_closes_at_max_size(fake_api):
+    batcher = IngestMicroBatcher(max_batch_size=2, max_wait_ms=50, workers=1, connect=FakeConnection)
+
+    asyncio.run(submit_all(batcher, [('t1', f'a{i}') for i in range(5)]))
+
+    assert [len(accounts) for _, accounts in fake_api.batches] == [2, 2, 1]
+
+
+def test_submit_after_shutdown_is_rejected(fake_api):
+    async def run():
+        batcher = IngestMicroBatcher(workers=1, connect=FakeConnection)
+        await batcher.submit('t1', transaction('a1'))
+        await batcher.shutdown()
+        with pytest.raises(ValueError, match="shutting down"):
+            await batcher.submit('t1', transaction('a2'))
+
+    asyncio.run(run())
+
+
+def test_connection_is_rolled_back_after_every_tenant_batch(fake_api):
+    """A failed batch must not leave the worker's connection in an aborted transaction"""
+    connections = []
+
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    batcher = IngestMicroBatcher(max_wait_ms=50, workers=1, connect=connect)
+
+    failed, ok = asyncio.run(submit_all(batcher, [('broken', 'a1'), ('t1', 'a2')]))
+
+    assert isinstance(failed, ValueError) and 'aborted' in str(failed)
+    assert ok['status'] == 'APPROVED'
+    assert len(connections) == 1 and connections[0].rollbacks == 2
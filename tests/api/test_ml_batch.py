@@ -0,0 +1,113 @@
+"""Tests for vectorized batch scoring in EnhancedMLFraudDetector"""
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ml_enhanced_model import EnhancedMLFraudDetector
+
+
+SAMPLE_TRANSACTIONS = [
+    {
+        'amount': 50, 'transactions_last_hour': 1, 'historical_avg_amount': 100,
+        'historical_std_amount': 20, 'minutes_since_last_transaction': 120,
+        'location_changed': False, 'merchant_risk_score': 0.1,
+        'device_changed': False, 'ip_reputation_score': 0.9
+    },
+    {
+        'amount': 500, 'transactions_last_hour': 5, 'historical_avg_amount': 150,
+        'historical_std_amount': 50, 'minutes_since_last_transaction': 10,
+        'location_changed': True, 'merchant_risk_score': 0.3,
+        'device_changed': False, 'ip_reputation_score': 0.7
+    },
+    {
+        'amount': 8500, 'transactions_last_hour': 15, 'historical_avg_amount': 200,
+        'historical_std_amount': 0, 'minutes_since_last_transaction': 0.5,
+        'location_changed': True, 'merchant_risk_score': 0.85,
+        'device_changed': True, 'ip_reputation_score': 0.1
+    },
+    {
+        'amount': 12000, 'transactions_last_hour': 25, 'historical_avg_amount': 12000,
+        'historical_std_amount': 50, 'minutes_since_last_transaction': 3,
+        'location_changed': False, 'merchant_risk_score': 0.6,
+        'device_changed': True, 'ip_reputation_score': 0.3
+    },
+]
+
+
+def to_columns(transactions):
+    return {key: [txn[key] for txn in transactions] for key in transactions[0]}
+
+
+def test_batch_matches_single_predictions():
+    """Batch scores agree with the per-transaction predict path"""
+    model = EnhancedMLFraudDetector()
+    batch = model.predict_batch(to_columns(SAMPLE_TRANSACTIONS))
+
+    for i, txn in enumerate(SAMPLE_TRANSACTIONS):
+        single = model.predict(txn)
+        assert batch['fraud_probability'][i] == pytest.approx(single['fraud_probability'], abs=1e-3)
+        assert batch['risk_score'][i] == pytest.approx(single['risk_score'], abs=1e-2)
+        assert batch['risk_level'][i] == single['risk_level']
+        assert batch['recommendation'][i] == single['recommendation']
+        assert batch['model_confidence'][i] == pytest.approx(single['model_confidence'], abs=1e-3)
+        for name, score in single['model_scores'].items():
+            assert batch['model_scores'][name][i] == pytest.approx(score, abs=1e-3)
+
+
+def test_batch_accepts_feature_matrix():
+    """A precomputed N x 10 matrix scores the same as the columnar dict"""
+    model = EnhancedMLFraudDetector()
+    matrix = np.vstack([model.extract_features(txn) for txn in SAMPLE_TRANSACTIONS])
+
+    from_matrix = model.predict_batch(matrix)
+    from_columns = model.predict_batch(to_columns(SAMPLE_TRANSACTIONS))
+
+    np.testing.assert_allclose(from_matrix['risk_score'], from_columns['risk_score'])
+
+
+def test_batch_defaults_for_missing_columns():
+    """Missing columns and nulls fall back to the single-path defaults"""
+    model = EnhancedMLFraudDetector()
+    batch = model.predict_batch({'amount': [100.0, 250.0], 'transactions_last_hour': [None, 4]})
+    single = model.predict({'amount': 100.0})
+
+    assert len(batch['risk_score']) == 2
+    assert batch['risk_score'][0] == pytest.approx(single['risk_score'], abs=1e-2)
+
+
+def test_batch_score_bounds():
+    """Batch probabilities stay within [0, 1] for large random inputs"""
+    model = EnhancedMLFraudDetector()
+    rng = np.random.default_rng(42)
+    n = 10_000
+    batch = model.predict_batch({
+        'amount': rng.uniform(1, 20000, n),
+        'transactions_last_hour': rng.integers(0, 40, n),
+        'minutes_since_last_transaction': rng.uniform(0, 240, n),
+        'merchant_risk_score': rng.uniform(0, 1, n),
+        'ip_reputation_score': rng.uniform(0, 1, n),
+    })
+
+    assert batch['fraud_probability'].shape == (n,)
+    assert (batch['fraud_probability'] >= 0).all()
+    assert (batch['fraud_probability'] <= 1).all()
+    assert set(batch['risk_level']) <= {'LOW', 'MEDIUM', 'HIGH'}
+
+
+def test_batch_explanations_match_single_predictions():
+    """explain=True returns the rules and top contributions of predict"""
+    model = EnhancedMLFraudDetector()
+    batch = model.predict_batch(to_columns(SAMPLE_TRANSACTIONS), explain=True)
+
+    for i, txn in enumerate(SAMPLE_TRANSACTIONS):
+        single = model.predict(txn)
+        assert batch['triggered_rules'][i] == single['triggered_rules']
+        assert list(batch['feature_contributions'][i]) == list(single['feature_contributions'])
+        for name, contribution in single['feature_contributions'].items():
+            assert batch['feature_contributions'][i][name] == pytest.approx(contribution, abs=1e-2)
+    assert 'triggered_rules' not in model.predict_batch(to_columns(SAMPLE_TRANSACTIONS))
@@ -0,0 +1,96 @@
+"""Tests for line-aligned range splitting in parallel CSV ingestion"""
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion import csv_ingestor, parallel_ingest
+from ingestion.csv_ingestor import CSVIngestor
+from ingestion.parallel_ingest import split_line_ranges, _RangeReader
+
+
+def write_csv(path, rows, trailing_newline=True):
+    lines = ["account_id,amount,merchant,transaction_date"]
+    lines += [f"ACC{i},{i}.50,Store {i},2025-01-01 10:00:00" for i in range(rows)]
+    path.write_text("\n".join(lines) + ("\n" if trailing_newline else ""))
+
+
+def test_ranges_cover_file_on_line_boundaries(tmp_path):
+    path = tmp_path / "big.csv"
+    write_csv(path, 1000)
+    data = path.read_bytes()
+
+    header, ranges = split_line_ranges(str(path), range_bytes=1024)
+
+    assert header == data.split(b"\n", 1)[0] + b"\n"
+    assert len(ranges) > 1
+    assert ranges[0].start == len(header)
+    assert ranges[-1].end == len(data)
+    for previous, current in zip(ranges, ranges[1:]):
+        assert previous.end == current.start
+        assert data[current.start - 1:current.start] == b"\n"
+        assert current.first_row == previous.first_row + previous.rows
+    assert sum(r.rows for r in ranges) == 1000
+
+
+def test_unterminated_last_line_is_counted(tmp_path):
+    path = tmp_path / "no_newline.csv"
+    write_csv(path, 10, trailing_newline=False)
+
+    _, ranges = split_line_ranges(str(path), range_bytes=64)
+
+    assert sum(r.rows for r in ranges) == 10
+
+
+def test_range_reader_parses_as_standalone_csv(tmp_path):
+    """Each range reads back as a CSV with the header and only its own rows"""
+    path = tmp_path / "big.csv"
+    write_csv(path, 200)
+    header, ranges = split_line_ranges(str(path), range_bytes=2048)
+
+    frames = []
+    for r in ranges:
+        with io.BufferedReader(_RangeReader(str(path), header, r.start, r.end)) as source:
+            frame = pd.read_csv(source)
+        assert len(frame) == r.rows
+        assert frame['account_id'].iloc[0] == f"ACC{r.first_row}"
+        frames.append(frame)
+
+    assert len(pd.concat(frames)) == 200
+
+
+class RecordingLoader:
+    frames = []
+
+    def __init__(self, db):
+        pass
+
+    def load_frame(self, tenant_id, frame, upload_id=None):
+        RecordingLoader.frames.append(frame)
+        return {"rows_inserted": len(frame), "rows_failed": 0, "errors": []}
+
+
+def test_ranges_share_the_file_date_format(tmp_path, monkeypatch):
+    """A range whose own dates fit month-first still reads the file's day-first format"""
+    path = tmp_path / "day_first.csv"
+    lines = ["account_id,amount,merchant,transaction_date"]
+    lines += [f"ACC{day},10,Store,{day:02d}/03/2025" for day in range(1, 29)]
+    path.write_text("\n".join(lines) + "\n")
+    monkeypatch.setattr(parallel_ingest, '_get_worker_db', lambda: None)
+    monkeypatch.setattr(csv_ingestor, 'BulkTransactionLoader', RecordingLoader)
+    RecordingLoader.frames = []
+
+    with open(path, 'rb') as source:
+        date_format = CSVIngestor(None).detect_date_format(source, 'csv')
+    header, ranges = split_line_ranges(str(path), range_bytes=64)
+    first = ranges[0]
+    result = parallel_ingest._load_range('t1', str(path), header, first, 100, None, date_format)
+
+    assert date_format == '%d/%m/%Y'
+    assert result['rows_inserted'] == first.rows
+    times = pd.concat(frame['txn_time'] for frame in RecordingLoader.frames)
+    assert set(times.dt.month) == {3}
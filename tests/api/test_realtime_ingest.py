@@ -0,0 +1,238 @@
+"""Tests for the single-commit real-time ingest path"""
+import asyncio
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.idempotency import BloomFilter, IdempotencyGuard
+from ingestion.realtime_api import RealtimeTransactionAPI, TransactionCreate
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, query, params=None):
+        self.db.statements.append((query, params))
+
+    def fetchone(self):
+        query, _ = self.db.statements[-1]
+        if 'INSERT INTO transactions' in query:
+            return (42,)
+        # Feature store hydration: an account with no history
+        return (0, None, None, None, None, None, None, None)
+
+    def close(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+        self.stored = {}  # reference_id -> transaction id
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def make_api(db):
+    api = RealtimeTransactionAPI(db)
+    api.idempotency = IdempotencyGuard()
+    return api
+
+
+def ingest(db, account_id, amount, reference_id=None, api=None):
+    api = api or make_api(db)
+    transaction = TransactionCreate(
+        account_id=account_id, amount=amount, merchant='Store',
+        city='NYC', country='US', metadata={'source': 'test'},
+        reference_id=reference_id
+    )
+    return asyncio.run(api.ingest_transaction('t1', transaction))
+
+
+def test_transaction_is_scored_before_a_single_write():
+    db = FakeDB()
+
+    result = ingest(db, 'rt-single-write', 25)
+
+    writes = [(q, p) for q, p in db.statements if 'INSERT' in q]
+    assert len(writes) == 1
+    assert db.commits == 1
+    assert not any('UPDATE transactions' in q for q, _ in db.statements)
+
+    query, params = writes[0]
+    assert 'INSERT INTO fraud_alerts' in query
+    assert params['score'] == pytest.approx(result['fraud_score'], abs=1e-3)
+    assert result['transaction_id'] == 42
+
+
+def test_second_ingest_needs_no_feature_query():
+    """Warm account: one statement per ingest"""
+    db = FakeDB()
+    ingest(db, 'rt-warm', 25)
+    db.statements.clear()
+
+    ingest(db, 'rt-warm', 30)
+
+    assert len(db.statements) == 1
+
+
+class BatchCursor(FakeCursor):
+    def fetchall(self):
+        query, params = self.db.statements[-1]
+        if 'FROM accounts' in query:
+            return [(account_id,) for account_id in params[1] if account_id != 404]
+        if 'INSERT INTO transactions' in query:
+            rows = []
+            for ord, reference_id in enumerate(params['reference_id'], start=1):
+                if reference_id is not None and reference_id in self.db.stored:
+                    continue  # ON CONFLICT DO NOTHING
+                transaction_id = 1000 + self.db.inserted
+                self.db.inserted += 1
+                if reference_id is not None:
+                    self.db.stored[reference_id] = transaction_id
+                rows.append((ord, transaction_id))
+            # (ord, id) pairs come back in no particular order
+            return rows[::-1]
+        if 'reference_id = ANY' in query:
+            return [
+                (self.db.stored[r], 'APPROVED', 0.1, r, datetime(2025, 1, 1))
+                for r in params[1] if r in self.db.stored
+            ]
+        return []  # feature hydration: no history
+
+
+class BatchDB(FakeDB):
+    def __init__(self):
+        super().__init__()
+        self.inserted = 0
+
+    def cursor(self):
+        return BatchCursor(self)
+
+
+def test_batch_reports_per_item_outcomes_in_order():
+    db = BatchDB()
+    api = make_api(db)
+    items = [
+        TransactionCreate(account_id='11', amount=20, merchant='Store', reference_id='a'),
+        TransactionCreate(account_id='not-a-number', amount=20, merchant='Store', reference_id='b'),
+        TransactionCreate(account_id='404', amount=20, merchant='Store', reference_id='c'),
+        TransactionCreate(account_id='12', amount=20, merchant='Store', channel='WIRE', reference_id='d'),
+        TransactionCreate(account_id='11', amount=30, merchant='Store', reference_id='e'),
+    ]
+
+    result = asyncio.run(api.ingest_batch('t1', items))
+
+    assert (result['total'], result['success'], result['failed']) == (5, 2, 3)
+    outcomes = result['transactions']
+    assert [o['index'] for o in outcomes] == [0, 1, 2, 3, 4]
+    assert [o['reference_id'] for o in outcomes] == ['a', 'b', 'c', 'd', 'e']
+    assert outcomes[0]['transaction_id'] == 1000
+    assert outcomes[4]['transaction_id'] == 1001
+    assert 'numeric' in outcomes[1]['error']
+    assert outcomes[2]['error'] == 'Unknown account_id'
+    assert outcomes[3]['error'] == 'Invalid channel'
+
+    inserts = [p for q, p in db.statements if 'INSERT INTO transactions' in q]
+    assert len(inserts) == 1
+    assert inserts[0]['reference_id'] == ['a', 'e']
+    assert db.commits == 1
+
+
+def test_batch_size_limit():
+    items = [TransactionCreate(account_id='1', amount=1, merchant='m')] * 3
+
+    result = asyncio.run(RealtimeTransactionAPI(BatchDB()).ingest_batch('t1', items, max_batch_size=2))
+
+    assert not result['success']
+    assert 'exceeds maximum 2' in result['error']
+
+
+def test_duplicate_reference_id_replays_original():
+    db = FakeDB()
+    api = make_api(db)
+    first = ingest(db, 'rt-dup', 25, reference_id='ch_1', api=api)
+    db.statements.clear()
+
+    second = ingest(db, 'rt-dup', 25, reference_id='ch_1', api=api)
+
+    assert first['replayed'] is False
+    assert second['replayed'] is True
+    assert second['transaction_id'] == first['transaction_id']
+    assert second['fraud_score'] == first['fraud_score']
+    assert db.statements == []
+
+
+def test_batch_replays_known_and_repeated_references():
+    db = BatchDB()
+    api = make_api(db)
+    asyncio.run(api.ingest_batch('t1', [
+        TransactionCreate(account_id='11', amount=20, merchant='Store', reference_id='x')
+    ]))
+    db.statements.clear()
+
+    items = [
+        TransactionCreate(account_id='11', amount=20, merchant='Store', reference_id='x'),
+        TransactionCreate(account_id='12', amount=20, merchant='Store', reference_id='z'),
+        TransactionCreate(account_id='12', amount=20, merchant='Store', reference_id='z'),
+        TransactionCreate(account_id='12', amount=20, merchant='Store'),
+    ]
+    result = asyncio.run(api.ingest_batch('t1', items))
+
+    outcomes = result['transactions']
+    assert (result['success'], result['replayed']) == (4, 2)
+    assert [o['replayed'] for o in outcomes] == [True, False, True, False]
+    assert outcomes[0]['transaction_id'] == 1000
+    assert outcomes[2]['transaction_id'] == outcomes[1]['transaction_id']
+    inserts = [p for q, p in db.statements if 'INSERT INTO transactions' in q]
+    assert inserts[0]['reference_id'] == ['z', None]
+
+
+def test_batch_conflict_on_insert_replays_stored_row():
+    """A reference_id the filters have not seen is caught by the unique index"""
+    db = BatchDB()
+    db.stored['y'] = 777
+    api = make_api(db)
+
+    result = asyncio.run(api.ingest_batch('t1', [
+        TransactionCreate(account_id='11', amount=20, merchant='Store', reference_id='y'),
+        TransactionCreate(account_id='11', amount=20, merchant='Store', reference_id='w'),
+    ]))
+
+    replayed, fresh = result['transactions']
+    assert replayed['replayed'] and replayed['transaction_id'] == 777
+    assert not fresh['replayed'] and fresh['transaction_id'] == 1000
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"ref-{i}")
+
+    assert all(f"ref-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_stub_redis_keeps_idempotency_in_process():
+    """The MockRedis fallback has no pipeline(), so the guard must not use it"""
+    class StubRedis:
+        def get(self, key):
+            return None
+
+    guard = IdempotencyGuard(StubRedis())
+
+    assert not guard.redis_enabled
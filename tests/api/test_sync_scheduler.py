@@ -0,0 +1,103 @@
+"""Tests for the cron scheduler of database connector syncs"""
+from datetime import datetime, timezone
+import pytest
+import sys
+from pathlib import Path
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion import sync_scheduler
+from ingestion.sync_scheduler import SyncJobScheduler, _LeasedJob, next_run_after
+
+
+def test_next_run_is_strictly_after_the_fire_time():
+    fire = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    assert next_run_after('*/15 * * * *', fire) == datetime(2024, 1, 1, 12, 15, tzinfo=timezone.utc)
+    assert next_run_after('0 3 * * *', fire) == datetime(2024, 1, 2, 3, 0, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        next_run_after('every hour', fire)
+
+
+class FakeConnector:
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        FakeConnector.instances += 1
+        self.connection = object()
+        self.closed = False
+
+    def close_quietly(self):
+        self.connection = None
+        self.closed = True
+
+
+def test_source_connections_are_reused_per_connection_params(monkeypatch):
+    FakeConnector.instances = 0
+    monkeypatch.setattr(sync_scheduler, 'create_connector', FakeConnector)
+    scheduler = SyncJobScheduler(idle_seconds=60)
+    job = _LeasedJob(1, 't1', 'postgresql', {'host': 'a', 'port': 5432}, 0)
+    same_source = _LeasedJob(2, 't1', 'postgresql', {'port': 5432, 'host': 'a'}, 0)
+    other_source = _LeasedJob(3, 't1', 'postgresql', {'host': 'b'}, 0)
+
+    first = scheduler._checkout_connector(job)
+    scheduler._checkin_connector(job, first)
+
+    assert scheduler._checkout_connector(same_source) is first
+    assert scheduler._checkout_connector(other_source) is not first
+    assert FakeConnector.instances == 2
+
+    scheduler._checkin_connector(same_source, first)
+    scheduler.idle_seconds = -1
+    scheduler._close_idle_connectors()
+
+    assert first.closed and not scheduler._idle_connectors
+
+
+class FakeDB:
+    closed = False
+    broken = False
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.statements.append((' '.join(query.split()), params))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_run_records_duration_rows_and_lag(monkeypatch):
+    class FakeSync:
+        def __init__(self, db, resolver, **kwargs):
+            pass
+
+        async def run_sync_job(self, job_id, connector=None):
+            return {
+                "success": True, "transactions_fetched": 10,
+                "transactions_inserted": 8, "transactions_rejected": 2
+            }
+
+    db = FakeDB()
+    monkeypatch.setattr(sync_scheduler, 'DataSyncScheduler', FakeSync)
+    monkeypatch.setattr(sync_scheduler, 'create_connector', FakeConnector)
+    scheduler = SyncJobScheduler(connect=lambda: db)
+
+    scheduler._run_job(_LeasedJob(7, 't1', 'mysql', {}, 1500))
+
+    (release, (duration_ms, lag_ms, job_id)), (history, params) = db.statements
+    assert release.startswith('UPDATE data_sync_jobs SET lease_until = NULL')
+    assert (lag_ms, job_id) == (1500, 7)
+    assert history.startswith('INSERT INTO data_sync_history')
+    assert params[4:9] == ('SUCCESS', 10, 8, 2, None)
@@ -0,0 +1,129 @@
+"""Tests for the background upload job executor"""
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion.upload_jobs import UploadJobExecutor
+
+
+class RecordingExecutor(UploadJobExecutor):
+    """Replaces ingestion with a sleep and records concurrency"""
+
+    def __init__(self, **kwargs):
+        super().__init__(connect=lambda: None, **kwargs)
+        self.lock = threading.Lock()
+        self.running = Counter()
+        self.peak_total = 0
+        self.peak_per_tenant = Counter()
+        self.failed = []
+        self.finished = []
+
+    def _process(self, upload_id, tenant_id, file_path, file_type, on_complete):
+        with self.lock:
+            self.running[tenant_id] += 1
+            self.peak_total = max(self.peak_total, sum(self.running.values()))
+            self.peak_per_tenant[tenant_id] = max(
+                self.peak_per_tenant[tenant_id], self.running[tenant_id]
+            )
+        time.sleep(0.05)
+        with self.lock:
+            self.running[tenant_id] -= 1
+            self.finished.append(upload_id)
+
+    def _mark_failed(self, upload_id, error):
+        self.failed.append((upload_id, error))
+
+
+def test_concurrency_is_bounded_globally_and_per_tenant(tmp_path):
+    async def run():
+        executor = RecordingExecutor(max_concurrent=3, max_per_tenant=2)
+        tasks = []
+        for i in range(12):
+            path = tmp_path / f"upload-{i}.csv"
+            path.write_text("x")
+            tasks.append(executor.submit(i, f"t{i % 3}", str(path), 'csv'))
+        await asyncio.gather(*tasks)
+        return executor
+
+    executor = asyncio.run(run())
+
+    assert executor.peak_total <= 3
+    assert max(executor.peak_per_tenant.values()) <= 2
+    assert executor.active_jobs() == 0
+    assert executor._tenant_slots == {}
+    # Jobs own their spooled files and remove them
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_single_tenant_cannot_take_every_slot(tmp_path):
+    async def run():
+        executor = RecordingExecutor(max_concurrent=4, max_per_tenant=1)
+        tasks = [executor.submit(i, 'busy', str(tmp_path / f"{i}.csv"), 'csv') for i in range(4)]
+        tasks.append(executor.submit(99, 'other', str(tmp_path / "99.csv"), 'csv'))
+        await asyncio.gather(*tasks)
+        return executor
+
+    executor = asyncio.run(run())
+
+    assert executor.peak_per_tenant['busy'] == 1
+    assert executor.peak_total == 2
+
+
+def test_shutdown_fails_queued_jobs_and_waits_for_running_ones(tmp_path):
+    async def run():
+        executor = RecordingExecutor(max_concurrent=1, max_per_tenant=1)
+        for i in range(3):
+            path = tmp_path / f"{i}.csv"
+            path.write_text("x")
+            executor.submit(i, 't1', str(path), 'csv')
+        await asyncio.sleep(0.01)
+        await executor.shutdown()
+        return executor
+
+    executor = asyncio.run(run())
+
+    assert executor.finished == [0]
+    assert [upload_id for upload_id, _ in executor.failed] == [1, 2]
+    assert list(tmp_path.iterdir()) == []
+
+
+class ParallelRecordingExecutor(RecordingExecutor):
+    """Treats files named big-* as parallel loads"""
+
+    def _use_parallel(self, file_path, file_type):
+        return Path(file_path).name.startswith('big')
+
+    def _process(self, upload_id, tenant_id, file_path, file_type, on_complete):
+        slots = self._slots_needed(file_path, file_type)
+        with self.lock:
+            self.running['slots'] += slots
+            self.peak_total = max(self.peak_total, self.running['slots'])
+        time.sleep(0.05)
+        with self.lock:
+            self.running['slots'] -= slots
+            self.finished.append(upload_id)
+
+
+def test_parallel_jobs_take_one_slot_per_worker(tmp_path):
+    async def run():
+        executor = ParallelRecordingExecutor(max_concurrent=4, max_per_tenant=4, parallel_workers=3)
+        names = ['big-0', 'small-1', 'small-2', 'big-3', 'small-4', 'small-5']
+        tasks = [
+            executor.submit(i, f"t{i}", str(tmp_path / f"{name}.csv"), 'csv')
+            for i, name in enumerate(names)
+        ]
+        await asyncio.gather(*tasks)
+        return executor
+
+    executor = asyncio.run(run())
+
+    assert executor.peak_total <= 4
+    # Slots are granted in order, so the second big job is not starved by small ones
+    assert executor.finished.index(3) < executor.finished.index(4)
+    assert sorted(executor.finished) == list(range(6))
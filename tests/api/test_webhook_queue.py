@@ -0,0 +1,113 @@
+"""Tests for queued payment gateway webhook processing"""
+import pytest
+import sys
+from pathlib import Path
+
+# Add services/api to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "api"))
+
+from ingestion import webhook_queue
+from ingestion.webhook_events import transaction_from_event
+from ingestion.webhook_queue import WebhookQueue, _ClaimedEvent
+
+
+def stripe_charge(charge_id, currency='usd'):
+    return {
+        "id": f"evt_{charge_id}",
+        "type": "charge.succeeded",
+        "data": {"object": {
+            "id": charge_id, "customer": "cus_1", "amount": 2500,
+            "currency": currency, "created": 1700000000
+        }}
+    }
+
+
+def test_stripe_charge_becomes_transaction():
+    transaction = transaction_from_event('stripe', stripe_charge('ch_1'))
+
+    assert transaction.account_id == 'cus_1'
+    assert float(transaction.amount) == 25.0
+    assert transaction.reference_id == 'ch_1'
+    assert transaction.metadata['source'] == 'stripe_webhook'
+
+
+def test_paypal_order_without_purchase_units_has_no_transaction():
+    event = {"event_type": "CHECKOUT.ORDER.COMPLETED", "resource": {"id": "O-1", "purchase_units": []}}
+
+    assert transaction_from_event('paypal', event) is None
+
+
+class FakeConnection:
+    closed = False
+    broken = False
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakeResolver:
+    def resolve(self, cursor, tenant_id, keys, pending=None):
+        return {key: 7 for key in keys}
+
+    def commit_pending(self, pending):
+        pass
+
+
+class FakeAPI:
+    def __init__(self, db, redis_client=None):
+        self.rate_limiter = object()
+
+    async def ingest_batch(self, tenant_id, transactions, max_batch_size=None):
+        outcomes = []
+        for index, transaction in enumerate(transactions):
+            assert transaction.account_id == '7'
+            if transaction.reference_id == 'ch_bad':
+                outcomes.append({"index": index, "error": "amount out of range"})
+            elif transaction.reference_id == 'ch_down':
+                outcomes.append({"index": index, "error": "Transaction ingestion failed: connection lost"})
+            else:
+                outcomes.append({
+                    "index": index, "transaction_id": 100 + index, "status": "REVIEW",
+                    "fraud_score": 0.6, "replayed": False
+                })
+        return {"transactions": outcomes}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(webhook_queue, 'RealtimeTransactionAPI', FakeAPI)
+    monkeypatch.setattr(webhook_queue, 'get_account_resolver', FakeResolver)
+    queue = WebhookQueue(max_attempts=3, connect=FakeConnection)
+    queue.completed = {}
+    monkeypatch.setattr(queue, '_complete', lambda db, outcomes: queue.completed.update(outcomes))
+    return queue
+
+
+def test_batch_outcomes_by_event(queue, monkeypatch):
+    events = [
+        _ClaimedEvent(1, 't1', 'stripe', stripe_charge('ch_ok'), 1),
+        _ClaimedEvent(2, 't1', 'stripe', stripe_charge('ch_bad'), 1),
+        _ClaimedEvent(3, 't1', 'stripe', stripe_charge('ch_down'), 1),
+        _ClaimedEvent(4, 't1', 'stripe', stripe_charge('ch_down'), 3),
+        _ClaimedEvent(5, 't1', 'stripe', stripe_charge('ch_eur', currency='xyz'), 1),
+    ]
+    monkeypatch.setattr(queue, '_claim', lambda db: events)
+
+    assert queue._process_batch(0) == 5
+
+    status, result, error = queue.completed[1]
+    assert status == 'PROCESSED'
+    assert (result['transaction_id'], result['action']) == (100, 'review')
+    assert queue.completed[2] == ('FAILED', None, 'amount out of range')
+    assert queue.completed[3][0] == 'QUEUED'  # transient: retried later
+    assert queue.completed[4][0] == 'FAILED' and 'after 3 attempts' in queue.completed[4][2]
+    assert queue.completed[5][0] == 'FAILED' and 'Invalid event payload' in queue.completed[5][2]
@@ -0,0 +1,55 @@
+from services.worker import main
+from services.worker.main import ANOMALY_RULES, _evaluate_rules_batch
+
+
+class FakeCursor:
+    """etl_checkpoints with the ETL done up to id 250"""
+
+    def __init__(self, checkpoint, loaded=250):
+        self.checkpoint = checkpoint
+        self.loaded = loaded
+        self.batches = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        if 'FOR UPDATE SKIP LOCKED' in query:
+            self.row = (self.checkpoint,)
+        elif 'SELECT LEAST' in query:
+            self.row = (self.loaded,)
+        elif 'UPDATE etl_checkpoints' in query:
+            self.pending = params[0]
+        else:
+            self.batches.append((params['last_id'], params['batch_end']))
+            self.rowcount = 1
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self._cursor.checkpoint = self._cursor.pending
+
+    def rollback(self):
+        pass
+
+
+def test_rules_run_per_batch_up_to_the_loaded_watermark(monkeypatch):
+    monkeypatch.setattr(main, 'DETECT_BATCH_IDS', 100)
+    cursor = FakeCursor(checkpoint=0)
+    conn = FakeConnection(cursor)
+
+    written = []
+    while (batch := _evaluate_rules_batch(conn)) is not None:
+        written.append(batch)
+
+    assert written == [dict.fromkeys(ANOMALY_RULES, 1)] * 3
+    assert sorted(set(cursor.batches)) == [(0, 100), (100, 200), (200, 250)]
+    assert len(cursor.batches) == 3 * len(ANOMALY_RULES)
+    assert cursor.checkpoint == 250
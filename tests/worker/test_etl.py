@@ -1,5 +1,6 @@
 import pytest
-from services.worker.main import etl_oracle_to_postgres
+from services.worker import main
+from services.worker.main import _etl_ranges, etl_oracle_to_postgres
 
 
 def test_etl_function_exists():
@@ -10,3 +11,136 @@ def test_etl_checkpoint_present():
     # This would require DB connection
     pass
 
+
+class FakeOracleCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.arraysize = 100
+
+    def execute(self, query, params):
+        self.last_id, self.range_end = params
+
+    def fetchmany(self):
+        pending = [row for row in self.rows if self.last_id < row[0] <= self.range_end]
+        chunk = pending[:self.arraysize]
+        if chunk:
+            self.last_id = chunk[-1][0]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeCopy:
+    def __init__(self, staged):
+        self.staged = staged
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.staged.append(row)
+
+
+class FakePostgres:
+    """fact_transactions keyed by txn_id plus one leased range checkpoint"""
+
+    def __init__(self, owner):
+        self.facts = {}
+        self.staged = []
+        self.owner = owner
+        self.checkpoint = None
+        self.pending_checkpoint = None
+        self.deleted = False
+        self.rollups = 0
+        self.commits = 0
+        self.rowcount = 0
+
+    def cursor(self):
+        return self
+
+    def copy(self, statement):
+        return FakeCopy(self.staged)
+
+    def execute(self, query, params=None):
+        if 'INSERT INTO fact_transactions' in query:
+            new = {row[1]: row for row in self.staged if row[1] not in self.facts}
+            self.facts.update(new)
+            self.rowcount = len(new)
+        elif 'INSERT INTO agg_' in query:
+            self.rollups += 1
+        elif 'UPDATE etl_checkpoints' in query:
+            self.rowcount = int(params[-1] == self.owner)
+            self.pending_checkpoint = params[0]
+        elif 'DELETE FROM etl_checkpoints' in query:
+            self.deleted = True
+
+    def commit(self):
+        self.commits += 1
+        self.staged = []
+        self.checkpoint = self.pending_checkpoint
+
+    def rollback(self):
+        self.staged = []
+        self.pending_checkpoint = None
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def source_rows(count):
+    return [
+        (i, 10 + i % 3, 5.0, 'USD', 'Shop', '5411', 'POS', 1.5 if i % 2 else None, 2.5,
+         'City', 'US', f"2024-01-01 00:00:{i:02d}", 'OK', None)
+        for i in range(1, count + 1)
+    ]
+
+
+def test_new_ids_split_into_ranges():
+    assert _etl_ranges(0, 25, 10) == [(0, 10), (10, 20), (20, 25)]
+    assert _etl_ranges(25, 25, 10) == []
+
+
+def test_range_streams_chunks_and_checkpoints_each(monkeypatch):
+    source = FakeOracleCursor(source_rows(30))
+    postgres = FakePostgres('w1')
+    monkeypatch.setattr(main, 'ETL_ARRAYSIZE', 10)
+
+    # Range (0, 25], resumed after id 3
+    assert main._load_etl_range(FakeConnection(source), postgres, 'w1', (7, 25, 3)) == 22
+
+    assert postgres.commits == 4  # chunks of 10, 10 and 2 rows, then the range is dropped
+    assert postgres.checkpoint == 25 and postgres.deleted
+    assert sorted(postgres.facts) == list(range(4, 26))
+    assert postgres.facts[5][6] == 'POINT(2.5 1.5)' and postgres.facts[4][6] is None
+
+
+def test_range_stops_when_its_lease_was_taken_over(monkeypatch):
+    source = FakeOracleCursor(source_rows(30))
+    postgres = FakePostgres('w2')
+    monkeypatch.setattr(main, 'ETL_ARRAYSIZE', 10)
+
+    with pytest.raises(RuntimeError):
+        main._load_etl_range(FakeConnection(source), postgres, 'w1', (7, 25, 0))
+
+    assert postgres.commits == 0 and postgres.checkpoint is None
+
+
+def test_rollups_only_count_newly_inserted_rows(monkeypatch):
+    postgres = FakePostgres('w1')
+    monkeypatch.setattr(main, 'ETL_ARRAYSIZE', 10)
+
+    main._load_etl_range(FakeConnection(FakeOracleCursor(source_rows(10))), postgres, 'w1', (7, 10, 0))
+    assert postgres.rollups == len(main.ROLLUP_DELTAS)
+
+    # The same rows again (an expired lease retried) add nothing
+    main._load_etl_range(FakeConnection(FakeOracleCursor(source_rows(10))), postgres, 'w1', (7, 10, 0))
+    assert postgres.rollups == len(main.ROLLUP_DELTAS)
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from services.worker.main import find_geo_jumps, haversine_km
+
+T0 = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+NEW_YORK = (40.7128, -74.0060)
+LONDON = (51.5074, -0.1278)
+BOSTON = (42.3601, -71.0589)
+
+
+def test_haversine_new_york_london():
+    assert abs(haversine_km(*NEW_YORK, *LONDON) - 5570) < 10
+
+
+def test_jumps_against_stored_point_and_previous_row():
+    rows = [
+        (1, 11, T0 + timedelta(hours=1), *LONDON, 'London'),
+        (1, 12, T0 + timedelta(hours=5), *NEW_YORK, 'New York'),  # too slow to be a jump
+        (2, 21, T0 + timedelta(minutes=30), *BOSTON, 'Boston'),
+        (2, 20, T0, *LONDON, 'London'),  # out of id order, earlier in time
+    ]
+    last_points = {1: (10, T0, *NEW_YORK, 'New York')}
+
+    jumps, latest = find_geo_jumps(rows, last_points)
+
+    assert [(jump[0], jump[1], jump[4], jump[5]) for jump in jumps] == [
+        (1, 11, 'New York', 'London'),
+        (2, 21, 'London', 'Boston'),
+    ]
+    assert latest[1][0] == 12 and latest[2][0] == 21
+
+
+def test_late_rows_do_not_move_the_last_point_back():
+    last_points = {1: (10, T0, *NEW_YORK, 'New York')}
+
+    jumps, latest = find_geo_jumps([(1, 9, T0 - timedelta(hours=3), *BOSTON, 'Boston')], last_points)
+
+    assert jumps == [] and latest == {}
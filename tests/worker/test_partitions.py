@@ -0,0 +1,79 @@
+from contextlib import nullcontext
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from services.worker import main
+from services.worker.main import ARCHIVE_NULL_TENANT, FACT_ARCHIVE_SCHEMA, _write_archive_files
+
+DAY = date(2024, 1, 1)
+
+
+def fact_row(txn_id, tenant_id='t1', day=DAY):
+    txn_time = datetime(day.year, day.month, day.day, txn_id % 24, tzinfo=timezone.utc)
+    return (
+        7, txn_id, Decimal('12.50'), 'USD', '5411', 'web', 40.7128, -74.006, 'New York', 'US',
+        txn_time, day, txn_time.hour, 'APPROVED', txn_time, tenant_id
+    )
+
+
+def test_rows_are_written_to_one_file_per_tenant_and_day(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'ARCHIVE_DIR', str(tmp_path))
+    monkeypatch.setattr(main, 'ARCHIVE_ROW_GROUP_ROWS', 4)
+    rows = [fact_row(i) for i in range(10)] + [fact_row(100, tenant_id=None), fact_row(200, day=date(2024, 1, 2))]
+
+    files = _write_archive_files('fact_transactions', FACT_ARCHIVE_SCHEMA, [rows[:6], rows[6:]])
+
+    written = {(tenant_id, day): (Path(path), count) for tenant_id, day, path, count in files}
+    assert {key: count for key, (_, count) in written.items()} == {
+        ('t1', DAY): 10, (None, DAY): 1, ('t1', date(2024, 1, 2)): 1
+    }
+    path = written[('t1', DAY)][0]
+    assert path.parent == tmp_path / 'fact_transactions' / 'tenant_id=t1' / 'day=2024-01-01'
+    assert written[(None, DAY)][0].parent.parent.name == f'tenant_id={ARCHIVE_NULL_TENANT}'
+
+    table = pq.read_table(path)
+    assert table.schema.equals(FACT_ARCHIVE_SCHEMA)
+    assert table.column('txn_id').to_pylist() == list(range(10))
+    assert table.column('amount')[0].as_py() == Decimal('12.50')
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 3
+    assert metadata.row_group(0).column(0).compression == 'ZSTD'
+
+
+class ArchiveCursor:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append(query.as_string(None))
+
+    def fetchall(self):
+        return []
+
+
+class ArchiveConnection:
+    def __init__(self):
+        self.queries = []
+
+    def transaction(self):
+        return nullcontext()
+
+    def cursor(self):
+        return ArchiveCursor(self.queries)
+
+
+def test_rows_with_a_reference_id_stay_hot():
+    """Ingestion dedupes replays against hot rows only, so referenced rows are never archived"""
+    conn = ArchiveConnection()
+
+    assert main._archive_transactions_batch(conn, []) == 0
+    assert 't.reference_id IS NULL' in conn.queries[0]